@@ -1,26 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from agno.run.agent import RunOutput
 
-from uuid import uuid4
 from pydantic import BaseModel
-from services.ollama_services import check_ollama_running
-from services.agno_services import create_agent
-from core.errors import ollama_unavailable
+from core.config import settings
+from services.ollama_backends import ollama_backends
+from services.agno_services import agent_pool, cacheable_response, get_agent, record_cached_turn, response_cache_key
+from services.chat_stream import QueuePosition, SSECoalescer, confirmation_of, sse_frame
+from services.run_registry import run_registry, watch_disconnect
+from services.admission import QueueFull, admission
+from services.prefix_cache import prefix_cache
+from services.response_cache import response_cache
+from services.paused_runs import PausedRun, paused_runs
+from core.errors import ollama_unavailable, queue_full
+from core.metrics import CHAT_TIME_TO_FIRST_TOKEN_SECONDS, RESPONSE_CACHE_REQUESTS, observe_run_metrics
 import asyncio
-import json
+import time
 
 
 router = APIRouter()
 
 
-tool_requiring_confirm = None
-
-
 # Request models
 class ChatRequest(BaseModel):
     message: str
     session_id: str | None = None
     stream: bool = False
+    cache: bool = False
 
 class ConfirmToolRequest(BaseModel):
     tool_id: str
@@ -29,67 +36,255 @@ class ConfirmToolRequest(BaseModel):
 
 
 
+def stream_response(session_id: str, ticket, http_request: Request, events) -> StreamingResponse:
+    '''SSE response for the run `events` of a session holding the admission `ticket`; the ticket is released when it ends.'''
+
+    async def stream_generator():
+        coalescer = SSECoalescer(
+            session_id,
+            flush_interval=settings.SSE_FLUSH_INTERVAL,
+            flush_bytes=settings.SSE_FLUSH_BYTES,
+            max_pending=settings.SSE_MAX_PENDING,
+        )
+        watchers = []
+
+        def on_start(producer):
+            run_registry.register(session_id, producer)
+            # Stop waiting or generating as soon as the client goes away, even while no frames are being written.
+            watchers.append(asyncio.create_task(watch_disconnect(
+                http_request.receive, lambda: run_registry.cancel_task(session_id, producer, 'disconnect')
+            )))
+
+        try:
+            async for frame in coalescer.stream(events, on_start=on_start):
+                yield frame
+        except Exception as e:
+            yield sse_frame({'error': str(e), 'session_id': session_id})
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+            admission.release(ticket)
+
+    return StreamingResponse(
+        stream_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+        # Frees the slot even if the client left before the stream started
+        background=BackgroundTask(admission.release, ticket),
+    )
+
+@router.get("/{session_id}/confirmation")
+def get_confirmation(session_id: str):
+    '''Lists the tool calls a session's paused run is waiting on.
+
+    Returns
+    -------
+    - `dict`: The session id, the paused run id and the waiting tool calls.
+    - A `HTTPException` (404) if the session has no paused run.'''
+
+    paused = paused_runs.get(session_id)
+    if paused is None:
+        raise HTTPException(status_code=404, detail="No run is waiting for a tool confirmation in this session.")
+    return {"session_id": session_id, "run_id": paused.run_id, "waiting": paused.waiting()}
+
 @router.post("/confirm-tool")
-def confirm_tool(request: ConfirmToolRequest):
-    pass
-    
+async def confirm_tool(request: ConfirmToolRequest, http_request: Request):
+    '''Confirms or denies a tool call of a session's paused run, and resumes the run once every call is answered.
+
+    Returns
+    -------
+    - A `StreamingResponse` of the continued run, like a streaming chat.
+    - `dict`: The session id and the tool calls still waiting, if the run waits on other calls too.
+    - A `HTTPException` (404) if the session has no paused run or the run does not wait on this tool call.'''
+
+    session_id = request.session_id
+    paused = paused_runs.get(session_id)
+    waiting = paused.waiting() if paused is not None else []
+    if not any(tool.get('tool_call_id') == request.tool_id for tool in waiting):
+        raise HTTPException(status_code=404, detail="No run is waiting for a confirmation of this tool call.")
+    if len(waiting) > 1:
+        paused.confirm(request.tool_id, request.confirmed)
+        paused_runs.save()
+        return {"session_id": session_id, "run_id": paused.run_id, "waiting": paused.waiting()}
+
+    model = paused.model
+    if not await ollama_backends.is_alive():
+        raise ollama_unavailable()
+    try:
+        ticket = admission.enqueue(session_id, model)
+    except QueueFull as e:
+        raise queue_full(e.retry_after)
+    # Kept as it was, so the run can be confirmed again if it is never resumed
+    unanswered = PausedRun(**paused.as_dict())
+    paused.confirm(request.tool_id, request.confirmed)
+    paused_runs.take(session_id)
+
+    async def run_events():
+        started = False
+        try:
+            async for position in ticket.positions():
+                yield QueuePosition(position)
+            backend = await ollama_backends.route(
+                model, prefer=agent_pool.host_of(session_id), limit=admission.host_limit(model)
+            )
+            agent = get_agent(session_id, backend.host, model=model)
+            with ollama_backends.track(backend, model):
+                started = True
+                async for chunk in agent.acontinue_run(
+                    run_id=paused.run_id, updated_tools=paused.tool_executions(), session_id=session_id, stream=True
+                ):
+                    if getattr(chunk, 'is_paused', False):
+                        paused_runs.park(session_id, model, chunk)
+                    yield chunk
+        finally:
+            if not started:
+                # Cancelled or failed before agno took the run over; it can be confirmed again.
+                paused_runs.restore(unanswered)
+
+    return stream_response(session_id, ticket, http_request, run_events())
+
+@router.delete("/cache")
+def clear_response_cache():
+    '''Drops every reply in the response cache.
+
+    Returns
+    -------
+    - `dict`: The number of cleared replies.'''
+
+    return {"cleared": response_cache.clear()}
+
+@router.post("/{session_id}/cancel")
+def cancel_chat(session_id: str):
+    '''Cancels the generation(s) currently running for a session.
+
+    Returns
+    -------
+    - `dict`: The session id and the number of cancelled generations.
+    - A `HTTPException` (404) if nothing is running for the session.'''
+
+    cancelled = run_registry.cancel(session_id, reason='request')
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="No generation is running for this session.")
+    return {"session_id": session_id, "cancelled": cancelled}
+
 @router.post("/")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    started = time.perf_counter()
 
     # Generate a session_id if not provided
 
     session_id = request.session_id or f"session_{hash(str(asyncio.get_event_loop().time()))}"
     
-    # Create agent for this session
-    agent = create_agent(session_id)
+    model = settings.MODEL
+
+    async def start_run():
+        # Pick an Ollama host once a slot is free, then reuse the session's pooled agent for that host
+        backend = await ollama_backends.route(
+            model, prefer=agent_pool.host_of(session_id), limit=admission.host_limit(model)
+        )
+        return backend, get_agent(session_id, backend.host)
     
     try:
-        if not check_ollama_running():
+        cache_key = None
+        if request.cache and not request.stream:
+            # Identical requests in the same conversation state are answered from the cache, without Ollama.
+            # The agent is built for the host the run would be routed to (by the cached health state), so the run reuses it.
+            backend = ollama_backends.pick(
+                model, prefer=agent_pool.host_of(session_id), limit=admission.host_limit(model)
+            ) or ollama_backends.backends[0]
+            agent = get_agent(session_id, backend.host)
+            cache_key = await asyncio.to_thread(response_cache_key, agent, session_id, request.message)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                RESPONSE_CACHE_REQUESTS.inc(result='hit')
+                # Part of the conversation like any other turn, so the next request's history includes it
+                await asyncio.to_thread(record_cached_turn, agent, session_id, request.message, cached["response"])
+                return {"response": cached["response"], "session_id": session_id, "cached": True}
+
+        if not await ollama_backends.is_alive():
             raise ollama_unavailable()
+        try:
+            # Wait for a free generation slot for this model (or fail fast if the queue is full)
+            ticket = admission.enqueue(session_id, model)
+        except QueueFull as e:
+            raise queue_full(e.retry_after)
+
         if not request.stream:
-            # Non-streaming mode: Return full response
-            response = await agent.arun(request.message, stream=False)
+            # Non-streaming mode: Return full response, unless the client leaves or cancels first
+            async def generate():
+                await ticket.wait()
+                backend, agent = await start_run()
+                with ollama_backends.track(backend, model):
+                    return await agent.arun(request.message, stream=False)
+
+            # One task covers the wait in the queue and the run, so a cancel during either stops it
+            run = asyncio.create_task(generate())
+            run_registry.register(session_id, run)
+            watcher = asyncio.create_task(watch_disconnect(
+                http_request.receive, lambda: run_registry.cancel_task(session_id, run, 'disconnect')
+            ))
+            try:
+                response = await run
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                return {"response": "", "session_id": session_id, "cancelled": True}
+            finally:
+                watcher.cancel()
+                admission.release(ticket)
+            time_to_first_token = getattr(response.metrics, 'time_to_first_token', None)
+            if time_to_first_token is not None:
+                CHAT_TIME_TO_FIRST_TOKEN_SECONDS.observe(time_to_first_token, model=model, stream='false')
+            observe_run_metrics(model, response.metrics)
+            prefix_cache.observe(model, response)
+            if response.is_paused:
+                # Parked until `/confirm-tool`; nothing is held meanwhile
+                paused_runs.park(session_id, model, response)
+                if cache_key is not None:
+                    RESPONSE_CACHE_REQUESTS.inc(result='skipped')
+                return {
+                    "response": response.content,
+                    "session_id": session_id,
+                    "tool_requiring_confirmation": confirmation_of(response, session_id),
+                }
+            if cache_key is not None:
+                # Replies of runs that changed files are not replayed
+                stored = cacheable_response(response)
+                if stored:
+                    response_cache.set(cache_key, {"response": response.content})
+                RESPONSE_CACHE_REQUESTS.inc(result='stored' if stored else 'skipped')
             return {
                 "response": response.content,
                 "session_id": session_id
             }
         
-        # Streaming mode: Yield chunks as SSE
-        async def stream_generator():
-            try:
-                # Iterate over streamed RunResponse chunks
-                async for chunk in agent.arun(request.message, stream=True):
-                    if chunk.is_paused:
-                        for tool in chunk.tools_requiring_confirmation:
-                            tool_id = uuid4()
-                            tool_requiring_confirm = {
-                                "tool_name": tool.tool_name,
-                                "tool_id": f"{tool_id}",
-                                "session_id": session_id,
-                                "confirmed": tool.confirmed,
-                            }
-                    else:
-                        tool_requiring_confirm = None
-
-                    chunk_data = {
-                        "content": chunk.content or "",
-                        "type": type(chunk).__name__,
-                        "tool_calls": [tc.model_dump() for tc in getattr(chunk, "tool_calls", [])],
-                        "session_id": session_id,
-                        "tool_requiring_confirmation": tool_requiring_confirm
-                    }
-
-                    yield f"data: {json.dumps(chunk_data)}\n\n" 
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                yield f"data: {json.dumps({'error': str(e), 'session_id': session_id})}\n\n"
-
-        return StreamingResponse(
-            stream_generator(),
-            media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
-        )
+        # Streaming mode: Yield queue positions, then coalesced chunks as SSE
+        async def run_events():
+            async for position in ticket.positions():
+                yield QueuePosition(position)
+            backend, agent = await start_run()
+            first_token = True
+            with ollama_backends.track(backend, model):
+                async for chunk in agent.arun(request.message, stream=True, yield_run_response=True):
+                    if isinstance(chunk, RunOutput):
+                        # The final run output repeats the whole response; only its metrics are used.
+                        observe_run_metrics(model, chunk.metrics)
+                        prefix_cache.observe(model, chunk)
+                        continue
+                    if getattr(chunk, 'is_paused', False):
+                        # The run is saved by agno; park it so the stream can end until `/confirm-tool` resumes it
+                        paused_runs.park(session_id, model, chunk)
+                    if first_token and chunk.content:
+                        first_token = False
+                        CHAT_TIME_TO_FIRST_TOKEN_SECONDS.observe(
+                            time.perf_counter() - started, model=model, stream='true'
+                        )
+                    yield chunk
+
+        return stream_response(session_id, ticket, http_request, run_events())
     
+    except HTTPException:
+        raise
     except ConnectionError:
         raise ollama_unavailable()
     except Exception as e:
@@ -2,12 +2,14 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 
 import ollama
-from services.ollama_services import get_all_models
-from services.ollama_services import check_ollama_running as is_ollama_running
+from services.model_catalog import model_catalog
+from services.ollama_backends import ollama_backends
+from services.model_warmup import keep_alive_for, model_warmer
 from pydantic import BaseModel
 from core.config import settings
-from core.errors import ollama_unavailable, OLLAMA_UNAVAILABLE_DETAIL
-import json
+from core.errors import ollama_unavailable
+from services.chat_stream import sse_frame
+from services.downloads import download_manager
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,63 +21,86 @@ router = APIRouter()
 class ChangeModelRequest(BaseModel):
     model_name: str
 
-# Used to create a streaming response
-def download_model(model_name: str):
-    '''yields data for fastapi StreamingResponse
-    
+async def download_events(job_id: str):
+    '''yields data for fastapi StreamingResponse until the download finishes
+
     Returns
     -------
     - `str`: SSE like structured string'''
 
-    try:
-        for progress in ollama.pull(model_name, stream=True):
-            data = json.dumps({'completed': progress.completed, 'total': progress.total})
-            logger.debug(f"Download progress for {model_name}: {data}")
-            yield f'data: {data}\n\n'
-    except ConnectionError:
-        logger.error(f'Failed to download {model_name}: Ollama not installed or not running.')
-        yield f"data: {json.dumps({'error': OLLAMA_UNAVAILABLE_DETAIL})}\n\n"
-    except ollama.ResponseError as e:
-        logger.error(f'Failed to download {model_name}: {e}')
-        yield f"data: {json.dumps({'error': 'The model you tried to download does not exist.'})}\n\n"
+    async for job in download_manager.subscribe(job_id):
+        yield sse_frame(job)
 
 @router.post('/download/{model_name}')
-def download_new_model(model_name: str):
-    '''Downloads a model (if exists) from ollama.com
-    
+async def download_new_model(model_name: str):
+    '''Downloads a model (if exists) from ollama.com in the background, or attaches to the running download of it.
+
+    The download carries on if the client disconnects; follow it again with `/downloads/{job_id}/events`.
+
     Returns
     -------
-    - A `StreamingResponse` of the download activity.
-    - A `HTTPException` if wanted model does not exist on ollama servers and/or when encountered an ollama `ConnectionError`'''
+    - A `StreamingResponse` of the download activity, ending with the job's final status (`completed` or `failed` with an `error`).'''
 
     logger.info(f'Downloading new model {model_name}.')
+    job = download_manager.start(model_name)
     return StreamingResponse(
-        download_model(model_name),
-        media_type='application/json'
+        download_events(job.id),
+        media_type='text/event-stream',
+        headers={'X-Download-Job': job.id},
     )
 
+@router.get('/downloads')
+def list_downloads():
+    '''Lists the known download jobs, newest first.
+
+    Returns
+    -------
+    - A list of job dicts.'''
+
+    return [job.as_dict() for job in download_manager.recent()]
+
+@router.get('/downloads/{job_id}')
+def get_download(job_id: str):
+    '''Gets the current state of a download job.
+
+    Returns
+    -------
+    - `dict`: The job.
+    - A `HTTPException` (404) if there is no such job.'''
+
+    job = download_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='No download with this id.')
+    return job.as_dict()
+
+@router.get('/downloads/{job_id}/events')
+def follow_download(job_id: str):
+    '''Streams a download job's progress; any number of clients can follow the same job.
+
+    Returns
+    -------
+    - A `StreamingResponse` of the download activity.
+    - A `HTTPException` (404) if there is no such job.'''
+
+    if download_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail='No download with this id.')
+    return StreamingResponse(download_events(job_id), media_type='text/event-stream')
+
 @router.get('/all')
-def get_models():
+async def get_models():
     '''This function will return all of the availble models.
     
     Returns
     -------
     - A list of models dicts. Example model dict: `{ 'name': 'some-model:3b', 'size': 10000000, 'param_size': 100000000 }`
     - `HTTPException` if ollama throws a ConnectionError.'''
-    
-    formatted_models_list = []
-    models_list = []
 
     try:
-        logger.info("Fetching all available models from Ollama.")
-        models_list = get_all_models()
+        logger.info("Fetching all available models from the model catalog.")
+        formatted_models_list = await model_catalog.list()
     except ConnectionError as e:
         logger.error("Failed to fetch models: Ollama not installed or not running.")
         raise ollama_unavailable()
-    
-    for model in models_list.models:
-        logger.debug(f"Found model: {model.model}")
-        formatted_models_list.append({'name': model.model, 'size': model.size, 'param_size': model.details.parameter_size})
 
     logger.info(f"Returning {len(formatted_models_list)} models.")
     return formatted_models_list
@@ -92,17 +117,61 @@ def get_current_model():
     return {'name': settings.MODEL}
 
 @router.get('/alive')
-def check_ollama_running():
-    '''Checks whether Ollama is currently running.'''
-    if is_ollama_running():
+async def check_ollama_running():
+    '''Checks whether Ollama is running on at least one host, using the monitors' cached state when it is fresh.'''
+    if await ollama_backends.is_alive():
         logger.info("Ollama is running.")
         return True
     logger.error("Ollama is not running.")
     return False
 
+@router.get('/health')
+async def get_ollama_health():
+    '''Returns the cached Ollama liveness state, combined and per host.
+
+    Returns
+    -------
+    - `dict`: `{ 'alive': bool, 'last_checked': float | None, 'consecutive_failures': int, 'last_error': str | None, 'hosts': list[dict] }`'''
+
+    await ollama_backends.is_alive()
+    return ollama_backends.status()
+
+@router.get('/loaded')
+async def get_loaded_models():
+    '''Lists the models currently loaded in memory on each Ollama host.
+
+    Returns
+    -------
+    - A list of dicts. Example: `{ 'host': 'default', 'name': 'some-model:3b', 'size': 10000000, 'size_vram': 10000000, 'expires_at': '...', 'keep_alive': '30m' }`
+    - `HTTPException` if no Ollama host is reachable.'''
+
+    if not await ollama_backends.is_alive():
+        raise ollama_unavailable()
+    loaded = await ollama_backends.loaded_models()
+    return [{**model, 'keep_alive': keep_alive_for(model['name'])} for model in loaded]
+
+@router.post('/warm/{model_name}')
+async def warm_model(model_name: str):
+    '''Loads a model into Ollama now, so the next chat with it does not wait for the load.
+
+    Returns
+    -------
+    - `dict`: The model, the host it was loaded on and its keep-alive.
+    - `HTTPException` with code 404 if the model is not installed, or 500 if Ollama is not reachable.'''
+
+    try:
+        backend = await model_warmer.warm(model_name)
+    except ConnectionError:
+        logger.error(f"Failed to warm up {model_name}: Ollama not installed or not running.")
+        raise ollama_unavailable()
+    except ollama.ResponseError as e:
+        logger.warning(f"Failed to warm up {model_name}: {e}")
+        raise HTTPException(status_code=404, detail='The model you are trying to load was not found installed. Maybe pull it from ollama?')
+    return {'model': model_name, 'host': backend.name, 'keep_alive': keep_alive_for(model_name)}
+
 
 @router.post('/change')
-def change_current_model(new_model: ChangeModelRequest):
+async def change_current_model(new_model: ChangeModelRequest):
     '''Change the selected model in settings.
     
     Params
@@ -111,17 +180,17 @@ def change_current_model(new_model: ChangeModelRequest):
     - `HTTPException` with code 500 if ollama throws a `ConnectionError` or an `HTTPException` with code 404 if the model was not found currently installed.'''
     try:
         logger.info(f"Changing current model to {new_model.model_name}")
-        all_models = get_all_models()
-
-        for model in all_models.models:
-            logger.debug(f"Checking model: {model.model}")
-            if model.model == new_model.model_name:
-                settings.MODEL = new_model.model_name
-                logger.info(f"Model changed to {settings.MODEL}")
-                return {'message': f'Success! model set to {settings.MODEL}'}
+        model = await model_catalog.get(new_model.model_name, refresh_on_miss=True)
     except ConnectionError as e:
         logger.error("Failed to change model: Ollama not installed or not running.")
         raise ollama_unavailable()
 
+    if model is not None:
+        settings.MODEL = new_model.model_name
+        logger.info(f"Model changed to {settings.MODEL}")
+        # Load it now so the first chat does not wait for it
+        model_warmer.schedule(settings.MODEL)
+        return {'message': f'Success! model set to {settings.MODEL}'}
+
     logger.warning(f"Model {new_model.model_name} not found among installed models.")
     raise HTTPException(status_code=404, detail='The model you are trying to set as default was not found installed. Maybe pull it from ollama?')
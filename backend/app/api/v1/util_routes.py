@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 import os
 from core.config import settings
+from tools.path_policy import path_policy
 from pathlib import Path
 import logging
 
@@ -22,6 +23,7 @@ def change_dir(new_dir: ChangeCWDRequest):
     normalized_dir = Path(new_dir.path).resolve()
     if os.path.isdir(normalized_dir):
         settings.CURRENT_DIR = str(normalized_dir)
+        path_policy.set_root(settings.CURRENT_DIR)
         logger.info(f"Changed current directory to {normalized_dir}")
         return {'message': f'Changed to {normalized_dir}'}
     else:
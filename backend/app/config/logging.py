@@ -1,17 +1,21 @@
 import logging
 import json
 import sys
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-import os
 from datetime import timedelta
 
 # Custom JSON formatter for structured logs
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # Records are formatted on the listener thread, so use the time the record was created.
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "module": record.module,
@@ -19,7 +23,47 @@ class JsonFormatter(logging.Formatter):
             "message": record.getMessage(),
             "extra": getattr(record, "extra", {})
         }
-        return json.dumps(log_entry)
+        return json.dumps(log_entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most one record per call site every `interval` seconds.
+
+    Only records at or below `max_level` (DEBUG by default) are limited, so
+    high-frequency debug events such as download progress ticks are sampled
+    while warnings and errors always get through. The number of records
+    dropped since the last one is appended to the next message that passes."""
+
+    def __init__(self, interval=1.0, max_level=logging.DEBUG, clock=time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.max_level = max_level
+        self.clock = clock
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+_listener = None
+_queue_handler = None
+
 
 def delete_old_logs(log_dir="logs", days=3):
     """Delete log files older than `days` days in `log_dir`."""
@@ -35,54 +79,67 @@ def delete_old_logs(log_dir="logs", days=3):
         except Exception:
             pass
 
-def setup_logging():
+def stop_logging():
+    """Flush queued records and stop the background log writer."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def setup_logging(log_dir="logs", debug_interval=1.0):
+    """Route all logging through a queue to a background thread.
+
+    Request handlers only enqueue records; formatting (including JSON
+    encoding) and console/file writes happen on the `QueueListener` thread.
+    Handlers live on the root logger only, so records from the `app` logger
+    are written once."""
+
     # Create logs directory
-    Path("logs").mkdir(exist_ok=True)
+    Path(log_dir).mkdir(exist_ok=True)
 
     # Delete old logs
-    delete_old_logs("logs", days=3)
-    
-    # Root logger config
-    logging_config = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "json": {
-                "()": JsonFormatter,
-                "format": "",
-            },
-            "standard": {
-                "format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-            },
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": "INFO",
-                "formatter": "standard",
-                "stream": sys.stdout,
-            },
-            "file": {
-                "class": "logging.handlers.RotatingFileHandler",
-                "level": "DEBUG",
-                "formatter": "json",
-                "filename": "logs/app.log",
-                "maxBytes": 5 * 1024 * 1024,  # 5MB
-                "backupCount": 3,
-            },
-        },
-        "root": {
-            "level": "INFO",
-            "handlers": ["console", "file"],
-        },
-        "loggers": {
-            "app": {  # App-specific logger
-                "level": "DEBUG",
-                "handlers": ["console", "file"],
-                "propagate": True,
-            },
-        },
-    }
-    
-    import logging.config
-    logging.config.dictConfig(logging_config)
\ No newline at end of file
+    delete_old_logs(log_dir, days=3)
+
+    stop_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+
+    file = RotatingFileHandler(
+        Path(log_dir) / "app.log",
+        maxBytes=5 * 1024 * 1024,  # 5MB
+        backupCount=3,
+    )
+    file.setLevel(logging.DEBUG)
+    file.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(interval=debug_interval))
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+
+    # App-specific logger: debug records propagate to the root's queue handler.
+    app_logger = logging.getLogger("app")
+    for handler in app_logger.handlers[:]:
+        app_logger.removeHandler(handler)
+        handler.close()
+    app_logger.setLevel(logging.DEBUG)
+    app_logger.propagate = True
+
+    global _listener, _queue_handler
+    _queue_handler = queue_handler
+    _listener = QueueListener(log_queue, console, file, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+atexit.register(stop_logging)
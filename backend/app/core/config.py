@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal
 import os
 from dotenv import load_dotenv
 
@@ -10,6 +11,57 @@ class Settings(BaseSettings):
     MODEL: str = "granite4:350m" 
     TAVILY_API_KEY: str = os.getenv('TAVILY_API_KEY')
     CURRENT_DIR: str = "./"
+    AGENT_POOL_SIZE: int = 32
+    AGENT_POOL_TTL: float = 900.0
+    OLLAMA_HOSTS: list[str] = []
+    OLLAMA_AFFINITY_SLACK: int = 2
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    MODEL_KEEP_ALIVE: dict[str, str] = {}
+    WARM_MODELS: list[str] = []
+    MODEL_WARMUP_TIMEOUT: float = 300.0
+    OLLAMA_HEALTH_INTERVAL: float = 10.0
+    OLLAMA_HEALTH_MAX_BACKOFF: float = 60.0
+    OLLAMA_HEALTH_TIMEOUT: float = 2.0
+    OLLAMA_HEALTH_MAX_AGE: float = 30.0
+    MODEL_CATALOG_TTL: float = 60.0
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    READ_FILE_MAX_BYTES: int = 1024 * 1024
+    FILE_IO_WORKERS: int = 8
+    FILE_WRITE_FSYNC: bool = False
+    TOOL_MAX_CONCURRENCY: int = 4
+    TOOL_WORKERS: int = 8
+    SEARCH_BACKEND: Literal["tavily", "local"] = "tavily"
+    SEARCH_CACHE_TTL: float = 3600.0
+    SEARCH_CACHE_SIZE: int = 256
+    SEARCH_CACHE_PATH: str | None = "./db/search_cache.db"
+    SEARCH_TOKEN_BUDGET: int = 3000
+    SEARCH_CHUNK_TOKENS: int = 200
+    SEARCH_TOP_K_CHUNKS: int = 8
+    MAX_CONCURRENT_GENERATIONS: int = 2
+    MODEL_CONCURRENCY: dict[str, int] = {}
+    GENERATION_QUEUE_SIZE: int = 32
+    RESPONSE_CACHE_TTL: float = 3600.0
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_PATH: str | None = "./db/response_cache.db"
+    HISTORY_TOKEN_BUDGET: int = 4000
+    HISTORY_RECENT_RUNS: int = 2
+    HISTORY_MAX_RUNS: int = 20
+    HISTORY_TOOL_RESULT_TOKENS: int = 500
+    HISTORY_SUMMARY_TOKENS: int = 150
+    HISTORY_COMPACT_RATIO: float = 0.5
+    SSE_FLUSH_INTERVAL: float = 0.02
+    SSE_FLUSH_BYTES: int = 256
+    SSE_MAX_PENDING: int = 64
+    DOWNLOADS_STATE_PATH: str | None = "./db/downloads.json"
+    DOWNLOAD_PROGRESS_INTERVAL: float = 0.5
+    DOWNLOAD_MAX_PARALLEL: int = 2
+    PAUSED_RUNS_PATH: str | None = "./db/paused_runs.json"
+    PAUSED_RUN_TTL: float = 86400.0
+    INDEX_MAX_FILE_BYTES: int = 1024 * 1024
+    INDEX_REFRESH_INTERVAL: float = 2.0
 
 
 settings = Settings()
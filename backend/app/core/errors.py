@@ -7,3 +7,12 @@ OLLAMA_UNAVAILABLE_DETAIL = "Ollama either not installed or not running."
 def ollama_unavailable() -> HTTPException:
     """Build the standard HTTPException raised/returned when Ollama is unreachable."""
     return HTTPException(status_code=500, detail=OLLAMA_UNAVAILABLE_DETAIL)
+
+
+def queue_full(retry_after: int) -> HTTPException:
+    """Build the 429 raised when too many chat requests are already waiting for the model."""
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests are waiting for this model. Try again later.",
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -0,0 +1,319 @@
+'''
+In-process latency metrics, exported in the Prometheus text format
+'''
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterable
+import threading
+import time
+
+# Seconds; covers fast tool calls through slow first tokens on a cold model.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Tokens per second.
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+# Fractions.
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Histogram(Metric):
+    '''Cumulative-bucket histogram, as Prometheus expects (`_bucket`, `_sum`, `_count`).'''
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        '''Observe the wall time spent inside the `with` block.'''
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def sum(self, **labels: str) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'forge_http_request_duration_seconds',
+    'HTTP request latency, until the last byte of the response body (including streamed responses).',
+    ('method', 'route', 'status'),
+)
+CHAT_TIME_TO_FIRST_TOKEN_SECONDS = registry.histogram(
+    'forge_chat_time_to_first_token_seconds',
+    'Time from receiving a chat request to the first generated content.',
+    ('model', 'stream'),
+)
+CHAT_TOKENS_PER_SECOND = registry.histogram(
+    'forge_chat_tokens_per_second',
+    'Output tokens per second of a chat run, as reported by the model.',
+    ('model',),
+    buckets=RATE_BUCKETS,
+)
+CHAT_OUTPUT_TOKENS = registry.counter(
+    'forge_chat_output_tokens_total',
+    'Output tokens generated by chat runs.',
+    ('model',),
+)
+CHAT_CANCELLED = registry.counter(
+    'forge_chat_cancelled_total',
+    'Chat generations cancelled before they finished.',
+    ('reason',),
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    'forge_admission_wait_seconds',
+    'Time chat requests spent queued before a generation slot was free.',
+    ('model',),
+)
+ADMISSION_REJECTED = registry.counter(
+    'forge_admission_rejected_total',
+    'Chat requests rejected with 429 because the queue was full.',
+    ('model',),
+)
+TOOL_CALL_SECONDS = registry.histogram(
+    'forge_tool_call_duration_seconds',
+    'Duration of agent tool calls.',
+    ('tool', 'status'),
+)
+AGENT_CONSTRUCTION_SECONDS = registry.histogram(
+    'forge_agent_construction_seconds',
+    'Time spent building an agent when the pool has none for a session.',
+    ('model',),
+)
+OLLAMA_HEALTH_CHECK_SECONDS = registry.histogram(
+    'forge_ollama_health_check_seconds',
+    'Duration of Ollama liveness probes.',
+    ('result',),
+)
+OLLAMA_BACKEND_REQUESTS = registry.counter(
+    'forge_ollama_backend_requests_total',
+    'Generations routed to each Ollama host, by outcome.',
+    ('host', 'result'),
+)
+MODEL_WARMUP_SECONDS = registry.histogram(
+    'forge_model_warmup_seconds',
+    'Time taken to load a model into Ollama ahead of use.',
+    ('model', 'result'),
+)
+
+PROMPT_TOKENS = registry.counter(
+    'forge_prompt_tokens_total',
+    'Estimated size of the prompt of the first model call of each chat run.',
+    ('model',),
+)
+PROMPT_EVAL_TOKENS = registry.counter(
+    'forge_prompt_eval_tokens_total',
+    'Prompt tokens Ollama evaluated for the first model call of each chat run; the rest came from its KV cache.',
+    ('model',),
+)
+PREFIX_CACHE_HIT_RATIO = registry.histogram(
+    'forge_prefix_cache_hit_ratio',
+    'Estimated share of each chat prompt that Ollama served from its KV cache.',
+    ('model',),
+    buckets=RATIO_BUCKETS,
+)
+PROMPT_PREFIX_CHANGES = registry.counter(
+    'forge_prompt_prefix_changes_total',
+    'Turns whose system prompt or tool schemas differed from the previous turn of the same session.',
+    ('part',),
+)
+
+RESPONSE_CACHE_REQUESTS = registry.counter(
+    'forge_response_cache_requests_total',
+    'Chat requests that asked for the response cache: served from it (hit), answered and stored, or answered but not stored.',
+    ('result',),
+)
+
+
+def observe_run_metrics(model: str, metrics) -> None:
+    '''Record tokens/sec and output tokens from an agno run `Metrics` object, if it has them.'''
+    if metrics is None:
+        return
+    output_tokens = getattr(metrics, 'output_tokens', 0) or 0
+    duration = getattr(metrics, 'duration', None)
+    if output_tokens:
+        CHAT_OUTPUT_TOKENS.inc(output_tokens, model=model)
+    if output_tokens and duration:
+        CHAT_TOKENS_PER_SECOND.observe(output_tokens / duration, model=model)
+
+
+async def time_tool_call(function_name: str, function_call, arguments: dict):
+    '''agno tool hook that records how long each tool call takes.'''
+    status = 'ok'
+    started = time.perf_counter()
+    try:
+        return await function_call(**arguments)
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=function_name, status=status)
+
+
+class MetricsMiddleware:
+    '''ASGI middleware recording request latency per route template.
+
+    Timing stops when the last body chunk is sent, so streaming responses are
+    measured end to end. Unmatched paths share one label to keep cardinality
+    bounded.'''
+
+    def __init__(self, app, histogram: Histogram = HTTP_REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get('route')
+            self.histogram.observe(
+                time.perf_counter() - started,
+                method=scope['method'],
+                route=getattr(route, 'path', 'unmatched'),
+                status=str(status),
+            )
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
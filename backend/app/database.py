@@ -1,15 +1,68 @@
 # database.py
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from core.config import settings
 
 SQLITE_FILE_NAME = "./db/database.db"
-SQLALCHEMY_DATABASE_URL  = f"sqlite:///{SQLITE_FILE_NAME}"
+CHAT_HISTORY_FILE_NAME = "./db/chat_history.db"
+SQLALCHEMY_DATABASE_URL  = f"sqlite+aiosqlite:///{SQLITE_FILE_NAME}"
+
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# busy_timeout makes writers wait for the lock instead of failing with
+# "database is locked", and synchronous=NORMAL is durable under WAL while
+# skipping an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": settings.DB_BUSY_TIMEOUT_MS,
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+        "connect_args": {"check_same_thread": False, "timeout": settings.DB_BUSY_TIMEOUT_MS / 1000},
+    }
+
+
+def create_sqlite_engine(db_file: str) -> Engine:
+    '''Create a pooled, WAL-mode synchronous engine (used by agno's chat history store).'''
+    engine = create_engine(f"sqlite:///{db_file}", **_pool_options())
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def create_async_sqlite_engine(db_file: str) -> AsyncEngine:
+    '''Create a pooled, WAL-mode async engine backed by aiosqlite.'''
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}", **_pool_options())
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def ensure_db_dirs() -> None:
+    for db_file in (SQLITE_FILE_NAME, CHAT_HISTORY_FILE_NAME):
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}  # Only for SQLite
-)
+engine = create_async_sqlite_engine(SQLITE_FILE_NAME)
+history_engine = create_sqlite_engine(CHAT_HISTORY_FILE_NAME)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
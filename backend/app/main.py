@@ -1,6 +1,7 @@
 from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 
-from database import SessionLocal, engine, Base
+from database import SessionLocal, engine, history_engine, ensure_db_dirs, Base
 from contextlib import asynccontextmanager
 import logging
 from core.config import settings
@@ -8,6 +9,13 @@ import os
 
 from api.v1 import ollama_routes, chat_routes, util_routes
 from config.logging import setup_logging
+from core.metrics import MetricsMiddleware, registry
+from services.ollama_backends import ollama_backends
+from services.model_warmup import model_warmer
+from services.downloads import download_manager
+from services.paused_runs import paused_runs
+from services.web_search import web_search
+from services.response_cache import response_cache
 
 setup_logging()
 
@@ -16,52 +24,56 @@ logger = logging.getLogger("app")
 settings.CURRENT_DIR = os.getcwd()
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         logger.debug("Database session created.")
         yield db
-    finally:
-        db.close()
-        logger.debug("Database session closed.")
+    logger.debug("Database session closed.")
 
 # Database initialization
 async def init_db():
+    ensure_db_dirs()
     # Create tables
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created.")
 
-# Optional: close engine on shutdown
+# Close engines on shutdown
 async def shutdown_db():
     await engine.dispose()
+    history_engine.dispose()
     logger.info("Database connection closed.")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application startup: initializing database.")
     await init_db()
+    web_search.cache.open(settings.SEARCH_CACHE_PATH)
+    response_cache.open(settings.RESPONSE_CACHE_PATH)
+    ollama_backends.start()
+    model_warmer.schedule_all([settings.MODEL, *settings.WARM_MODELS])
+    download_manager.resume()
+    paused_runs.load()
     yield
     logger.info("Application shutdown: closing database.")
+    await download_manager.close()
+    await model_warmer.close()
+    await ollama_backends.stop()
+    await web_search.aclose()
+    response_cache.close()
     await shutdown_db()
 
-def create_db_and_tables():
-    Base.metadata.create_all(engine)
-    logger.info("Database tables created (sync).")
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    logger.info("Application startup: creating DB tables (sync).")
-    create_db_and_tables()
-    yield
-    logger.info("Application shutdown.")
-
-
-
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(ollama_routes.router, prefix='/api/models')
 app.include_router(chat_routes.router, prefix='/api/chat')
-app.include_router(util_routes.router, prefix='/api/utils')
\ No newline at end of file
+app.include_router(util_routes.router, prefix='/api/utils')
+
+
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    '''Latency histograms and counters in the Prometheus text exposition format.'''
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
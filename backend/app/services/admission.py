@@ -0,0 +1,221 @@
+'''
+Admission control for generations: per-model concurrency limits and a fair wait queue
+'''
+
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable
+import asyncio
+import logging
+import math
+import time
+
+from core.config import settings
+from core.metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+from services.ollama_backends import ollama_backends
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    '''Raised by `AdmissionController.enqueue` when a model's wait queue is full.'''
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f'The queue for {model} is full.')
+        self.model = model
+        self.retry_after = retry_after
+
+
+class Ticket:
+    '''A request's place in line. `granted` resolves when it may start generating.'''
+
+    def __init__(self, session_id: str, model: str, enqueued_at: float):
+        self.session_id = session_id
+        self.model = model
+        self.enqueued_at = enqueued_at
+        self.started_at: float | None = None
+        self.position = 0
+        self.released = False
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._changed = asyncio.Event()
+        self.granted.add_done_callback(lambda _: self._changed.set())
+
+    def _set_position(self, position: int) -> None:
+        if position != self.position:
+            self.position = position
+            self._changed.set()
+
+    async def wait(self) -> None:
+        await self.granted
+
+    async def positions(self) -> AsyncIterator[int]:
+        '''Yield the 1-based queue position, again whenever it changes, until the ticket is granted.
+
+        Raises `asyncio.CancelledError` if the ticket is cancelled while waiting.'''
+        last = None
+        while not self.granted.done():
+            self._changed.clear()
+            if self.position != last:
+                last = self.position
+                yield last
+                continue
+            await self._changed.wait()
+        await self.granted
+
+
+class _ModelQueue:
+    def __init__(self, model: str):
+        self.model = model
+        self.active = 0
+        # Waiting tickets per session; sessions are served round-robin so one
+        # session sending many requests cannot starve the others.
+        self.sessions: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self.waiting = 0
+        self.average_duration: float | None = None
+
+    def pop_next(self) -> Ticket | None:
+        while self.sessions:
+            session_id, tickets = next(iter(self.sessions.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                self.sessions.move_to_end(session_id)
+            else:
+                del self.sessions[session_id]
+            self.waiting -= 1
+            if not ticket.granted.done():
+                return ticket
+        return None
+
+    def remove(self, ticket: Ticket) -> bool:
+        tickets = self.sessions.get(ticket.session_id)
+        if tickets is None or ticket not in tickets:
+            return False
+        tickets.remove(ticket)
+        if not tickets:
+            del self.sessions[ticket.session_id]
+        self.waiting -= 1
+        return True
+
+    def order(self) -> list[Ticket]:
+        '''Waiting tickets in the order they will be served.'''
+        queues = list(self.sessions.values())
+        order = []
+        for round_ in range(max((len(tickets) for tickets in queues), default=0)):
+            order.extend(tickets[round_] for tickets in queues if len(tickets) > round_)
+        return order
+
+
+class AdmissionController:
+    '''Caps concurrent generations per model and queues the rest fairly.
+
+    Up to `max_concurrent` generations run per model and host (`limits`
+    overrides this per model name), so a model may run that many times the
+    number of hosts reported by `hosts` across the pool. Which host a granted
+    request runs on is up to the router, which is given `host_limit(model)`
+    so that no single host goes over it. Further requests wait in a queue of at most `max_queue`
+    tickets per model, served round-robin across sessions and FIFO within a
+    session. When the queue is full, `enqueue` raises `QueueFull` with a
+    retry-after estimate based on the model's recent generation times.
+    '''
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_queue: int = 32,
+        limits: dict[str, int] | None = None,
+        default_duration: float = 10.0,
+        hosts: Callable[[], int] = lambda: 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrent = max_concurrent
+        self.hosts = hosts
+        self.max_queue = max_queue
+        self.limits = dict(limits or {})
+        self.default_duration = default_duration
+        self.clock = clock
+        self._queues: dict[str, _ModelQueue] = {}
+
+    def host_limit(self, model: str) -> int:
+        '''Generations of `model` allowed at once on one host.'''
+        return max(self.limits.get(model, self.max_concurrent), 1)
+
+    def limit(self, model: str) -> int:
+        '''Generations of `model` allowed at once across the hosts that are up.'''
+        return self.host_limit(model) * max(self.hosts(), 1)
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = _ModelQueue(model)
+        return queue
+
+    def retry_after(self, model: str) -> int:
+        '''Seconds until a slot is likely to free up for a request arriving now.'''
+        queue = self._queue(model)
+        duration = queue.average_duration or self.default_duration
+        return max(math.ceil(duration * (queue.waiting + 1) / self.limit(model)), 1)
+
+    def enqueue(self, session_id: str, model: str) -> Ticket:
+        queue = self._queue(model)
+        ticket = Ticket(session_id, model, self.clock())
+        if queue.active < self.limit(model) and not queue.waiting:
+            self._grant(queue, ticket)
+            return ticket
+        if queue.waiting >= self.max_queue:
+            ADMISSION_REJECTED.inc(model=model)
+            raise QueueFull(model, self.retry_after(model))
+        queue.sessions.setdefault(session_id, deque()).append(ticket)
+        queue.waiting += 1
+        self._update_positions(queue)
+        logger.debug(f"Queued request for session_id {session_id} on {model} at position {ticket.position}")
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        '''Give back a granted slot, or leave the queue if still waiting. Safe to call more than once.'''
+        if ticket.released:
+            return
+        ticket.released = True
+        queue = self._queue(ticket.model)
+        if ticket.started_at is not None:
+            queue.active -= 1
+            duration = self.clock() - ticket.started_at
+            queue.average_duration = (
+                duration if queue.average_duration is None else 0.8 * queue.average_duration + 0.2 * duration
+            )
+        else:
+            queue.remove(ticket)
+            if not ticket.granted.done():
+                ticket.granted.cancel()
+        self._dispatch(queue)
+
+    def _grant(self, queue: _ModelQueue, ticket: Ticket) -> None:
+        queue.active += 1
+        ticket.started_at = self.clock()
+        ticket.position = 0
+        ticket.granted.set_result(None)
+        ADMISSION_WAIT_SECONDS.observe(ticket.started_at - ticket.enqueued_at, model=ticket.model)
+
+    def _dispatch(self, queue: _ModelQueue) -> None:
+        while queue.waiting and queue.active < self.limit(queue.model):
+            ticket = queue.pop_next()
+            if ticket is None:
+                break
+            self._grant(queue, ticket)
+        self._update_positions(queue)
+
+    def _update_positions(self, queue: _ModelQueue) -> None:
+        for position, ticket in enumerate(queue.order(), start=1):
+            ticket._set_position(position)
+
+    def status(self) -> dict:
+        return {
+            model: {'active': queue.active, 'waiting': queue.waiting, 'limit': self.limit(model)}
+            for model, queue in self._queues.items()
+        }
+
+
+admission = AdmissionController(
+    max_concurrent=settings.MAX_CONCURRENT_GENERATIONS,
+    max_queue=settings.GENERATION_QUEUE_SIZE,
+    limits=settings.MODEL_CONCURRENCY,
+    hosts=ollama_backends.available_count,
+)
@@ -0,0 +1,125 @@
+'''
+A bounded pool of live agents keyed by session id
+'''
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolEntry:
+    agent: Any
+    model: str
+    created_at: float
+    last_used: float
+    host: str | None = None
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+@dataclass
+class AgentPool:
+    '''Keeps agents alive between requests so a session does not rebuild its
+    agent, model client and database handle on every turn.
+
+    Entries are evicted least-recently-used once `max_size` is exceeded, when
+    they have been idle for longer than `ttl` seconds, or when the model or
+    Ollama host they were built for is no longer the requested one.
+    '''
+
+    factory: Callable[[str, str, str | None], Any]
+    max_size: int = 32
+    ttl: float = 900.0
+    clock: Callable[[], float] = time.monotonic
+    stats: PoolStats = field(default_factory=PoolStats)
+
+    def __post_init__(self):
+        self._entries: OrderedDict[str, PoolEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def get(self, session_id: str, model: str, host: str | None = None):
+        '''Return the live agent for `session_id`, building one on a miss.
+
+        Returns
+        -------
+        - The pooled agent, guaranteed to have been built for `model` on `host`.'''
+
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                if entry.model != model:
+                    self._evict(session_id, f'model changed from {entry.model} to {model}')
+                elif entry.host != host:
+                    self._evict(session_id, f'host changed from {entry.host} to {host}')
+                elif now - entry.last_used > self.ttl:
+                    self._evict(session_id, 'idle ttl expired')
+                else:
+                    entry.last_used = now
+                    self._entries.move_to_end(session_id)
+                    self.stats.hits += 1
+                    return entry.agent
+            self.stats.misses += 1
+
+        # Build outside the lock so a slow construction does not block other sessions.
+        agent = self.factory(session_id, model, host)
+
+        with self._lock:
+            self._entries[session_id] = PoolEntry(agent=agent, model=model, created_at=now, last_used=now, host=host)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._evict(oldest, 'pool full')
+        return agent
+
+    def host_of(self, session_id: str) -> str | None:
+        '''The Ollama host the session's pooled agent talks to, if it has one.'''
+        entry = self._entries.get(session_id)
+        return entry.host if entry is not None else None
+
+    def discard(self, session_id: str) -> bool:
+        '''Drop a session's agent from the pool. Returns whether it was present.'''
+        with self._lock:
+            if session_id not in self._entries:
+                return False
+            self._evict(session_id, 'discarded')
+            return True
+
+    def prune(self) -> int:
+        '''Evict every entry whose idle time exceeds the ttl. Returns the number evicted.'''
+        now = self.clock()
+        with self._lock:
+            expired = [sid for sid, entry in self._entries.items() if now - entry.last_used > self.ttl]
+            for session_id in expired:
+                self._evict(session_id, 'idle ttl expired')
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            for session_id in list(self._entries):
+                self._evict(session_id, 'pool cleared')
+
+    def _evict(self, session_id: str, reason: str) -> None:
+        del self._entries[session_id]
+        self.stats.evictions += 1
+        logger.debug(f"Evicted agent for session_id {session_id}: {reason}")
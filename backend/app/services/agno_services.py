@@ -3,26 +3,215 @@ Functions using the agno library
 '''
 
 from agno.agent import Agent
+from agno.models.message import Message
 from agno.models.ollama import Ollama
 from agno.db.sqlite import SqliteDb
+from agno.run.agent import RunInput, RunOutput
+from agno.run.base import RunStatus
+from agno.session.agent import AgentSession
 
 from core.config import settings
+from core.metrics import AGENT_CONSTRUCTION_SECONDS, time_tool_call
+from database import history_engine, ensure_db_dirs
+from services.agent_pool import AgentPool
+from services.history_window import SKIPPED_STATUSES, HistoryWindow
+from services.prefix_cache import PrefixCacheTracker, prefix_cache
+from services.response_cache import cache_key, normalize_message
+from services.tool_dispatch import ToolDispatcher
+from services.model_warmup import keep_alive_for
 from tools.search_internet import search_internet
-from tools.file_tools import write_file, read_file, list_files_in_dir, get_current_dir
+from tools.file_tools import (
+    write_file,
+    edit_file,
+    apply_patch,
+    read_file,
+    write_files,
+    read_files,
+    get_file_info,
+    read_file_lines,
+    read_file_head,
+    read_file_tail,
+    read_file_range,
+    list_files_in_dir,
+    get_current_dir,
+)
+from tools.workspace_index import find_files, search_files
+from functools import lru_cache
+from uuid import uuid4
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-def create_agent(session_id: str) -> Agent:
+# Tools that change files: a reply whose run used one of them is never served from the response cache,
+# and their calls are not reordered with the other calls of the same turn.
+SIDE_EFFECT_TOOLS = frozenset({'write_file', 'edit_file', 'apply_patch', 'write_files'})
+
+
+class WindowedAgent(Agent):
+    '''Agent that sends a token-budgeted, append-only window of the session history instead of the last N runs verbatim.
+
+    With a `prefix_cache`, each prompt is also recorded there, so the share
+    of it Ollama serves from its KV cache can be measured.'''
+
+    def __init__(self, *args, history_window: HistoryWindow | None = None,
+                 prefix_cache: PrefixCacheTracker | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history_window = history_window
+        self.prefix_cache = prefix_cache
+
+    def _get_run_messages(self, *, session, add_history_to_context=None, **kwargs):
+        add_history = add_history_to_context if add_history_to_context is not None else self.add_history_to_context
+        if self.history_window is None:
+            run_messages = super()._get_run_messages(session=session, add_history_to_context=add_history, **kwargs)
+        else:
+            run_messages = super()._get_run_messages(session=session, add_history_to_context=False, **kwargs)
+            if add_history:
+                history = self.history_window.build(
+                    session.runs or [], max_runs=self.num_history_runs, session_id=session.session_id
+                )
+                # History goes where agno puts it: after the system and extra messages, before the new input.
+                position = (run_messages.system_message is not None) + len(run_messages.extra_messages or [])
+                run_messages.messages[position:position] = history
+        if self.prefix_cache is not None:
+            run_response = kwargs.get('run_response')
+            self.prefix_cache.prompt(
+                session.session_id, getattr(run_response, 'run_id', None), run_messages.messages, self._tools_for_model
+            )
+        return run_messages
+
+
+history_window = HistoryWindow(
+    token_budget=settings.HISTORY_TOKEN_BUDGET,
+    recent_runs=settings.HISTORY_RECENT_RUNS,
+    tool_result_tokens=settings.HISTORY_TOOL_RESULT_TOKENS,
+    summary_tokens=settings.HISTORY_SUMMARY_TOKENS,
+    compact_ratio=settings.HISTORY_COMPACT_RATIO,
+)
+
+
+@lru_cache(maxsize=None)
+def get_chat_history_db() -> SqliteDb:
+    '''Shared chat history store, so pooled agents reuse one engine instead of opening their own.'''
+    ensure_db_dirs()
+    return SqliteDb(db_engine=history_engine)
+
+
+def create_agent(session_id: str, model: str | None = None, host: str | None = None) -> Agent:
+    model = model or settings.MODEL
     logger.info(f"Creating agent for session_id: {session_id}")
-    agent = Agent(
-        model=Ollama(settings.MODEL), 
+    with AGENT_CONSTRUCTION_SECONDS.time(model=model):
+        agent = _build_agent(session_id, model, host)
+    logger.info(f"Agent created for session_id: {session_id}")
+    return agent
+
+
+tool_dispatcher = ToolDispatcher(
+    max_concurrent=settings.TOOL_MAX_CONCURRENCY,
+    max_workers=settings.TOOL_WORKERS,
+    side_effect_tools=SIDE_EFFECT_TOOLS,
+)
+
+
+def _build_agent(session_id: str, model: str, host: str | None = None) -> Agent:
+    return WindowedAgent(
+        model=Ollama(model, host=host, keep_alive=keep_alive_for(model)), 
         session_id=session_id,
-        tools=[search_internet, write_file, read_file, list_files_in_dir, get_current_dir],
-        db=SqliteDb(db_file="./db/chat_history.db"),
+        tools=[tool_dispatcher.offload(tool) for tool in [
+            search_internet,
+            write_file,
+            edit_file,
+            apply_patch,
+            read_file,
+            write_files,
+            read_files,
+            get_file_info,
+            read_file_lines,
+            read_file_head,
+            read_file_tail,
+            read_file_range,
+            list_files_in_dir,
+            find_files,
+            search_files,
+            get_current_dir,
+        ]],
+        # The dispatcher goes first, so the timing hook only measures the call itself, not its wait for a slot.
+        tool_hooks=[tool_dispatcher.hook, time_tool_call],
+        db=get_chat_history_db(),
         add_history_to_context=True, 
-        num_history_runs=5,  
+        num_history_runs=settings.HISTORY_MAX_RUNS,
+        history_window=history_window,
+        prefix_cache=prefix_cache,
         # instructions=agent_instructions
     )
-    logger.info(f"Agent created for session_id: {session_id}")
-    return agent
+
+
+agent_pool = AgentPool(
+    factory=create_agent,
+    max_size=settings.AGENT_POOL_SIZE,
+    ttl=settings.AGENT_POOL_TTL,
+)
+
+
+def get_agent(session_id: str, host: str | None = None, model: str | None = None) -> Agent:
+    '''Get the pooled agent for a session, rebuilding it if the model (`settings.MODEL` by default) or the Ollama host changed since it was built.'''
+    return agent_pool.get(session_id, model or settings.MODEL, host)
+
+
+def _tool_name(tool) -> str:
+    return getattr(tool, 'name', None) or getattr(tool, '__name__', type(tool).__name__)
+
+
+def _history_messages(agent: Agent, session: AgentSession) -> list[Message]:
+    '''The history the agent sends with the next turn of `session`.'''
+    history_window = getattr(agent, 'history_window', None)
+    if history_window is not None:
+        return history_window.build(session.runs or [], max_runs=agent.num_history_runs, session_id=session.session_id)
+    return [
+        message for run in session.runs or [] if run.status not in SKIPPED_STATUSES
+        for message in run.messages or [] if not message.from_history and message.role != 'system'
+    ]
+
+
+def response_cache_key(agent: Agent, session_id: str, message: str) -> str:
+    '''Response cache key of `message` sent to a session: the model, system prompt, normalized message,
+    the history that would be sent with it (by content, so sessions with the same conversation so far
+    share replies) and the tool set.
+
+    Reads the session from the chat history db, so it is best called off the event loop.'''
+    session = agent.get_session(session_id) or AgentSession(session_id=session_id)
+    system_message = agent.get_system_message(session=session)
+    return cache_key(
+        model=agent.model.id,
+        system=system_message.content if system_message is not None else None,
+        message=normalize_message(message),
+        history=[(turn.role, turn.get_content_string()) for turn in _history_messages(agent, session)],
+        tools=sorted(_tool_name(tool) for tool in agent.tools or []),
+    )
+
+
+def record_cached_turn(agent: Agent, session_id: str, message: str, response: str) -> None:
+    '''Add a turn answered from the response cache to the session, so later turns have it in their history.
+
+    Writes to the chat history db, so it is best called off the event loop.'''
+    session = agent._read_or_create_session(session_id=session_id)
+    session.upsert_run(RunOutput(
+        run_id=str(uuid4()),
+        agent_id=agent.id,
+        session_id=session_id,
+        model=agent.model.id,
+        content=response,
+        input=RunInput(input_content=message),
+        messages=[Message(role='user', content=message), Message(role='assistant', content=response)],
+        status=RunStatus.completed,
+        created_at=int(time.time()),
+        metadata={'cached': True},
+    ))
+    agent.save_session(session)
+
+
+def cacheable_response(run) -> bool:
+    '''Whether a finished run's reply may be served again: it completed and ran no tool with side effects.'''
+    if run.status != RunStatus.completed or not isinstance(run.content, str):
+        return False
+    return not any(tool.tool_name in SIDE_EFFECT_TOOLS for tool in run.tools or [])
@@ -0,0 +1,256 @@
+'''
+Server-sent event framing for streamed agent runs
+'''
+
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+import asyncio
+import json
+import time
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def encode_json(value: Any) -> str:
+    '''Compact JSON, through orjson when it is installed.'''
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def sse_frame(data: Any) -> str:
+    return f"data: {data if isinstance(data, str) else encode_json(data)}\n\n"
+
+
+def _dump_tool(tool) -> dict:
+    if hasattr(tool, 'model_dump'):
+        return tool.model_dump()
+    if hasattr(tool, 'to_dict'):
+        return tool.to_dict()
+    return dict(tool)
+
+
+def tool_calls_of(chunk) -> list[dict]:
+    tools = getattr(chunk, 'tool_calls', None) or []
+    if not tools and getattr(chunk, 'tool', None) is not None:
+        tools = [chunk.tool]
+    return [_dump_tool(tool) for tool in tools]
+
+
+def confirmation_of(chunk, session_id: str) -> dict | None:
+    '''The tool call a paused run waits on; its `tool_id` is what `POST /api/chat/confirm-tool` expects.'''
+    if not getattr(chunk, 'is_paused', False):
+        return None
+    tools = chunk.tools_requiring_confirmation or []
+    tool = next((tool for tool in tools if tool.confirmed is None), tools[0] if tools else None)
+    if tool is None:
+        return None
+    return {
+        "tool_name": tool.tool_name,
+        "tool_id": tool.tool_call_id,
+        "tool_args": tool.tool_args,
+        "run_id": getattr(chunk, 'run_id', None),
+        "session_id": session_id,
+        "confirmed": tool.confirmed,
+    }
+
+
+class QueuePosition:
+    '''Run event for a request still waiting for a generation slot.'''
+
+    content = ''
+
+    def __init__(self, position: int):
+        self.position = position
+
+    def sse_fields(self) -> dict:
+        return {"position": self.position}
+
+
+_END = object()
+_CANCELLED = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class SSECoalescer:
+    '''Turns a stream of agent run events into coalesced SSE frames.
+
+    Content is buffered and flushed as one frame when `flush_bytes` have
+    accumulated or `flush_interval` seconds have passed since the first
+    buffered token, so a fast model produces a frame every few tokens
+    instead of one per token. The first content is sent immediately to keep
+    time-to-first-token low. `tool_calls` and `tool_requiring_confirmation`
+    are only included in a frame when they change.
+
+    The run is read by a producer task into a queue of at most `max_pending`
+    events. While the client is slow to read, frames are not written, the
+    queue fills and the producer (and so the model stream) waits; whatever
+    piled up is sent as one frame once the client catches up.
+    '''
+
+    def __init__(
+        self,
+        session_id: str,
+        flush_interval: float = 0.02,
+        flush_bytes: int = 256,
+        max_pending: int = 64,
+        encode: Callable[[Any], str] = encode_json,
+    ):
+        self.session_id = session_id
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_pending = max_pending
+        self.encode = encode
+
+        self._content: list[str] = []
+        self._size = 0
+        self._type: str | None = None
+        self._sent_content = False
+        self._tool_calls: list[dict] = []
+        self._confirmation: dict | None = None
+        self._confirmation_key: tuple | None = None
+        self.producer: asyncio.Task | None = None
+
+    def _frame(self, content: str, chunk_type: str, tool_calls=None, confirmation=None, changed=(), fields=None) -> str:
+        data = {"content": content, "type": chunk_type, **(fields or {}), "session_id": self.session_id}
+        if 'tool_calls' in changed:
+            data["tool_calls"] = tool_calls
+        if 'tool_requiring_confirmation' in changed:
+            data["tool_requiring_confirmation"] = confirmation
+        return f"data: {self.encode(data)}\n\n"
+
+    def _flush(self) -> str | None:
+        if not self._content:
+            return None
+        frame = self._frame(''.join(self._content), self._type)
+        self._content.clear()
+        self._size = 0
+        self._sent_content = True
+        return frame
+
+    def feed(self, chunk) -> list[str]:
+        '''Add one run event and return the frames that are due because of it.'''
+        frames = []
+        chunk_type = type(chunk).__name__
+        if hasattr(chunk, 'sse_fields'):
+            # Events with their own fields are sent as they are, after any buffered text.
+            frames.extend(self.flush())
+            frames.append(self._frame('', chunk_type, fields=chunk.sse_fields()))
+            return frames
+        changed = []
+
+        tool_calls = tool_calls_of(chunk)
+        if tool_calls and tool_calls != self._tool_calls:
+            self._tool_calls = tool_calls
+            changed.append('tool_calls')
+        confirmation = confirmation_of(chunk, self.session_id)
+        confirmation_key = None if confirmation is None else (confirmation['tool_id'], confirmation['tool_name'], confirmation['confirmed'])
+        if confirmation_key != self._confirmation_key:
+            self._confirmation = confirmation
+            self._confirmation_key = confirmation_key
+            changed.append('tool_requiring_confirmation')
+
+        content = chunk.content if isinstance(chunk.content, str) else ''
+        if changed:
+            # Keep ordering: buffered text goes out before the event that follows it.
+            flushed = self._flush()
+            if flushed:
+                frames.append(flushed)
+            frames.append(self._frame(content, chunk_type, self._tool_calls, self._confirmation, changed))
+            self._sent_content = self._sent_content or bool(content)
+            return frames
+
+        if content:
+            self._content.append(content)
+            self._size += len(content.encode())
+            self._type = chunk_type
+            if not self._sent_content or self._size >= self.flush_bytes:
+                frames.append(self._flush())
+        return frames
+
+    def flush(self) -> list[str]:
+        flushed = self._flush()
+        return [flushed] if flushed else []
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._content)
+
+    def cancel(self) -> None:
+        '''Stop reading the run; the stream ends with a `RunCancelledEvent` frame.'''
+        if self.producer is not None:
+            self.producer.cancel()
+
+    async def stream(
+        self,
+        chunks: AsyncIterable,
+        on_start: Callable[[asyncio.Task], None] | None = None,
+    ) -> AsyncIterator[str]:
+        '''Yield SSE frames for `chunks`, ending with the `[DONE]` frame.
+
+        Exceptions raised by `chunks` are re-raised after the frames buffered
+        before them have been yielded. `on_start` is called with the task
+        reading `chunks` as soon as it exists; cancelling that task ends the
+        stream with a `RunCancelledEvent` frame.'''
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+
+        async def produce():
+            try:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+            except asyncio.CancelledError:
+                # Whatever is still queued belongs to the cancelled run.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_CANCELLED)
+            except Exception as e:
+                await queue.put(_Failure(e))
+            else:
+                await queue.put(_END)
+
+        producer = self.producer = asyncio.create_task(produce())
+        if on_start is not None:
+            on_start(producer)
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    async with asyncio.timeout(timeout):
+                        item = await queue.get()
+                except TimeoutError:
+                    for frame in self.flush():
+                        yield frame
+                    deadline = None
+                    continue
+
+                if item is _END or item is _CANCELLED or isinstance(item, _Failure):
+                    for frame in self.flush():
+                        yield frame
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    if item is _CANCELLED:
+                        yield self._frame('', 'RunCancelledEvent')
+                    break
+
+                for frame in self.feed(item):
+                    yield frame
+                if not self.pending:
+                    deadline = None
+                elif deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            yield "data: [DONE]\n\n"
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except (asyncio.CancelledError, Exception):
+                    pass
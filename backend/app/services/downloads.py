@@ -0,0 +1,276 @@
+'''
+Background model downloads that outlive the request that started them
+'''
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable
+from uuid import uuid4
+import asyncio
+import json
+import logging
+import os
+import time
+
+import ollama
+
+from core.config import settings
+from core.errors import OLLAMA_UNAVAILABLE_DETAIL
+from services.model_catalog import model_catalog
+from services.ollama_backends import BackendRegistry, OllamaBackend, ollama_backends
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ('queued', 'downloading')
+
+
+@dataclass
+class DownloadJob:
+    id: str
+    model: str
+    status: str = 'queued'
+    completed: int = 0
+    total: int = 0
+    error: str | None = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    # Per-host progress: {'completed': int, 'total': int, 'status': str}
+    hosts: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class DownloadManager:
+    '''Pulls models in background tasks and fans progress out to subscribers.
+
+    A pull of a model that is already being pulled attaches to the running
+    job instead of starting a second one. Each job pulls the model on every
+    reachable Ollama host at once, so any host can serve it; at most
+    `max_parallel` jobs run at a time and the rest wait as `queued`.
+
+    Progress is published at most once per `progress_interval` seconds (and
+    on every status change). Subscribers always see the latest state, so a
+    slow reader skips intermediate ticks instead of queueing them. Jobs are
+    saved to `path` as JSON when they start, change status and at shutdown
+    (not on every progress tick, which would write the file from the event
+    loop several times a second); unfinished jobs are resumed by `resume()`
+    after a restart, and Ollama continues from the layers it already has. A
+    job whose task ends without finishing it, other than at shutdown, is
+    marked failed.
+    '''
+
+    def __init__(
+        self,
+        backends: BackendRegistry,
+        path: str | None = None,
+        progress_interval: float = 0.5,
+        max_parallel: int = 2,
+        max_history: int = 50,
+        on_complete: Callable[[str], None] | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.backends = backends
+        self.path = Path(path) if path else None
+        self.progress_interval = progress_interval
+        self.max_parallel = max_parallel
+        self.max_history = max_history
+        self.on_complete = on_complete
+        self.clock = clock
+
+        self.jobs: dict[str, DownloadJob] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._updated: dict[str, asyncio.Event] = {}
+        self._published_at: dict[str, float] = {}
+        self._slots: asyncio.Semaphore | None = None
+        self._closing = False
+
+    def get(self, job_id: str) -> DownloadJob | None:
+        return self.jobs.get(job_id)
+
+    def recent(self) -> list[DownloadJob]:
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def active_job(self, model: str) -> DownloadJob | None:
+        return next((job for job in self.jobs.values() if job.model == model and job.active), None)
+
+    def start(self, model: str) -> DownloadJob:
+        '''Start pulling `model`, or return the job already pulling it.'''
+        job = self.active_job(model)
+        if job is not None:
+            logger.info(f"Attaching to running download {job.id} of {model}.")
+            return job
+        now = self.clock()
+        job = DownloadJob(id=uuid4().hex, model=model, created_at=now, updated_at=now)
+        self.jobs[job.id] = job
+        self._prune()
+        logger.info(f"Starting download {job.id} of {model}.")
+        self._launch(job)
+        self._save()
+        return job
+
+    def _prune(self) -> None:
+        finished = [job for job in self.recent() if not job.active]
+        for job in finished[self.max_history:]:
+            del self.jobs[job.id]
+
+    def _launch(self, job: DownloadJob) -> None:
+        self._updated[job.id] = asyncio.Event()
+        self._tasks[job.id] = task = asyncio.create_task(self._run(job))
+        task.add_done_callback(lambda task: self._ended(job, task))
+
+    def _ended(self, job: DownloadJob, task: asyncio.Task) -> None:
+        self._tasks.pop(job.id, None)
+        if task.cancelled():
+            if self._closing:
+                # Stopped for shutdown; stays unfinished and resumes on the next start.
+                return
+            error = 'The download was cancelled.'
+        elif task.exception() is not None:
+            error = str(task.exception()) or type(task.exception()).__name__
+            logger.error(f"Download {job.id} of {job.model} crashed: {task.exception()!r}")
+        else:
+            error = 'The download stopped unexpectedly.'
+        if job.active:
+            self._finish(job, 'failed', error)
+
+    async def _run(self, job: DownloadJob) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_parallel)
+        async with self._slots:
+            backends = [backend for backend in self.backends.backends if backend.available]
+            if not backends:
+                self._finish(job, 'failed', OLLAMA_UNAVAILABLE_DETAIL)
+                return
+            self._update(job, status='downloading')
+            results = await asyncio.gather(
+                *(self._pull(job, backend) for backend in backends), return_exceptions=True
+            )
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            self._finish(job, 'completed')
+            return
+        error = errors[0]
+        if isinstance(error, asyncio.CancelledError):
+            raise error
+        if isinstance(error, ollama.ResponseError):
+            detail = 'The model you tried to download does not exist.'
+        elif isinstance(error, ConnectionError):
+            detail = OLLAMA_UNAVAILABLE_DETAIL
+        else:
+            detail = str(error) or type(error).__name__
+        logger.error(f'Failed to download {job.model}: {error}')
+        self._finish(job, 'failed', detail)
+
+    async def _pull(self, job: DownloadJob, backend: OllamaBackend) -> None:
+        progress = job.hosts[backend.name] = {'completed': 0, 'total': 0, 'status': 'starting'}
+        try:
+            async for update in await backend.load_client.pull(job.model, stream=True):
+                progress['status'] = update.status or progress['status']
+                if update.total:
+                    progress['total'] = update.total
+                    progress['completed'] = update.completed or 0
+                self._update(job)
+        except BaseException:
+            progress['status'] = 'failed'
+            raise
+        progress['status'] = 'success'
+
+    def _update(self, job: DownloadJob, status: str | None = None) -> None:
+        job.completed = sum(host['completed'] for host in job.hosts.values())
+        job.total = sum(host['total'] for host in job.hosts.values())
+        now = self.clock()
+        job.updated_at = now
+        transition = status is not None and status != job.status
+        if transition:
+            job.status = status
+        elif now - self._published_at.get(job.id, 0.0) < self.progress_interval:
+            return
+        self._published_at[job.id] = now
+        logger.debug("Download %s of %s: %s/%s bytes", job.id, job.model, job.completed, job.total)
+        self._publish(job, save=transition)
+
+    def _finish(self, job: DownloadJob, status: str, error: str | None = None) -> None:
+        job.error = error
+        self._update(job, status=status)
+        self._published_at.pop(job.id, None)
+        self._updated.pop(job.id, None)
+        if status == 'completed':
+            logger.info(f"Downloaded {job.model}.")
+            if self.on_complete is not None:
+                self.on_complete(job.model)
+
+    def _publish(self, job: DownloadJob, save: bool = False) -> None:
+        event = self._updated.get(job.id)
+        if event is not None:
+            event.set()
+        self._updated[job.id] = asyncio.Event()
+        if save:
+            self._save()
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[dict]:
+        '''Yield the job's state now and after each published update, until it finishes.'''
+        job = self.jobs[job_id]
+        while True:
+            updated = self._updated.get(job_id)
+            yield job.as_dict()
+            if not job.active or updated is None:
+                return
+            await updated.wait()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(self.path.suffix + '.tmp')
+            temporary.write_text(json.dumps([job.as_dict() for job in self.jobs.values()]))
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save download state to {self.path}: {e}")
+
+    def load(self) -> None:
+        '''Read the jobs saved by a previous run.'''
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            saved = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read download state from {self.path}: {e}")
+            return
+        for entry in saved:
+            job = DownloadJob(**entry)
+            self.jobs.setdefault(job.id, job)
+
+    def resume(self) -> list[DownloadJob]:
+        '''Load saved jobs and restart the ones that had not finished.'''
+        self.load()
+        resumed = [job for job in self.jobs.values() if job.active and job.id not in self._tasks]
+        for job in resumed:
+            logger.info(f"Resuming download {job.id} of {job.model}.")
+            job.status = 'queued'
+            self._launch(job)
+        return resumed
+
+    async def close(self) -> None:
+        '''Stop running pulls; they stay saved as unfinished and resume on the next start.'''
+        self._closing = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._save()
+
+
+download_manager = DownloadManager(
+    ollama_backends,
+    path=settings.DOWNLOADS_STATE_PATH,
+    progress_interval=settings.DOWNLOAD_PROGRESS_INTERVAL,
+    max_parallel=settings.DOWNLOAD_MAX_PARALLEL,
+    on_complete=lambda model: model_catalog.invalidate(),
+)
@@ -0,0 +1,235 @@
+'''
+Token-budgeted, append-only chat history: turns verbatim until compacted into summaries
+'''
+
+from collections import OrderedDict
+from typing import Any, Iterable
+import json
+import logging
+
+from agno.models.message import Message
+from agno.run.base import RunStatus
+
+from services.search_compaction import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Unfinished runs are skipped as well, so a cached form never goes stale.
+SKIPPED_STATUSES = (RunStatus.pending, RunStatus.running, RunStatus.paused, RunStatus.cancelled, RunStatus.error)
+
+
+def _text(content: Any) -> str:
+    if content is None:
+        return ''
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, default=str)
+
+
+def truncate(text: str, max_tokens: int, label: str = 'content') -> str:
+    '''Cut `text` to about `max_tokens`, saying how much was left out.'''
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens * CHARS_PER_TOKEN
+    return f'{text[:keep]}\n[... {len(text) - keep} more characters of {label} omitted]'
+
+
+def _shorten_arguments(arguments: Any, max_tokens: int) -> Any:
+    if isinstance(arguments, str):
+        return truncate(arguments, max_tokens, 'arguments')
+    if isinstance(arguments, dict):
+        return {key: _shorten_arguments(value, max_tokens) for key, value in arguments.items()}
+    return arguments
+
+
+def _shorten_tool_calls(tool_calls: list[dict], max_tokens: int) -> list[dict]:
+    shortened = []
+    for call in tool_calls:
+        function = call.get('function') or {}
+        if 'arguments' in function:
+            call = {**call, 'function': {**function, 'arguments': _shorten_arguments(function['arguments'], max_tokens)}}
+        shortened.append(call)
+    return shortened
+
+
+def _describe_call(call: dict) -> str:
+    function = call.get('function') or {}
+    arguments = function.get('arguments') or {}
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except ValueError:
+            arguments = {}
+    # Short arguments (paths, queries) say what the call was about; long ones (file contents) are left out.
+    shown = ', '.join(
+        f'{key}={value!r}' for key, value in arguments.items() if isinstance(value, (str, int, float)) and len(str(value)) <= 80
+    )
+    return f"{function.get('name', 'tool')}({shown})"
+
+
+def message_tokens(message: Message) -> int:
+    tokens = estimate_tokens(_text(message.content)) + 4
+    if message.tool_calls:
+        tokens += estimate_tokens(json.dumps(message.tool_calls, default=str))
+    return tokens
+
+
+# The last compaction of a session: the newest run it dropped, then (run_id, form) of each run it kept.
+Layout = tuple[str | None, tuple[tuple[str, str], ...]]
+
+
+class HistoryWindow:
+    '''Builds the history sent with each turn within `token_budget` tokens.
+
+    Runs are sent verbatim, except that tool results and tool-call arguments
+    longer than `tool_result_tokens` are truncated, and the history of a
+    session only grows by appending the run that just finished. That keeps
+    the prompt prefix byte-identical from one turn to the next, so Ollama can
+    reuse its KV cache instead of evaluating the whole history again.
+
+    Once the history would exceed `token_budget` tokens or `max_runs` runs,
+    it is compacted: the newest `recent_runs` runs stay verbatim, older runs
+    are replaced by a short user/assistant pair that quotes the start of the
+    question and answer and lists the tools used, and the oldest are dropped
+    until only `compact_ratio` of the budget (and of `max_runs`) is used. A
+    recent run that does not fit verbatim falls back to its summary. The
+    layout chosen by a compaction is kept per session, so the prefix changes
+    once per compaction rather than on every turn.
+
+    Both forms are computed once per run and cached by run id, so each turn
+    only processes the run that just finished.
+    '''
+
+    def __init__(
+        self,
+        token_budget: int = 4000,
+        recent_runs: int = 2,
+        tool_result_tokens: int = 500,
+        summary_tokens: int = 150,
+        compact_ratio: float = 0.5,
+        max_cached_runs: int = 2048,
+        max_sessions: int = 4096,
+    ):
+        self.token_budget = token_budget
+        self.recent_runs = recent_runs
+        self.tool_result_tokens = tool_result_tokens
+        self.summary_tokens = summary_tokens
+        self.compact_ratio = compact_ratio
+        self.max_cached_runs = max_cached_runs
+        self.max_sessions = max_sessions
+        self._cache: OrderedDict[tuple[str, str], tuple[list[Message], int]] = OrderedDict()
+        self._layouts: OrderedDict[str, Layout] = OrderedDict()
+
+    def _cached(self, run, form: str, build) -> tuple[list[Message], int]:
+        key = (run.run_id, form)
+        entry = self._cache.get(key) if run.run_id else None
+        if entry is not None:
+            self._cache.move_to_end(key)
+            return entry
+        messages = build(run)
+        entry = (messages, sum(message_tokens(message) for message in messages))
+        if run.run_id:
+            self._cache[key] = entry
+            while len(self._cache) > self.max_cached_runs:
+                self._cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _conversation(run) -> list[Message]:
+        return [
+            message for message in run.messages or []
+            if not message.from_history and message.role != 'system'
+        ]
+
+    def _verbatim(self, run) -> list[Message]:
+        messages = []
+        for message in self._conversation(run):
+            update: dict[str, Any] = {'from_history': True}
+            if message.role == 'tool':
+                update['content'] = truncate(_text(message.content), self.tool_result_tokens, f'{message.tool_name or "tool"} output')
+            if message.tool_calls:
+                update['tool_calls'] = _shorten_tool_calls(message.tool_calls, self.tool_result_tokens)
+            messages.append(message.model_copy(update=update))
+        return messages
+
+    def _summary(self, run) -> list[Message]:
+        conversation = self._conversation(run)
+        question = next((_text(m.content) for m in conversation if m.role == 'user'), '')
+        answer = next((_text(m.content) for m in reversed(conversation) if m.role == 'assistant' and m.content), '')
+        calls = [_describe_call(call) for m in conversation if m.tool_calls for call in m.tool_calls]
+        half = max(self.summary_tokens // 2, 1)
+        reply = truncate(answer, half, 'the answer')
+        if calls:
+            reply += f"\n[Tools used: {', '.join(calls)}]"
+        if not question and not reply:
+            return []
+        return [
+            Message(role='user', content=truncate(question, half, 'the message'), from_history=True),
+            Message(role='assistant', content=reply, from_history=True),
+        ]
+
+    def _form(self, run, form: str) -> tuple[list[Message], int]:
+        return self._cached(run, form, self._verbatim if form == 'verbatim' else self._summary)
+
+    def _extend(self, runs: list, layout: Layout | None) -> list[tuple[list[Message], int]] | None:
+        '''The previous layout with the runs finished since appended verbatim, or None if it no longer applies.'''
+        dropped_through, kept = layout or (None, ())
+        run_ids = [run.run_id for run in runs]
+        try:
+            start = run_ids.index(dropped_through) + 1 if dropped_through else 0
+        except ValueError:
+            return None
+        if tuple(run_ids[start:start + len(kept)]) != tuple(run_id for run_id, _ in kept):
+            return None
+        forms = [form for _, form in kept]
+        forms += ['verbatim'] * (len(runs) - start - len(forms))
+        return [self._form(run, form) for run, form in zip(runs[start:], forms)]
+
+    def _compact(self, runs: list, max_runs: int | None) -> tuple[Layout, list[tuple[list[Message], int]]]:
+        budget = int(self.token_budget * self.compact_ratio)
+        limit = len(runs) if max_runs is None else max(int(max_runs * self.compact_ratio), 1)
+        layout: list[tuple[str, str]] = []
+        window: list[tuple[list[Message], int]] = []
+        used = 0
+        for age, run in enumerate(reversed(runs[-limit:])):
+            form, (messages, tokens) = 'summary', ([], 0)
+            if age < self.recent_runs:
+                form, (messages, tokens) = 'verbatim', self._form(run, 'verbatim')
+            if not messages or used + tokens > budget:
+                form, (messages, tokens) = 'summary', self._form(run, 'summary')
+            if used + tokens > budget:
+                break
+            layout.append((run.run_id, form))
+            window.append((messages, tokens))
+            used += tokens
+        dropped = len(runs) - len(layout)
+        return (runs[dropped - 1].run_id if dropped else None, tuple(reversed(layout))), list(reversed(window))
+
+    def build(self, runs: Iterable, max_runs: int | None = None, session_id: str | None = None) -> list[Message]:
+        '''History messages for the next turn, oldest first.
+
+        Pass `session_id` to keep the history append-only across turns of a
+        session; without it every call starts from a fresh layout.'''
+        eligible = [run for run in runs if getattr(run, 'status', None) not in SKIPPED_STATUSES and run.messages]
+        if max_runs is not None and max_runs <= 0:
+            return []
+
+        layout = self._layouts.get(session_id) if session_id else None
+        window = self._extend(eligible, layout)
+        if (
+            window is None
+            or sum(tokens for _, tokens in window) > self.token_budget
+            or (max_runs is not None and len(window) > max_runs)
+        ):
+            layout, window = self._compact(eligible, max_runs)
+            logger.debug(f"History window of {session_id} compacted to {len(window)} of {len(eligible)} runs")
+        if session_id and layout is not None:
+            self._layouts[session_id] = layout
+            self._layouts.move_to_end(session_id)
+            while len(self._layouts) > self.max_sessions:
+                self._layouts.popitem(last=False)
+
+        used = sum(tokens for _, tokens in window)
+        logger.debug(f"History window: {len(window)} of {len(eligible)} runs, ~{used} tokens")
+        # Copies, so nothing agno does to the run's messages leaks into the cache.
+        return [message.model_copy() for messages, _ in window for message in messages]
@@ -0,0 +1,100 @@
+'''
+In-process cache of the models installed in Ollama
+'''
+
+from typing import Any, Awaitable, Callable
+import asyncio
+import logging
+import time
+
+from core.config import settings
+from services.ollama_backends import ollama_backends
+
+logger = logging.getLogger(__name__)
+
+
+async def list_installed_models():
+    '''Async counterpart of `ollama_services.get_all_models`, across every configured Ollama host.'''
+    return await ollama_backends.list_models()
+
+
+def format_model(model) -> dict[str, Any]:
+    return {'name': model.model, 'size': model.size, 'param_size': model.details.parameter_size}
+
+
+class ModelCatalog:
+    '''Installed models indexed by name, refreshed from Ollama at most once per `ttl` seconds.
+
+    `invalidate()` forces the next read to refresh, e.g. after a pull completes.
+    Concurrent readers of a stale catalog share a single refresh.
+    '''
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[Any]] = list_installed_models,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+        self._models: dict[str, dict[str, Any]] = {}
+        self._expires_at: float | None = None
+        self._lock: asyncio.Lock | None = None
+
+    def is_stale(self) -> bool:
+        return self._expires_at is None or self.clock() >= self._expires_at
+
+    def invalidate(self) -> None:
+        self._expires_at = None
+
+    async def refresh(self) -> dict[str, dict[str, Any]]:
+        '''Reload the catalog from Ollama, updating entries in place.
+
+        Raises
+        ------
+        - `ConnectionError` if Ollama is not reachable.'''
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # A concurrent caller may already have refreshed while we waited.
+            if not self.is_stale():
+                return self._models
+
+            response = await self.loader()
+            fresh = {model.model: format_model(model) for model in response.models}
+
+            for name in self._models.keys() - fresh.keys():
+                logger.debug(f"Model removed from catalog: {name}")
+                del self._models[name]
+            for name, entry in fresh.items():
+                if self._models.get(name) != entry:
+                    logger.debug(f"Model added or updated in catalog: {name}")
+                    self._models[name] = entry
+
+            self._expires_at = self.clock() + self.ttl
+            return self._models
+
+    async def models(self) -> dict[str, dict[str, Any]]:
+        if self.is_stale():
+            return await self.refresh()
+        return self._models
+
+    async def list(self) -> list[dict[str, Any]]:
+        return list((await self.models()).values())
+
+    async def get(self, name: str, refresh_on_miss: bool = False) -> dict[str, Any] | None:
+        '''Look up a model by name.
+
+        With `refresh_on_miss`, a miss triggers one forced refresh so models
+        pulled outside of this app are still found.'''
+
+        model = (await self.models()).get(name)
+        if model is None and refresh_on_miss:
+            self.invalidate()
+            model = (await self.refresh()).get(name)
+        return model
+
+
+model_catalog = ModelCatalog(ttl=settings.MODEL_CATALOG_TTL)
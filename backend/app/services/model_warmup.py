@@ -0,0 +1,94 @@
+'''
+Pre-loads models into Ollama and sets how long they stay loaded
+'''
+
+from typing import Iterable
+import asyncio
+import logging
+import time
+
+from core.config import settings
+from core.metrics import MODEL_WARMUP_SECONDS
+from services.ollama_backends import BackendRegistry, OllamaBackend, ollama_backends
+
+logger = logging.getLogger(__name__)
+
+
+def keep_alive_for(model: str) -> str:
+    '''How long Ollama keeps `model` loaded after a request, e.g. `30m`; a negative duration never unloads it.'''
+    return settings.MODEL_KEEP_ALIVE.get(model, settings.OLLAMA_KEEP_ALIVE)
+
+
+class ModelWarmer:
+    '''Loads models ahead of the first chat so it does not pay the load time.
+
+    A warm-up is an empty `generate` request, which makes Ollama load the
+    model and return without generating. It goes to the host the router
+    would pick for the model, so the following chats land where the model
+    is loaded. Concurrent warm-ups of the same model on the same host share
+    one request.
+    '''
+
+    def __init__(self, backends: BackendRegistry, timeout: float = 300.0):
+        self.backends = backends
+        self.timeout = timeout
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        self._scheduled: set[asyncio.Task] = set()
+
+    async def warm(self, model: str, backend: OllamaBackend | None = None) -> OllamaBackend:
+        '''Load `model` and wait until it is resident.
+
+        Raises
+        ------
+        - `ConnectionError` if no host is reachable.
+        - `ollama.ResponseError` if the model is not installed on the chosen host.'''
+
+        backend = backend or await self.backends.route(model)
+        key = (backend.name, model)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._load(backend, model))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        await asyncio.shield(task)
+        return backend
+
+    async def _load(self, backend: OllamaBackend, model: str) -> None:
+        logger.info(f"Warming up {model} on {backend.name}.")
+        result = 'error'
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                backend.load_client.generate(model=model, prompt='', keep_alive=keep_alive_for(model)),
+                timeout=self.timeout,
+            )
+            result = 'ok'
+        finally:
+            elapsed = time.perf_counter() - started
+            MODEL_WARMUP_SECONDS.observe(elapsed, model=model, result=result)
+        backend.loaded.add(model)
+        logger.info(f"{model} is loaded on {backend.name} after {elapsed:.2f}s.")
+
+    def schedule(self, model: str) -> asyncio.Task:
+        '''Warm `model` in the background; failures are logged, not raised.'''
+        task = asyncio.create_task(self._warm_quietly(model))
+        self._scheduled.add(task)
+        task.add_done_callback(self._scheduled.discard)
+        return task
+
+    def schedule_all(self, models: Iterable[str]) -> list[asyncio.Task]:
+        return [self.schedule(model) for model in dict.fromkeys(models)]
+
+    async def _warm_quietly(self, model: str) -> None:
+        try:
+            await self.warm(model)
+        except Exception as e:
+            logger.warning(f"Could not warm up {model}: {e}")
+
+    async def close(self) -> None:
+        tasks = list(self._scheduled) + list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+model_warmer = ModelWarmer(ollama_backends, timeout=settings.MODEL_WARMUP_TIMEOUT)
@@ -0,0 +1,242 @@
+'''
+Registry of Ollama hosts with load- and model-aware routing
+'''
+
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable
+import asyncio
+import logging
+
+import ollama
+
+from core.config import settings
+from core.metrics import OLLAMA_BACKEND_REQUESTS
+from services.ollama_monitor import OllamaMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaBackend:
+    '''One Ollama host: its liveness monitor, pooled client and request counters.
+
+    The monitor's probe lists the models loaded on the host (`ps`), so every
+    health check also refreshes `loaded`, which routing uses for model affinity.
+    '''
+
+    def __init__(
+        self,
+        host: str | None = None,
+        monitor: OllamaMonitor | None = None,
+        client_factory: Callable[..., Any] = ollama.AsyncClient,
+        **monitor_options,
+    ):
+        self.host = host
+        self.name = host or 'default'
+        self.client_factory = client_factory
+        self.monitor = monitor or OllamaMonitor(host=host, probe=self._ps, **monitor_options)
+
+        self.loaded: set[str] = set()
+        self.outstanding = 0
+        # Outstanding generations per model, for the per-host concurrency limits
+        self.generating: dict[str, int] = {}
+        self.requests = 0
+        self.failures = 0
+        self._client = None
+        self._load_client = None
+
+    @property
+    def client(self):
+        '''Client for quick calls (`ps`, `list`), with the health-check timeout.'''
+        if self._client is None:
+            self._client = self.client_factory(host=self.host, timeout=self.monitor.timeout)
+        return self._client
+
+    @property
+    def load_client(self):
+        '''Client without a timeout, for model loads that can take minutes.'''
+        if self._load_client is None:
+            self._load_client = self.client_factory(host=self.host, timeout=None)
+        return self._load_client
+
+    async def _ps(self):
+        response = await self.client.ps()
+        self.loaded = {model.model for model in response.models}
+        return response
+
+    @property
+    def available(self) -> bool:
+        '''Not known to be down; an unchecked host is given a chance.'''
+        return self.monitor.alive is not False
+
+    def status(self) -> dict:
+        return {
+            'host': self.name,
+            **self.monitor.status(),
+            'outstanding': self.outstanding,
+            'generating': dict(self.generating),
+            'requests': self.requests,
+            'failures': self.failures,
+            'loaded_models': sorted(self.loaded),
+        }
+
+
+class BackendRegistry:
+    '''Routes generations across several Ollama hosts.
+
+    `pick` prefers, in order: hosts that are up and below the per-host `limit`
+    of generations of the model, hosts within `affinity_slack` outstanding
+    requests of the least busy one, hosts that already have the
+    model loaded (so it is not loaded a second time elsewhere), the host the
+    session used last (its agent and Ollama's prompt cache are warm there), and
+    finally the fewest outstanding requests. A request that fails with a
+    `ConnectionError` marks its host down until the host's monitor sees it
+    come back, so it receives no traffic in the meantime.
+    '''
+
+    def __init__(self, backends: Iterable[OllamaBackend], affinity_slack: int = 2):
+        self.backends = list(backends)
+        if not self.backends:
+            raise ValueError('At least one Ollama backend is required')
+        self.affinity_slack = affinity_slack
+
+    @classmethod
+    def from_hosts(cls, hosts: Iterable[str | None], affinity_slack: int = 2, **monitor_options) -> 'BackendRegistry':
+        return cls([OllamaBackend(host, **monitor_options) for host in hosts], affinity_slack=affinity_slack)
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def get(self, host: str | None) -> OllamaBackend | None:
+        return next((backend for backend in self.backends if backend.host == host), None)
+
+    def available_count(self) -> int:
+        return sum(backend.available for backend in self.backends)
+
+    def pick(self, model: str, prefer: str | None = None, limit: int | None = None) -> OllamaBackend | None:
+        '''Choose a host for `model` from the cached health state, or `None` if every host is down.
+
+        Hosts already running `limit` generations of `model` are only chosen if every host is.'''
+        candidates = [backend for backend in self.backends if backend.available]
+        if not candidates:
+            return None
+        least = min(backend.outstanding for backend in candidates)
+        return min(candidates, key=lambda backend: (
+            limit is not None and backend.generating.get(model, 0) >= limit,
+            backend.outstanding > least + self.affinity_slack,
+            model not in backend.loaded,
+            backend.host != prefer,
+            backend.outstanding,
+            backend.requests,
+        ))
+
+    async def route(self, model: str, prefer: str | None = None, limit: int | None = None) -> OllamaBackend:
+        '''Like `pick`, but first re-probes hosts whose cached state is missing or stale.
+
+        Call `track` with the result before awaiting anything else, so that
+        concurrent routes see the generation counted against its host.
+
+        Raises
+        ------
+        - `ConnectionError` if no host is reachable.'''
+
+        await asyncio.gather(*(backend.monitor.is_alive() for backend in self.backends))
+        backend = self.pick(model, prefer, limit)
+        if backend is None:
+            raise ConnectionError('No Ollama host is reachable.')
+        return backend
+
+    async def is_alive(self) -> bool:
+        '''Whether at least one host is up.'''
+        return any(await asyncio.gather(*(backend.monitor.is_alive() for backend in self.backends)))
+
+    async def list_models(self) -> ollama.ListResponse:
+        '''Models installed on any reachable host, each listed once.
+
+        Raises
+        ------
+        - `ConnectionError` if no host could be listed.'''
+
+        results = await asyncio.gather(
+            *(backend.client.list() for backend in self.backends if backend.available), return_exceptions=True
+        )
+        responses = [result for result in results if not isinstance(result, BaseException)]
+        if not responses:
+            errors = [result for result in results if isinstance(result, BaseException)]
+            raise ConnectionError(str(errors[0]) if errors else 'No Ollama host is reachable.')
+        models = {}
+        for response in responses:
+            for model in response.models:
+                models.setdefault(model.model, model)
+        return ollama.ListResponse(models=list(models.values()))
+
+    async def loaded_models(self) -> list[dict]:
+        '''Models currently in memory on each reachable host, refreshing the affinity state on the way.'''
+        backends = [backend for backend in self.backends if backend.available]
+        results = await asyncio.gather(*(backend._ps() for backend in backends), return_exceptions=True)
+        loaded = []
+        for backend, result in zip(backends, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Could not list loaded models on {backend.name}: {result}")
+                continue
+            loaded.extend({
+                'host': backend.name,
+                'name': model.model,
+                'size': model.size,
+                'size_vram': model.size_vram,
+                'expires_at': model.expires_at,
+            } for model in result.models)
+        return loaded
+
+    @contextmanager
+    def track(self, backend: OllamaBackend, model: str):
+        '''Count a generation against `backend` for as long as the `with` block runs.'''
+        backend.outstanding += 1
+        backend.generating[model] = backend.generating.get(model, 0) + 1
+        backend.requests += 1
+        # Ollama loads the model on first use; keep routing it here.
+        backend.loaded.add(model)
+        result = 'ok'
+        try:
+            yield backend
+        except ConnectionError as e:
+            result = 'error'
+            backend.failures += 1
+            backend.monitor.record(False, str(e) or type(e).__name__)
+            logger.warning(f"Ejected Ollama host {backend.name} after a failed request: {e}")
+            raise
+        finally:
+            backend.outstanding -= 1
+            backend.generating[model] -= 1
+            if not backend.generating[model]:
+                del backend.generating[model]
+            OLLAMA_BACKEND_REQUESTS.inc(host=backend.name, result=result)
+
+    def start(self) -> None:
+        for backend in self.backends:
+            backend.monitor.start()
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(backend.monitor.stop() for backend in self.backends))
+
+    def status(self) -> dict:
+        '''Combined liveness (up if any host is up) plus per-host stats.'''
+        hosts = [backend.status() for backend in self.backends]
+        checked = [host['last_checked'] for host in hosts if host['last_checked'] is not None]
+        alive = any(host['alive'] for host in hosts)
+        return {
+            'alive': alive,
+            'last_checked': max(checked, default=None),
+            'consecutive_failures': min(host['consecutive_failures'] for host in hosts),
+            'last_error': None if alive else next((host['last_error'] for host in hosts if host['last_error']), None),
+            'hosts': hosts,
+        }
+
+
+ollama_backends = BackendRegistry.from_hosts(
+    settings.OLLAMA_HOSTS or [None],
+    affinity_slack=settings.OLLAMA_AFFINITY_SLACK,
+    interval=settings.OLLAMA_HEALTH_INTERVAL,
+    max_backoff=settings.OLLAMA_HEALTH_MAX_BACKOFF,
+    timeout=settings.OLLAMA_HEALTH_TIMEOUT,
+    max_age=settings.OLLAMA_HEALTH_MAX_AGE,
+)
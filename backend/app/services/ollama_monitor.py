@@ -0,0 +1,128 @@
+'''
+Background liveness monitor for Ollama
+'''
+
+from typing import Awaitable, Callable
+import asyncio
+import logging
+import time
+
+import ollama
+
+from core.metrics import OLLAMA_HEALTH_CHECK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaMonitor:
+    '''Keeps a cached up/down state for an Ollama host.
+
+    A background task probes the host every `interval` seconds while it is up
+    and backs off exponentially (up to `max_backoff`) while it is down, so
+    request handlers can read `alive` without paying for a round-trip. On-demand
+    checks are single-flight: concurrent callers share one in-flight probe.
+    '''
+
+    def __init__(
+        self,
+        host: str | None = None,
+        probe: Callable[[], Awaitable[object]] | None = None,
+        interval: float = 10.0,
+        max_backoff: float = 60.0,
+        timeout: float = 2.0,
+        max_age: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.host = host
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.max_age = max_age
+        self.clock = clock
+        self._probe = probe or self._ps
+
+        self.alive: bool | None = None
+        self.last_checked: float | None = None
+        self.last_error: str | None = None
+        self.consecutive_failures = 0
+
+        self._client: ollama.AsyncClient | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _ps(self):
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.host, timeout=self.timeout)
+        return await self._client.ps()
+
+    def is_fresh(self) -> bool:
+        return self.last_checked is not None and self.clock() - self.last_checked <= self.max_age
+
+    def record(self, alive: bool, error: str | None = None) -> None:
+        '''Update the cached state, e.g. after a request observed a `ConnectionError`.'''
+        if alive != self.alive:
+            logger.info(f"Ollama at {self.host or 'default host'} is now {'up' if alive else 'down'}.")
+        self.alive = alive
+        self.last_checked = self.clock()
+        self.last_error = error
+        self.consecutive_failures = 0 if alive else self.consecutive_failures + 1
+
+    async def check(self) -> bool:
+        '''Probe Ollama now, sharing the probe with any concurrent caller.'''
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        started = self.last_checked
+        async with self._lock:
+            # Another caller finished a probe while we waited for the lock.
+            if self.last_checked != started and self.alive is not None:
+                return self.alive
+            probe_started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._probe(), timeout=self.timeout)
+            except Exception as e:
+                self.record(False, str(e) or type(e).__name__)
+            else:
+                self.record(True)
+            OLLAMA_HEALTH_CHECK_SECONDS.observe(
+                time.perf_counter() - probe_started, result='up' if self.alive else 'down'
+            )
+            return self.alive
+
+    async def is_alive(self) -> bool:
+        '''Return the cached state, probing only when it is missing or older than `max_age`.'''
+        if self.is_fresh():
+            return self.alive
+        return await self.check()
+
+    def next_delay(self) -> float:
+        if not self.consecutive_failures:
+            return self.interval
+        return min(self.interval * 2 ** (self.consecutive_failures - 1), self.max_backoff)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.next_delay())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            'alive': bool(self.alive),
+            'last_checked': self.last_checked,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+        }
+
@@ -0,0 +1,127 @@
+'''
+Runs paused until the user confirms a tool call, parked outside any request
+'''
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+import json
+import logging
+import os
+import time
+
+from agno.models.response import ToolExecution
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PausedRun:
+    session_id: str
+    run_id: str
+    model: str
+    # ToolExecution.to_dict() of every tool call of the run; agno needs all of them back to continue it.
+    tools: list[dict] = field(default_factory=list)
+    paused_at: float = 0.0
+
+    def waiting(self) -> list[dict]:
+        '''The tool calls still waiting for a confirmation.'''
+        return [tool for tool in self.tools if tool.get('requires_confirmation') and tool.get('confirmed') is None]
+
+    def confirm(self, tool_id: str, confirmed: bool) -> bool:
+        '''Record the answer for a waiting tool call; False if no waiting call has this id.'''
+        for tool in self.waiting():
+            if tool.get('tool_call_id') == tool_id:
+                tool['confirmed'] = confirmed
+                return True
+        return False
+
+    def tool_executions(self) -> list[ToolExecution]:
+        return [ToolExecution.from_dict(tool) for tool in self.tools]
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class PausedRunStore:
+    '''The paused run of each session, until it is confirmed and resumed.
+
+    A run that pauses for a tool confirmation has already been saved by agno
+    with everything needed to continue it, so parking it here costs one
+    small record: no task, agent or connection is held while the user makes
+    up their mind. Records are saved to `path` as JSON, so confirmations
+    still work after a restart, and are dropped after `ttl` seconds.
+    '''
+
+    def __init__(self, path: str | None = None, ttl: float = 86400.0, clock: Callable[[], float] = time.time):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.clock = clock
+        self.runs: dict[str, PausedRun] = {}
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    def park(self, session_id: str, model: str, run) -> PausedRun:
+        '''Keep a paused run (a paused `RunOutput` or `RunPausedEvent`) of a session, replacing an older one.'''
+        paused = PausedRun(
+            session_id=session_id,
+            run_id=run.run_id,
+            model=model,
+            tools=[tool.to_dict() for tool in run.tools or []],
+            paused_at=self.clock(),
+        )
+        self.runs[session_id] = paused
+        logger.info(f"Run {paused.run_id} of {session_id} is waiting for {len(paused.waiting())} tool confirmation(s).")
+        self.save()
+        return paused
+
+    def get(self, session_id: str) -> PausedRun | None:
+        paused = self.runs.get(session_id)
+        if paused is not None and self.clock() - paused.paused_at > self.ttl:
+            logger.info(f"Dropping run {paused.run_id} of {session_id}: not confirmed within {self.ttl:.0f}s.")
+            self.take(session_id)
+            return None
+        return paused
+
+    def take(self, session_id: str) -> PausedRun | None:
+        '''Remove and return the paused run of a session, e.g. to resume it.'''
+        paused = self.runs.pop(session_id, None)
+        if paused is not None:
+            self.save()
+        return paused
+
+    def restore(self, paused: PausedRun) -> None:
+        '''Put back a run that was taken but could not be resumed, unless the session paused again since.'''
+        if paused.session_id not in self.runs:
+            self.runs[paused.session_id] = paused
+            self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(self.path.suffix + '.tmp')
+            temporary.write_text(json.dumps([paused.as_dict() for paused in self.runs.values()]))
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save paused runs to {self.path}: {e}")
+
+    def load(self) -> None:
+        '''Read the runs parked before a restart.'''
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            saved = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read paused runs from {self.path}: {e}")
+            return
+        for entry in saved:
+            paused = PausedRun(**entry)
+            self.runs.setdefault(paused.session_id, paused)
+
+
+paused_runs = PausedRunStore(path=settings.PAUSED_RUNS_PATH, ttl=settings.PAUSED_RUN_TTL)
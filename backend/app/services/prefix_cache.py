@@ -0,0 +1,92 @@
+'''
+Keeps track of how much of each chat prompt Ollama can reuse from its KV cache
+'''
+
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Iterable
+import json
+import logging
+
+from agno.models.message import Message
+
+from core.metrics import PREFIX_CACHE_HIT_RATIO, PROMPT_EVAL_TOKENS, PROMPT_PREFIX_CHANGES, PROMPT_TOKENS
+from services.history_window import message_tokens
+from services.search_compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_tools(tools: Iterable[dict] | None) -> str:
+    '''Tool schemas as JSON with sorted keys, so equal schemas always serialize to the same bytes.'''
+    return json.dumps(list(tools or []), sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _digest(text: str) -> str:
+    return sha256(text.encode()).hexdigest()
+
+
+class PrefixCacheTracker:
+    '''Checks that a session's prompt prefix stays stable and measures how much of it Ollama reuses.
+
+    Ollama keeps the KV cache of the prompts it evaluated and only evaluates
+    the tokens after the longest prefix it already has; its
+    `prompt_eval_count` counts just those. Comparing that count with the
+    estimated size of the whole prompt gives the share served from the
+    cache. The estimate uses the same ~4 characters per token as the history
+    budget, so the ratio is approximate.
+
+    The system prompt and tool schemas of each session are fingerprinted;
+    when either changes between turns, the cached prefix is lost and the
+    change is counted in `forge_prompt_prefix_changes_total`.
+    '''
+
+    def __init__(self, max_sessions: int = 4096, max_pending: int = 1024):
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self._fingerprints: OrderedDict[str, dict[str, str]] = OrderedDict()
+        # Estimated prompt tokens per run id, until the run's metrics come in.
+        self._pending: OrderedDict[str, int] = OrderedDict()
+
+    def prompt(self, session_id: str | None, run_id: str | None, messages: list[Message], tools: list[dict] | None) -> int:
+        '''Record the prompt of a run about to start; returns its estimated size in tokens.'''
+        system = next((str(m.content) for m in messages if m.role == 'system' and m.content is not None), '')
+        schemas = canonical_tools(tools)
+        if session_id:
+            fingerprint = {'system': _digest(system), 'tools': _digest(schemas)}
+            previous = self._fingerprints.get(session_id)
+            for part, digest in fingerprint.items():
+                if previous is not None and previous[part] != digest:
+                    logger.info(f"The {part} part of the prompt prefix of {session_id} changed; Ollama cannot reuse it.")
+                    PROMPT_PREFIX_CHANGES.inc(part=part)
+            self._fingerprints[session_id] = fingerprint
+            self._fingerprints.move_to_end(session_id)
+            while len(self._fingerprints) > self.max_sessions:
+                self._fingerprints.popitem(last=False)
+
+        tokens = sum(message_tokens(message) for message in messages) + estimate_tokens(schemas)
+        if run_id:
+            self._pending[run_id] = tokens
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        return tokens
+
+    def observe(self, model: str, run: Any) -> float | None:
+        '''Record the cache hit ratio of a finished run from the `prompt_eval_count` of its first model call.'''
+        prompt_tokens = self._pending.pop(getattr(run, 'run_id', None), None)
+        first_call = next(
+            (m for m in getattr(run, 'messages', None) or [] if m.role == 'assistant' and not m.from_history and m.metrics),
+            None,
+        )
+        if not prompt_tokens or first_call is None or not first_call.metrics.input_tokens:
+            return None
+        evaluated = first_call.metrics.input_tokens
+        ratio = max(0.0, 1.0 - evaluated / prompt_tokens)
+        PROMPT_TOKENS.inc(prompt_tokens, model=model)
+        PROMPT_EVAL_TOKENS.inc(min(evaluated, prompt_tokens), model=model)
+        PREFIX_CACHE_HIT_RATIO.observe(ratio, model=model)
+        logger.debug(f"Run {run.run_id}: Ollama evaluated {evaluated} of ~{prompt_tokens} prompt tokens ({ratio:.0%} cached).")
+        return ratio
+
+
+prefix_cache = PrefixCacheTracker()
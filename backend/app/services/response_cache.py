@@ -0,0 +1,37 @@
+'''
+Opt-in cache of non-streaming chat replies, for repeated identical requests
+'''
+
+from hashlib import sha256
+from typing import Any, Callable
+import json
+import logging
+import re
+import time
+import unicodedata
+
+from core.config import settings
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message(message: str) -> str:
+    '''The message as it counts for the cache: unicode form and runs of whitespace are ignored, case is not.'''
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', message)).strip()
+
+
+def cache_key(**parts: Any) -> str:
+    '''A digest of `parts`, independent of their order.'''
+    return sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseCache(TTLCache):
+    '''TTL + LRU cache of chat replies, optionally backed by SQLite so replies survive restarts.'''
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 512, path: str | None = None,
+                 clock: Callable[[], float] = time.time):
+        super().__init__(ttl=ttl, max_entries=max_entries, path=path, table='response_cache', clock=clock)
+
+
+response_cache = ResponseCache(ttl=settings.RESPONSE_CACHE_TTL, max_entries=settings.RESPONSE_CACHE_SIZE)
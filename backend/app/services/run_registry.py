@@ -0,0 +1,65 @@
+'''
+Tracks in-flight chat generations so they can be cancelled
+'''
+
+from typing import Awaitable, Callable
+import asyncio
+import logging
+
+from core.metrics import CHAT_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+
+class RunRegistry:
+    '''Maps session ids to the tasks generating a response for them.
+
+    Cancelling a task stops the agent run at its current `await`, which
+    closes the streaming HTTP request to Ollama, so the model stops
+    generating instead of finishing a response nobody will read.
+    '''
+
+    def __init__(self):
+        self._runs: dict[str, set[asyncio.Future]] = {}
+
+    def register(self, session_id: str, task: asyncio.Future) -> None:
+        self._runs.setdefault(session_id, set()).add(task)
+        task.add_done_callback(lambda done: self.unregister(session_id, done))
+
+    def unregister(self, session_id: str, task: asyncio.Future) -> None:
+        tasks = self._runs.get(session_id)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self._runs[session_id]
+
+    def is_running(self, session_id: str) -> bool:
+        return bool(self._runs.get(session_id))
+
+    def cancel_task(self, session_id: str, task: asyncio.Future, reason: str) -> bool:
+        if task.done():
+            return False
+        task.cancel()
+        CHAT_CANCELLED.inc(reason=reason)
+        logger.info(f"Cancelled generation for session_id {session_id} ({reason}).")
+        return True
+
+    def cancel(self, session_id: str, reason: str = 'request') -> int:
+        '''Cancel every in-flight generation for `session_id`; returns how many were cancelled.'''
+        return sum(self.cancel_task(session_id, task, reason) for task in list(self._runs.get(session_id, ())))
+
+
+async def watch_disconnect(receive: Callable[[], Awaitable[dict]], on_disconnect: Callable[[], object]) -> None:
+    '''Wait for the client to disconnect, then call `on_disconnect`.
+
+    Only useful once the request body has been read; afterwards the only
+    message the server can receive is `http.disconnect`.'''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            on_disconnect()
+            return
+
+
+run_registry = RunRegistry()
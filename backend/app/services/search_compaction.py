@@ -0,0 +1,201 @@
+'''
+Shrink raw search responses to the passages relevant to the query before they reach the model
+'''
+
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import math
+import re
+
+from core.config import settings
+
+WORD = re.compile(r'\w+', re.UNICODE)
+# Lines made only of markdown images/links, separators or bare URLs carry no prose.
+LINK_ONLY = re.compile(r'^(?:[\s|*>#\-=_•·]*(?:!?\[[^\]]*\]\([^)]*\)|https?://\S+))*[\s|*>#\-=_•·]*$')
+BOILERPLATE = re.compile(
+    r'\b(cookies?|subscribe|sign (?:in|up)|log ?in|newsletter|all rights reserved|privacy policy'
+    r'|terms of (?:use|service)|skip to (?:main )?content|advertisement|share (?:this|on))\b',
+    re.IGNORECASE,
+)
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid', 'ref', 'ref_src'})
+TRACKING_PREFIXES = ('utm_',)
+# Rough size of a token for budgeting; close enough for English prose with the usual tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def tokenize(text: str) -> list[str]:
+    return WORD.findall(text.casefold())
+
+
+def canonical_url(url: str) -> str:
+    '''URL with scheme, `www.`, fragment, tracking parameters and trailing slash removed,
+    so the same page reached through different links compares equal.'''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix('www.')
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ])
+    return urlunsplit(('', host, parts.path.rstrip('/'), query, ''))
+
+
+def strip_boilerplate(text: str) -> str:
+    '''Drop navigation, link-only, repeated and cookie/subscribe style lines from scraped page text.'''
+    kept = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or LINK_ONLY.match(line):
+            continue
+        words = len(line.split())
+        # Short lines without sentence punctuation are menus, breadcrumbs and buttons.
+        if words < 4 and not line.endswith(('.', ':', '?', '!')) and not line.startswith('#'):
+            continue
+        if words < 20 and BOILERPLATE.search(line):
+            continue
+        key = line.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return '\n'.join(kept)
+
+
+def chunk_text(text: str, chunk_tokens: int) -> list[str]:
+    '''Split text into passages of about `chunk_tokens` tokens, breaking on line boundaries where possible.'''
+    limit = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current: list[str] = []
+    size = 0
+    for line in text.splitlines():
+        while len(line) > limit:
+            # A single overlong line (e.g. a scraped page with no newlines) is cut at word boundaries.
+            cut = line.rfind(' ', 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            chunks.append(line[:cut].strip())
+            line = line[cut:].strip()
+        if current and size + len(line) > limit:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        if line:
+            current.append(line)
+            size += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+class BM25:
+    '''Okapi BM25 over a fixed list of tokenized documents.'''
+
+    def __init__(self, documents: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0.0
+        document_frequency = Counter(term for document in documents for term in set(document))
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: list[str]) -> list[float]:
+        terms = set(query)
+        results = []
+        for frequencies, length in zip(self.frequencies, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            for term in terms:
+                frequency = frequencies.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+
+def dedupe_results(results: list[dict]) -> list[dict]:
+    '''Keep the first result for each canonical URL and drop results with identical content.'''
+    unique = []
+    urls = set()
+    contents = set()
+    for result in results:
+        url = canonical_url(result.get('url') or '')
+        content = ' '.join((result.get('raw_content') or result.get('content') or '').split()).casefold()
+        if (url and url in urls) or (content and content in contents):
+            continue
+        urls.add(url)
+        contents.add(content)
+        unique.append(result)
+    return unique
+
+
+def compact_search_response(
+    response: dict,
+    query: str | None = None,
+    token_budget: int | None = None,
+    chunk_tokens: int | None = None,
+    top_k: int | None = None,
+) -> dict:
+    '''Return a copy of a search response with `raw_content` replaced by the most relevant excerpts.
+
+    Results are deduplicated, their page text is stripped of boilerplate and cut
+    into passages, and passages from all results are ranked together with BM25
+    against the query. The best `top_k` passages are kept while they fit in
+    `token_budget` (which also covers each result's title and summary); they are
+    returned under `excerpts`, in page order, on the result they came from.
+    '''
+
+    query = query if query is not None else response.get('query', '')
+    token_budget = token_budget if token_budget is not None else settings.SEARCH_TOKEN_BUDGET
+    chunk_tokens = chunk_tokens if chunk_tokens is not None else settings.SEARCH_CHUNK_TOKENS
+    top_k = top_k if top_k is not None else settings.SEARCH_TOP_K_CHUNKS
+
+    results = []
+    passages: list[tuple[int, int, str]] = []
+    for result in dedupe_results(response.get('results') or []):
+        compacted = {key: value for key, value in result.items() if key != 'raw_content'}
+        compacted['excerpts'] = []
+        results.append(compacted)
+        text = strip_boilerplate(result.get('raw_content') or '')
+        for position, chunk in enumerate(chunk_text(text, chunk_tokens)):
+            passages.append((len(results) - 1, position, chunk))
+
+    # Titles and summaries are always kept; excerpts share what is left of the budget.
+    remaining = token_budget - sum(
+        estimate_tokens(result.get('title') or '') + estimate_tokens(result.get('content') or '')
+        for result in results
+    )
+
+    selected: list[tuple[int, int, str]] = []
+    if passages and top_k > 0:
+        scores = BM25([tokenize(chunk) for _, _, chunk in passages]).scores(tokenize(query))
+        # Highest score first; ties go to higher-ranked results and earlier passages.
+        ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], passages[i][0], passages[i][1]))
+        seen = set()
+        for i in ranked:
+            if len(selected) >= top_k or scores[i] <= 0:
+                break
+            chunk = passages[i][2]
+            key = ' '.join(chunk.split()).casefold()
+            cost = estimate_tokens(chunk)
+            if key in seen or cost > remaining:
+                continue
+            seen.add(key)
+            selected.append(passages[i])
+            remaining -= cost
+
+    for result_index, _, chunk in sorted(selected):
+        results[result_index]['excerpts'].append(chunk)
+
+    compacted = {key: value for key, value in response.items() if key != 'results'}
+    compacted['results'] = results
+    return compacted
@@ -0,0 +1,96 @@
+'''
+Runs the tool calls of a turn concurrently without blocking the event loop
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from inspect import iscoroutinefunction
+from typing import Callable, Iterable
+import asyncio
+import contextvars
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class _Calls:
+    '''Tool calls in flight for one agent: a cap on how many run at once, and
+    the order between calls with side effects and the calls around them.'''
+
+    def __init__(self, max_concurrent: int):
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.last_write: asyncio.Future | None = None
+        self.reads: set[asyncio.Future] = set()
+
+
+class ToolDispatcher:
+    '''Runs blocking tools in a thread pool and bounds the tool calls of each agent.
+
+    agno starts all the tool calls of an assistant message at once and adds
+    their results in call order, but because Forge's tool hooks are async, a
+    sync tool would run on the event loop itself: the calls ran one after
+    another and every other request stalled meanwhile. `offload()` turns sync
+    tools into coroutines that run in a pool of `max_workers` threads;
+    async tools (the network ones) stay on the event loop.
+
+    Used as the outermost tool hook (`hook`), the dispatcher lets at most
+    `max_concurrent` calls of an agent (there is one per session) run at a
+    time. Calls of tools in `side_effect_tools` keep their place in the call
+    order: they wait for the calls requested before them, and the calls
+    requested after them wait for them.
+    '''
+
+    def __init__(self, max_concurrent: int = 4, max_workers: int = 8, side_effect_tools: Iterable[str] = ()):
+        self.max_concurrent = max_concurrent
+        self.side_effect_tools = frozenset(side_effect_tools)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+        # By agent id; agents are not hashable, and the entry goes when its agent does.
+        self._calls: dict[int, _Calls] = {}
+        # Calls made without an agent share one state.
+        self._shared: _Calls | None = None
+
+    def offload(self, tool: Callable) -> Callable:
+        '''`tool` as a coroutine function running in the pool; async tools and agno `Function`s are returned as is.'''
+        if not callable(tool) or iscoroutinefunction(tool) or not hasattr(tool, '__code__'):
+            return tool
+
+        @wraps(tool)
+        async def run_in_pool(*args, **kwargs):
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, partial(context.run, tool, *args, **kwargs)
+            )
+
+        return run_in_pool
+
+    def _state(self, agent) -> _Calls:
+        if agent is None:
+            if self._shared is None:
+                self._shared = _Calls(self.max_concurrent)
+            return self._shared
+        calls = self._calls.get(id(agent))
+        if calls is None:
+            calls = self._calls[id(agent)] = _Calls(self.max_concurrent)
+            weakref.finalize(agent, self._calls.pop, id(agent), None)
+        return calls
+
+    async def hook(self, function_name: str, function_call, arguments: dict, agent=None):
+        '''agno tool hook; agno passes arguments by these parameter names.'''
+        calls = self._state(agent)
+        done = asyncio.get_running_loop().create_future()
+        # Registered before the first await, so the order here is the order agno started the calls in.
+        if function_name in self.side_effect_tools:
+            before = [*calls.reads, *([calls.last_write] if calls.last_write else [])]
+            calls.last_write, calls.reads = done, set()
+        else:
+            before = [calls.last_write] if calls.last_write else []
+            calls.reads.add(done)
+        try:
+            if before:
+                await asyncio.wait(before)
+            async with calls.slots:
+                return await function_call(**arguments)
+        finally:
+            calls.reads.discard(done)
+            done.set_result(None)
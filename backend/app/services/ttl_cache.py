@@ -0,0 +1,122 @@
+'''
+TTL + LRU cache of JSON values, optionally persisted to a SQLite table
+'''
+
+from collections import OrderedDict
+from typing import Callable
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    '''In-memory TTL + LRU cache of JSON-serialisable dicts, optionally backed by
+    the SQLite table `table` so entries survive restarts.
+
+    The SQLite table is bounded the same way as memory: expired entries and
+    the least recently stored beyond `max_entries` are deleted on each write.
+    Several caches can share one SQLite file under different table names.'''
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 256, path: str | None = None,
+                 table: str = 'cache', clock: Callable[[], float] = time.time):
+        if not table.isidentifier():
+            raise ValueError(f'Invalid table name: {table!r}')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.table = table
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self.open(path)
+
+    def open(self, path: str | None) -> None:
+        '''Back the cache with the SQLite file at `path`; entries already in memory are kept.
+        Called at startup once the db directory exists; a falsy `path` keeps the cache in memory.'''
+        if not path:
+            return
+        with self._lock:
+            self._close()
+            self.path = path
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, stored_at REAL, response TEXT)'
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    f'SELECT stored_at, response FROM {self.table} WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl:
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: dict) -> None:
+        entry = (self.clock(), value)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (key, stored_at, response) VALUES (?, ?, ?)',
+                    (key, entry[0], json.dumps(value)),
+                )
+                self._db.execute(f'DELETE FROM {self.table} WHERE stored_at < ?', (entry[0] - self.ttl,))
+                self._db.execute(
+                    f'DELETE FROM {self.table} WHERE key NOT IN '
+                    f'(SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT ?)',
+                    (self.max_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, entry: tuple[float, dict]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            self._db.commit()
+
+    def clear(self) -> int:
+        '''Drop every entry; returns how many there were.'''
+        with self._lock:
+            cleared = len(self._entries)
+            self._entries.clear()
+            if self._db is not None:
+                cleared = self._db.execute(f'DELETE FROM {self.table}').rowcount
+                self._db.commit()
+        return cleared
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
@@ -0,0 +1,168 @@
+'''
+Internet search backends with a shared TTL/LRU result cache
+'''
+
+from typing import Callable, Protocol
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+
+import httpx
+
+from core.config import settings
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    '''Cache key for a query: case, unicode form, whitespace and surrounding punctuation are ignored.'''
+    query = unicodedata.normalize('NFKC', query).casefold()
+    query = re.sub(r'\s+', ' ', query)
+    return query.strip(' \t\n?!.,;:"\'')
+
+
+class SearchBackend(Protocol):
+    async def search(self, query: str) -> dict: ...
+
+    async def aclose(self) -> None: ...
+
+
+class TavilySearchBackend:
+    '''Calls the Tavily search API over one pooled, keep-alive `httpx.AsyncClient`.
+
+    `tavily.AsyncTavilyClient` opens a fresh connection per request, so the
+    request is made directly here with the same payload.
+    '''
+
+    def __init__(self, api_key: str, base_url: str = 'https://api.tavily.com', timeout: float = 60.0,
+                 max_connections: int = 10):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    'Content-Type': 'application/json',
+                    'Authorization': f'Bearer {self.api_key}',
+                    'X-Client-Source': 'tavily-python',
+                },
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def search(self, query: str) -> dict:
+        try:
+            response = await self._get_client().post('/search', json={'query': query, 'include_raw_content': 'text'})
+        except httpx.TimeoutException:
+            raise RuntimeError(f'Internet search timed out after {self.timeout}s.')
+        except httpx.TransportError as e:
+            raise RuntimeError(f'Internet search failed: {e}')
+        if response.status_code != 200:
+            try:
+                detail = response.json().get('detail', {}).get('error') or response.text
+            except Exception:
+                detail = response.text
+            raise RuntimeError(f'Internet search failed with status {response.status_code}: {detail}')
+        return response.json()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalSearchBackend:
+    '''Offline stand-in that answers from canned results, for tests and development.
+
+    `results` maps normalized queries to lists of result dicts; unknown queries
+    return no results. `responder` can be given instead to compute responses.
+    '''
+
+    def __init__(self, results: dict[str, list[dict]] | None = None,
+                 responder: Callable[[str], dict] | None = None):
+        self.results = {normalize_query(query): items for query, items in (results or {}).items()}
+        self.responder = responder
+        self.calls: list[str] = []
+
+    async def search(self, query: str) -> dict:
+        self.calls.append(query)
+        if self.responder is not None:
+            return self.responder(query)
+        return {'query': query, 'results': list(self.results.get(normalize_query(query), []))}
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SearchCache(TTLCache):
+    '''TTL + LRU cache of search responses by normalized query, optionally backed by
+    SQLite so results survive restarts and are shared across sessions.'''
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 256, path: str | None = None,
+                 clock: Callable[[], float] = time.time):
+        super().__init__(ttl=ttl, max_entries=max_entries, path=path, table='search_cache', clock=clock)
+
+
+class WebSearch:
+    '''Search front-end: serves repeated queries from the cache and coalesces
+    concurrent identical queries into one backend request.'''
+
+    def __init__(self, backend: SearchBackend, cache: SearchCache):
+        self.backend = backend
+        self.cache = cache
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def search(self, query: str) -> dict:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"Search cache hit for {key!r}")
+            return cached
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await self.backend.search(query)
+            self.cache.set(key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it.
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+        self.cache.close()
+
+
+def create_backend() -> SearchBackend:
+    if settings.SEARCH_BACKEND == 'local':
+        return LocalSearchBackend()
+    return TavilySearchBackend(settings.TAVILY_API_KEY)
+
+
+web_search = WebSearch(
+    backend=create_backend(),
+    cache=SearchCache(ttl=settings.SEARCH_CACHE_TTL, max_entries=settings.SEARCH_CACHE_SIZE),
+)
+
@@ -0,0 +1,192 @@
+'''
+Ranged and line-windowed reads over large files, without loading them whole
+'''
+
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import mmap
+import os
+import threading
+
+# Files at least this big are read through mmap instead of buffered reads.
+MMAP_THRESHOLD = 1024 * 1024
+# Newlines are counted in blocks of this size; each block start becomes a checkpoint.
+INDEX_BLOCK_SIZE = 1024 * 1024
+# Upper bounds for a single call so one tool call cannot flood the model's context.
+MAX_RANGE_BYTES = 256 * 1024
+MAX_LINE_COUNT = 2000
+INDEX_CACHE_SIZE = 64
+
+
+@dataclass
+class LineIndex:
+    '''Newline counts for a file at fixed byte checkpoints.
+
+    `checkpoints[i]` is the number of newlines before byte `i * INDEX_BLOCK_SIZE`,
+    which lets a line lookup jump straight to the block containing it.'''
+
+    size: int
+    mtime_ns: int
+    total_lines: int
+    checkpoints: list[int] = field(default_factory=list)
+
+
+_index_cache: OrderedDict[str, LineIndex] = OrderedDict()
+_index_lock = threading.Lock()
+
+
+@contextmanager
+def open_buffer(path: str, size: int):
+    '''Yield a bytes-like view of the file: an mmap for large files, the file contents otherwise.'''
+    with open(path, 'rb') as file:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+        else:
+            yield file.read()
+
+
+def _build_index(path: str, stat: os.stat_result) -> LineIndex:
+    checkpoints = []
+    newlines = 0
+    last_byte = b''
+    with open(path, 'rb') as file:
+        while True:
+            checkpoints.append(newlines)
+            block = file.read(INDEX_BLOCK_SIZE)
+            if not block:
+                break
+            newlines += block.count(b'\n')
+            last_byte = block[-1:]
+    # A final line without a trailing newline still counts as a line.
+    total = newlines + (1 if last_byte and last_byte != b'\n' else 0)
+    return LineIndex(size=stat.st_size, mtime_ns=stat.st_mtime_ns, total_lines=total, checkpoints=checkpoints)
+
+
+def _cached_index(key: str, stat: os.stat_result) -> LineIndex | None:
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None and index.size == stat.st_size and index.mtime_ns == stat.st_mtime_ns:
+            _index_cache.move_to_end(key)
+            return index
+    return None
+
+
+def line_index(path: str) -> LineIndex:
+    '''Return the (cached) line index for `path`, rebuilding it when the file changed.'''
+    stat = os.stat(path)
+    key = os.path.realpath(path)
+    index = _cached_index(key, stat)
+    if index is not None:
+        return index
+
+    index = _build_index(path, stat)
+    with _index_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def file_info(path: str) -> dict:
+    index = line_index(path)
+    return {'path': path, 'size': index.size, 'total_lines': index.total_lines}
+
+
+def _line_start(buffer, index: LineIndex, line: int) -> int:
+    '''Byte offset where 1-based `line` starts.'''
+    if line <= 1:
+        return 0
+    skip = line - 1
+    # Last checkpoint with strictly fewer than `skip` newlines before it.
+    block = max(bisect_left(index.checkpoints, skip) - 1, 0)
+    pos = block * INDEX_BLOCK_SIZE
+    for _ in range(skip - index.checkpoints[block]):
+        pos = buffer.find(b'\n', pos) + 1
+        if pos == 0:
+            return len(buffer)
+    return pos
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def read_range(path: str, offset: int = 0, length: int = MAX_RANGE_BYTES) -> dict:
+    '''Read `length` bytes starting at byte `offset`.
+
+    A byte range needs no line index, so the file is not scanned for one:
+    `total_lines` is only included when an index of the file is already cached.'''
+    offset = max(offset, 0)
+    length = max(min(length, MAX_RANGE_BYTES), 0)
+    stat = os.stat(path)
+    with open_buffer(path, stat.st_size) as buffer:
+        data = bytes(buffer[offset:offset + length])
+    end = offset + len(data)
+    result = {
+        'content': _decode(data),
+        'offset': offset,
+        'next_offset': end,
+        'eof': end >= stat.st_size,
+        'size': stat.st_size,
+    }
+    index = _cached_index(os.path.realpath(path), stat)
+    if index is not None:
+        result['total_lines'] = index.total_lines
+    return result
+
+
+def read_lines(path: str, start_line: int = 1, line_count: int = 200) -> dict:
+    '''Read `line_count` lines starting at 1-based `start_line`.'''
+    start_line = max(start_line, 1)
+    line_count = max(min(line_count, MAX_LINE_COUNT), 0)
+    index = line_index(path)
+    with open_buffer(path, index.size) as buffer:
+        start = _line_start(buffer, index, start_line)
+        end = start
+        for _ in range(line_count):
+            if end >= index.size:
+                break
+            newline = buffer.find(b'\n', end)
+            end = index.size if newline == -1 else newline + 1
+        data = bytes(buffer[start:end])
+    read = data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+    return {
+        'content': _decode(data),
+        'start_line': start_line,
+        'end_line': start_line + read - 1 if read else start_line - 1,
+        'eof': end >= index.size,
+        'size': index.size,
+        'total_lines': index.total_lines,
+    }
+
+
+def read_tail(path: str, line_count: int = 50) -> dict:
+    '''Read the last `line_count` lines by scanning backwards from the end of the file.'''
+    line_count = max(min(line_count, MAX_LINE_COUNT), 0)
+    index = line_index(path)
+    with open_buffer(path, index.size) as buffer:
+        end = index.size
+        # Ignore the trailing newline so it does not count as an empty last line.
+        pos = end - 1 if end and buffer[end - 1:end] == b'\n' else end
+        start = end
+        for _ in range(line_count):
+            if pos <= 0:
+                start = 0
+                break
+            newline = buffer.rfind(b'\n', 0, pos)
+            start = newline + 1
+            pos = newline
+        data = bytes(buffer[start:end]) if line_count else b''
+    read = data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+    return {
+        'content': _decode(data),
+        'start_line': index.total_lines - read + 1,
+        'end_line': index.total_lines,
+        'eof': True,
+        'size': index.size,
+        'total_lines': index.total_lines,
+    }
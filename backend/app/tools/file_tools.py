@@ -1,11 +1,34 @@
 import logging
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from core.config import settings
+from tools import file_reader
+from tools.patching import apply_search_replace, apply_unified_diff
+from tools.path_policy import path_policy
 from typing import Literal
 
 logger = logging.getLogger(__name__)
 
+# Shared by the batch tools so concurrent reads/writes reuse a fixed set of threads.
+_io_pool = ThreadPoolExecutor(max_workers=settings.FILE_IO_WORKERS, thread_name_prefix='file-io')
+
+_umask: int | None = None
+
+
+def _current_umask() -> int:
+    """The process umask, read without changing it (`os.umask` can only be read by setting it,
+    which would briefly apply the temporary value to files other threads create)."""
+    global _umask
+    if _umask is None:
+        try:
+            with open('/proc/self/status') as status:
+                _umask = next(int(line.split()[1], 8) for line in status if line.startswith('Umask:'))
+        except (OSError, StopIteration, IndexError, ValueError):
+            _umask = 0o022
+    return _umask
+
 
 def is_path_allowed(requested: str, allowed_dir: str) -> bool:
     """
@@ -52,10 +75,49 @@ def _require_allowed_path(path: str, action: str) -> None:
     `action` is a short verb phrase (e.g. "write to file") used only for the
     log message describing the rejected attempt.
     """
-    if not is_path_allowed(path, settings.CURRENT_DIR):
+    if not path_policy.allows(path):
         logger.error(f"Attempted to {action} outside current directory: {path}")
         raise RuntimeError('Cannot write to files that are not in the current directory.')
 
+def _require_file(filename: str) -> None:
+    """Raise RuntimeError if `filename` is not an existing regular file."""
+    if not os.path.isfile(filename):
+        logger.error(f'{filename} is not a file.')
+        raise RuntimeError(f'{filename} is not a file. Have you created it?')
+
+def _require_existing_file(filename: str) -> None:
+    """Raise RuntimeError unless `filename` is an allowed, existing regular file."""
+    _require_allowed_path(filename, "read file")
+    _require_file(filename)
+
+def atomic_write(filename: str, value: str, fsync: bool = False, newline: str | None = None) -> None:
+    """Replace `filename` with `value` via a temp file in the same directory and `os.replace`.
+
+    Readers see either the old or the new content, never a partial write. With
+    `fsync` the data is flushed to disk before the rename.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(filename)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline=newline) as file:
+            file.write(value)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        try:
+            mode = os.stat(filename).st_mode & 0o7777
+        except FileNotFoundError:
+            # mkstemp creates files as 0600; new files get the usual umask-based mode instead.
+            mode = 0o666 & ~_current_umask()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
 def write_file(filename: str, value: str = '', write_type: Literal['w', 'a', 'x', 'wt'] = 'wt'):
     """
     Write content to a file with specified mode.
@@ -90,17 +152,94 @@ def write_file(filename: str, value: str = '', write_type: Literal['w', 'a', 'x'
     Side Effects:
         - Logs info message on successful write
         - Logs error message if path validation fails
-        - Creates or modifies the specified file
+        - Creates or modifies the specified file. 'w'/'wt' replace the file atomically
+          (temp file + rename), so a failed write never leaves it half-written.
 
     Example:
         write_file('data.txt', 'Hello World')  # Write to file
         write_file('log.txt', 'New entry\\n', 'a')  # Append to file
+
+    To change part of an existing file, prefer `edit_file` or `apply_patch`: they only
+    need the changed text instead of the whole file.
     """
     _require_allowed_path(filename, "write to file")
-    with open(file=filename, mode=write_type) as file:
-        file.write(value)
+    if write_type in ('w', 'wt'):
+        atomic_write(filename, value, fsync=settings.FILE_WRITE_FSYNC)
+    else:
+        with open(file=filename, mode=write_type) as file:
+            file.write(value)
+            if settings.FILE_WRITE_FSYNC:
+                file.flush()
+                os.fsync(file.fileno())
     logger.info(f"File '{filename}' written with mode '{write_type}'.")
 
+def _rewrite_file(filename: str, transform) -> dict:
+    """Read an allowed text file, apply `transform` to its content and write it back atomically."""
+    _require_allowed_path(filename, "edit file")
+    _require_file(filename)
+    with open(filename, newline='') as file:
+        original = file.read()
+    updated = transform(original)
+    if updated != original:
+        atomic_write(filename, updated, fsync=settings.FILE_WRITE_FSYNC, newline='')
+    logger.info(f"File '{filename}' edited ({len(original)} -> {len(updated)} characters).")
+    return {'path': filename, 'changed': updated != original, 'size': len(updated)}
+
+def edit_file(filename: str, edits: list[dict[str, str]]) -> dict:
+    """
+    Change part of a file with search/replace blocks, without resending the whole file.
+
+    Edits are applied in order. Each `search` must match the current file text exactly
+    (including indentation) and exactly once; include a few surrounding lines if the text
+    is not unique. If any edit fails, the file is left unchanged.
+
+    Parameters
+    ----------
+    filename : str
+        Path to an existing file inside the current working directory.
+    edits : list[dict[str, str]]
+        Items of the form `{"search": "exact old text", "replace": "new text"}`.
+
+    Returns
+    -------
+    dict
+        `{"path": str, "changed": bool, "size": int}`
+
+    Raises
+    ------
+    RuntimeError
+        If the path is not allowed or not a file, or an edit's search text is missing or ambiguous.
+    """
+    return _rewrite_file(filename, lambda text: apply_search_replace(text, edits))
+
+def apply_patch(filename: str, patch: str) -> dict:
+    """
+    Change a file by applying a unified diff (the format produced by `diff -u` / `git diff`).
+
+    Hunks are located by their context and removed lines, so slightly wrong line numbers
+    in `@@` headers are tolerated, but the line counts in a header must match its hunk
+    (or use a bare `@@` line). If any hunk fails to apply, the file is left unchanged.
+
+    Parameters
+    ----------
+    filename : str
+        Path to an existing file inside the current working directory.
+    patch : str
+        The diff for this one file, e.g.
+        "@@ -3,2 +3,2 @@\\n def f():\\n-    return 1\\n+    return 2\\n".
+
+    Returns
+    -------
+    dict
+        `{"path": str, "changed": bool, "size": int}`
+
+    Raises
+    ------
+    RuntimeError
+        If the path is not allowed or not a file, or the patch is malformed or does not apply.
+    """
+    return _rewrite_file(filename, lambda text: apply_unified_diff(text, patch))
+
 def read_file(filename: str, read_type: Literal['r', 'rb'] = 'r'):
     """
     Read the contents of a file that is located within the configured current directory.
@@ -126,6 +265,9 @@ def read_file(filename: str, read_type: Literal['r', 'rb'] = 'r'):
         If the requested filename is outside the allowed current directory.
     RuntimeError
         If the path does not point to an existing regular file.
+    RuntimeError
+        If the file is larger than settings.READ_FILE_MAX_BYTES. Use read_file_lines,
+        read_file_head, read_file_tail or read_file_range for large files.
 
     Behavior and side effects
     -------------------------
@@ -158,15 +300,247 @@ def read_file(filename: str, read_type: Literal['r', 'rb'] = 'r'):
         - This function enforces a directory whitelist; do not bypass is_path_allowed.
         - Do not pass user-supplied unvalidated paths directly without appropriate checks.
     """
-    _require_allowed_path(filename, "read file")
-    if not os.path.isfile(filename):
-        logger.error(f'{filename} is not a file.')
-        raise RuntimeError(f'{filename} is not a file. Have you created it?')
+    _require_existing_file(filename)
+    return _read_whole_file(filename, read_type)
+
+def _read_whole_file(filename: str, read_type: Literal['r', 'rb'] = 'r'):
+    """Body of `read_file` for a path that has already passed the path policy."""
+    _require_file(filename)
+    size = os.path.getsize(filename)
+    if size > settings.READ_FILE_MAX_BYTES:
+        logger.error(f'{filename} is too large to read whole ({size} bytes).')
+        raise RuntimeError(
+            f'{filename} is {size} bytes, too large to read at once. '
+            'Use read_file_lines, read_file_head, read_file_tail or read_file_range to page through it.'
+        )
     with open(file=filename, mode=read_type) as file:
         file_contents = file.read()
         logger.info(f'Read {filename} successfully.')
         return file_contents
 
+def read_files(filenames: list[str]) -> list[dict]:
+    """
+    Read several text files in one call. Prefer this over repeated `read_file` calls.
+
+    Files are read concurrently; a failure on one file does not affect the others.
+
+    Parameters
+    ----------
+    filenames : list[str]
+        Paths of files inside the current working directory.
+
+    Returns
+    -------
+    list[dict]
+        One entry per path, in the same order: `{"path": str, "content": str}` on success
+        or `{"path": str, "error": str}` on failure (outside the current directory,
+        missing, or too large to read whole).
+    """
+    allowed = path_policy.allows_many(filenames)
+
+    def read_one(filename: str) -> dict:
+        if not allowed[filename]:
+            logger.error(f"Attempted to read file outside current directory: {filename}")
+            return {'path': filename, 'error': 'Cannot read files that are not in the current directory.'}
+        try:
+            return {'path': filename, 'content': _read_whole_file(filename)}
+        except (RuntimeError, OSError, UnicodeDecodeError) as e:
+            return {'path': filename, 'error': str(e)}
+
+    return list(_io_pool.map(read_one, filenames))
+
+def write_files(items: list[dict[str, str]]) -> list[dict]:
+    """
+    Write several files in one call. Prefer this over repeated `write_file` calls when
+    a change touches many files.
+
+    Each file is replaced atomically (written to a temporary file, then renamed over the
+    target), and files are written concurrently. A failure on one file does not affect
+    the others.
+
+    Parameters
+    ----------
+    items : list[dict[str, str]]
+        Files to write, as items of the form `{"path": str, "content": str}`. Paths must be inside the
+        current working directory and each path may appear only once.
+
+    Returns
+    -------
+    list[dict]
+        One entry per item, in the same order: `{"path": str, "written": int}` (characters
+        written) on success or `{"path": str, "error": str}` on failure.
+    """
+    paths = [str(item.get('path') or '') if isinstance(item, dict) else '' for item in items]
+    allowed = path_policy.allows_many(path for path in paths if path)
+
+    def check(index: int) -> str | None:
+        item, filename = items[index], paths[index]
+        if not isinstance(item, dict):
+            return 'Each item must be an object of the form {"path": str, "content": str}.'
+        if not filename:
+            return 'Missing "path".'
+        if not isinstance(item.get('content', ''), str):
+            return '"content" must be a string.'
+        if not allowed[filename]:
+            logger.error(f"Attempted to write to file outside current directory: {filename}")
+            return 'Cannot write to files that are not in the current directory.'
+        return None
+
+    def write_one(index: int) -> dict:
+        filename, content = paths[index], items[index].get('content', '')
+        try:
+            atomic_write(filename, content, fsync=settings.FILE_WRITE_FSYNC)
+        except OSError as e:
+            return {'path': filename, 'error': str(e)}
+        logger.info(f"File '{filename}' written atomically.")
+        return {'path': filename, 'written': len(content)}
+
+    indexes = []
+    results: list[dict | None] = [None] * len(items)
+    seen = set()
+    for index, filename in enumerate(paths):
+        error = check(index)
+        if error is None:
+            # Compared resolved, so `a.txt`, `./a.txt` and an absolute alias count as the same file.
+            target = path_policy.resolve(filename)
+            if target in seen:
+                error = 'Path appears more than once in this batch.'
+            seen.add(target)
+        if error is not None:
+            results[index] = {'path': filename, 'error': error}
+        else:
+            indexes.append(index)
+    for index, result in zip(indexes, _io_pool.map(write_one, indexes)):
+        results[index] = result
+    return results
+
+def get_file_info(filename: str) -> dict:
+    """
+    Get the size and line count of a file without reading its contents into the context.
+
+    Use this before paging through a large file with `read_file_lines` or `read_file_range`.
+
+    Parameters
+    ----------
+    filename : str
+        Path to a file inside the current working directory.
+
+    Returns
+    -------
+    dict
+        `{"path": str, "size": int (bytes), "total_lines": int}`
+
+    Raises
+    ------
+    RuntimeError
+        If the path is outside the current directory or is not a file.
+    """
+    _require_existing_file(filename)
+    return file_reader.file_info(filename)
+
+def read_file_lines(filename: str, start_line: int = 1, line_count: int = 200) -> dict:
+    """
+    Read a window of lines from a text file, e.g. to page through a large log.
+
+    Parameters
+    ----------
+    filename : str
+        Path to a file inside the current working directory.
+    start_line : int, optional
+        1-based number of the first line to return. Defaults to 1.
+    line_count : int, optional
+        How many lines to return, at most 2000. Defaults to 200.
+
+    Returns
+    -------
+    dict
+        `{"content": str, "start_line": int, "end_line": int, "eof": bool, "size": int, "total_lines": int}`.
+        Continue paging with `start_line = end_line + 1` until `eof` is true.
+
+    Raises
+    ------
+    RuntimeError
+        If the path is outside the current directory or is not a file.
+    """
+    _require_existing_file(filename)
+    result = file_reader.read_lines(filename, start_line, line_count)
+    logger.info(f"Read lines {result['start_line']}-{result['end_line']} of {filename}.")
+    return result
+
+def read_file_head(filename: str, line_count: int = 50) -> dict:
+    """
+    Read the first lines of a text file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to a file inside the current working directory.
+    line_count : int, optional
+        How many lines to return, at most 2000. Defaults to 50.
+
+    Returns
+    -------
+    dict
+        Same shape as `read_file_lines`.
+    """
+    return read_file_lines(filename, 1, line_count)
+
+def read_file_tail(filename: str, line_count: int = 50) -> dict:
+    """
+    Read the last lines of a text file, e.g. the most recent entries of a log.
+
+    Parameters
+    ----------
+    filename : str
+        Path to a file inside the current working directory.
+    line_count : int, optional
+        How many lines to return, at most 2000. Defaults to 50.
+
+    Returns
+    -------
+    dict
+        Same shape as `read_file_lines`.
+
+    Raises
+    ------
+    RuntimeError
+        If the path is outside the current directory or is not a file.
+    """
+    _require_existing_file(filename)
+    result = file_reader.read_tail(filename, line_count)
+    logger.info(f"Read last {line_count} lines of {filename}.")
+    return result
+
+def read_file_range(filename: str, offset: int = 0, length: int = 65536) -> dict:
+    """
+    Read a byte range of a file, decoded as UTF-8 (invalid bytes are replaced).
+
+    Parameters
+    ----------
+    filename : str
+        Path to a file inside the current working directory.
+    offset : int, optional
+        Byte offset to start reading at. Defaults to 0.
+    length : int, optional
+        Number of bytes to read, at most 262144. Defaults to 65536.
+
+    Returns
+    -------
+    dict
+        `{"content": str, "offset": int, "next_offset": int, "eof": bool, "size": int}`, plus
+        `"total_lines": int` when the file's lines were already counted by another read.
+        Continue with `offset = next_offset` until `eof` is true.
+
+    Raises
+    ------
+    RuntimeError
+        If the path is outside the current directory or is not a file.
+    """
+    _require_existing_file(filename)
+    result = file_reader.read_range(filename, offset, length)
+    logger.info(f"Read bytes {result['offset']}-{result['next_offset']} of {filename}.")
+    return result
+
 def list_files_in_dir(dir: str):
     """
     List files in a directory, enforcing a security boundary.
@@ -0,0 +1,174 @@
+'''
+Apply unified diffs and search/replace edits to text
+'''
+
+from dataclasses import dataclass, field
+import re
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class PatchError(RuntimeError):
+    '''Raised when a patch or edit does not apply to the current file content.'''
+
+
+@dataclass
+class Hunk:
+    header: str
+    old_start: int
+    # Whether the header has line numbers; a bare `@@` hunk is located by its context alone.
+    numbered: bool = True
+    old: list[str] = field(default_factory=list)
+    new: list[str] = field(default_factory=list)
+    old_eof_newline: bool = True
+    new_eof_newline: bool = True
+
+
+def _is_file_header(lines: list[str], index: int) -> bool:
+    '''Whether `lines[index]` starts a `---`/`+++` file header pair.'''
+    line = lines[index]
+    if line.startswith('+++ '):
+        return index > 0 and lines[index - 1].startswith('--- ')
+    return line.startswith('--- ') and index + 1 < len(lines) and lines[index + 1].startswith('+++ ')
+
+
+def parse_unified_diff(diff: str) -> list[Hunk]:
+    '''Parse the hunks of a single-file unified diff. File headers (`---`/`+++`) are ignored.
+
+    A hunk ends once it has as many old and new lines as its `@@` header
+    declares, so a removed line that itself starts with `-- ` is never
+    mistaken for a file header. Hunk headers without line numbers (a bare
+    `@@`) are accepted; such hunks run until the next `@@` or file header and
+    are located by searching for their context.
+
+    Raises
+    ------
+    - `PatchError` if a line is malformed, or a hunk has fewer or more lines than its header declares.'''
+
+    hunks: list[Hunk] = []
+    current: Hunk | None = None
+    # Old and new lines the current hunk still expects; None for a bare `@@` hunk.
+    remaining: list[int] | None = None
+    last_side = None
+    lines = diff.splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith('\\'):
+            # "\ No newline at end of file" applies to the line just before it.
+            if hunks and last_side in ('-', ' '):
+                hunks[-1].old_eof_newline = False
+            if hunks and last_side in ('+', ' '):
+                hunks[-1].new_eof_newline = False
+            continue
+        if line.startswith('@@') and current is not None and remaining is not None:
+            raise PatchError(f'Hunk "{current.header}" has fewer lines than its header declares.')
+        if current is None or remaining is None:
+            if line.startswith('@@'):
+                match = HUNK_HEADER.match(line)
+                current = Hunk(header=line, old_start=int(match.group(1)) if match else 0, numbered=match is not None)
+                hunks.append(current)
+                remaining = [int(match.group(2) or 1), int(match.group(4) or 1)] if match else None
+                last_side = None
+                if remaining == [0, 0]:
+                    current = None
+                continue
+            if current is None or _is_file_header(lines, index):
+                # Preamble such as `diff --git`, `---`, `+++` or `index` lines, before or between hunks.
+                # Anything but a header or a `git format-patch` signature (`-- `) there means the counts are off.
+                if current is None and hunks and line[:1] in (' ', '+', '-') and line != '-- ' and not _is_file_header(lines, index):
+                    raise PatchError(f'Hunk "{hunks[-1].header}" has more lines than its header declares.')
+                current = None
+                continue
+        tag, body = (line[0], line[1:]) if line else (' ', '')
+        if tag == ' ':
+            current.old.append(body)
+            current.new.append(body)
+        elif tag == '-':
+            current.old.append(body)
+        elif tag == '+':
+            current.new.append(body)
+        else:
+            raise PatchError(f'Malformed diff line: {line!r}')
+        last_side = tag
+        if remaining is not None:
+            remaining[0] -= tag in (' ', '-')
+            remaining[1] -= tag in (' ', '+')
+            if min(remaining) < 0:
+                raise PatchError(f'Hunk "{current.header}" has more lines than its header declares.')
+            if remaining == [0, 0]:
+                current = None
+    if current is not None and remaining is not None:
+        raise PatchError(f'Hunk "{current.header}" has fewer lines than its header declares.')
+    if not hunks:
+        raise PatchError('The patch contains no hunks (expected lines starting with "@@").')
+    return hunks
+
+
+def _find(lines: list[str], needle: list[str], expected: int) -> int:
+    '''Index where `needle` occurs in `lines`, preferring the occurrence closest to `expected`.'''
+    if not needle:
+        return min(max(expected, 0), len(lines))
+    limit = len(lines) - len(needle)
+    expected = min(max(expected, 0), max(limit, 0))
+    for distance in range(max(expected, limit - expected) + 1):
+        for candidate in (expected - distance, expected + distance):
+            if 0 <= candidate <= limit and lines[candidate:candidate + len(needle)] == needle:
+                return candidate
+    return -1
+
+
+def apply_unified_diff(text: str, diff: str) -> str:
+    '''Apply a unified diff to `text` and return the new text.
+
+    Each hunk is matched on exact line content, at its stated position or the
+    nearest place its context is found (so slightly stale line numbers still
+    apply). Line endings follow the original text.
+
+    Raises
+    ------
+    - `PatchError` if the diff is malformed or a hunk's context is not found.'''
+
+    newline = '\r\n' if '\r\n' in text else '\n'
+    eof_newline = text.endswith(newline)
+    lines = text.split(newline) if text else []
+    if eof_newline:
+        lines.pop()
+    offset = 0
+    for hunk in parse_unified_diff(diff):
+        # Index the hunk's old lines start at. A hunk without old lines (a pure insertion, as `diff -U0`
+        # writes it) names the line it goes after instead, so `-2,0` inserts at index 2 and `-0,0` at the top.
+        anchor = hunk.old_start - 1 if hunk.old else hunk.old_start
+        position = _find(lines, hunk.old, anchor + offset if hunk.numbered else 0)
+        if position == -1:
+            raise PatchError(f'Hunk "{hunk.header}" does not apply: its context/removed lines were not found.')
+        end = position + len(hunk.old)
+        if end == len(lines) and hunk.old_eof_newline != hunk.new_eof_newline:
+            eof_newline = hunk.new_eof_newline
+        lines[position:end] = hunk.new
+        offset = position + len(hunk.new) - (anchor + len(hunk.old)) if hunk.numbered else offset
+    result = newline.join(lines)
+    return result + newline if lines and eof_newline else result
+
+
+def apply_search_replace(text: str, edits: list[dict[str, str]]) -> str:
+    '''Apply `{"search": ..., "replace": ...}` edits in order and return the new text.
+
+    Each `search` string must occur exactly once in the text as edited so far,
+    so an edit can never land in the wrong place.
+
+    Raises
+    ------
+    - `PatchError` if a search string is empty, missing or ambiguous.'''
+
+    for number, edit in enumerate(edits, start=1):
+        search, replace = edit.get('search', ''), edit.get('replace', '')
+        if not search:
+            raise PatchError(f'Edit {number}: "search" must not be empty.')
+        occurrences = text.count(search)
+        if occurrences == 0:
+            raise PatchError(f'Edit {number}: search text not found. Re-read the file and copy the text exactly.')
+        if occurrences > 1:
+            raise PatchError(
+                f'Edit {number}: search text occurs {occurrences} times. Include more surrounding lines to make it unique.'
+            )
+        text = text.replace(search, replace, 1)
+    return text
@@ -0,0 +1,120 @@
+'''
+Cached "is this path inside the current directory" checks for the file tools
+'''
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable
+import os
+import stat
+import threading
+
+from core.config import settings
+
+
+class PathPolicy:
+    '''Decides whether paths fall inside the allowed root (`settings.CURRENT_DIR`).
+
+    The root is resolved once and re-resolved only when `settings.CURRENT_DIR`
+    changes (or `set_root` is called). Resolved parent directories are cached,
+    so checking many files in the same directories costs a few `lstat` calls per
+    file instead of a full `resolve()`. A cached directory is only used while
+    it is still the same directory (same device and inode, reached both through
+    the checked path and through its resolution) and not a symlink; a directory
+    replaced by a symlink or by another directory is resolved again. The final
+    path component is always checked for being a symlink. Paths containing
+    `..` bypass the cache and are resolved in full, since lexical
+    normalisation would be wrong across symlinks.
+    '''
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._root_key: str | None = None
+        self._root: str | None = None
+        # path -> (resolved path, (st_dev, st_ino) of the directory when it was resolved)
+        self._dirs: OrderedDict[str, tuple[str, tuple[int, int]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_root(self, root: str) -> None:
+        '''Resolve `root` and make it the allowed root, dropping cached resolutions.'''
+        with self._lock:
+            self._set_root(root)
+
+    def _set_root(self, root: str) -> None:
+        self._root_key = root
+        self._dirs.clear()
+        try:
+            self._root = str(Path(root).resolve(strict=True))
+        except (OSError, RuntimeError):
+            self._root = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._root_key = None
+            self._root = None
+            self._dirs.clear()
+
+    def _current_root(self) -> str | None:
+        if self._root_key != settings.CURRENT_DIR:
+            self._set_root(settings.CURRENT_DIR)
+        return self._root
+
+    @staticmethod
+    def _identity(path: str) -> tuple[int, int] | None:
+        try:
+            info = os.lstat(path)
+        except OSError:
+            return None
+        if stat.S_ISLNK(info.st_mode):
+            return None
+        return info.st_dev, info.st_ino
+
+    def _resolve_dir(self, path: str) -> str:
+        entry = self._dirs.get(path)
+        if entry is not None:
+            resolved, identity = entry
+            if self._identity(path) == identity and self._identity(resolved) == identity:
+                self._dirs.move_to_end(path)
+                return resolved
+            del self._dirs[path]
+        resolved = os.path.realpath(path)
+        identity = self._identity(resolved)
+        # Directories that do not exist (yet) are not cached, so creating them later is noticed.
+        if identity is not None:
+            self._dirs[path] = (resolved, identity)
+            if len(self._dirs) > self.cache_size:
+                self._dirs.popitem(last=False)
+        return resolved
+
+    def resolve(self, path: str) -> str:
+        '''The absolute, symlink-free form of `path`, as used by `allows`.'''
+        with self._lock:
+            return self._resolve(path)
+
+    def _resolve(self, path: str) -> str:
+        raw = os.path.join(os.getcwd(), str(path))
+        parent, name = os.path.split(raw)
+        if not name or name in ('.', '..') or '..' in parent.split(os.sep) or os.path.islink(raw):
+            return os.path.realpath(raw)
+        return os.path.join(self._resolve_dir(parent), name)
+
+    def _allows(self, path: str, root: str) -> bool:
+        try:
+            resolved = self._resolve(path)
+        except (OSError, ValueError):
+            return False
+        return resolved == root or resolved.startswith(root.rstrip(os.sep) + os.sep)
+
+    def allows(self, path: str) -> bool:
+        with self._lock:
+            root = self._current_root()
+            return root is not None and self._allows(path, root)
+
+    def allows_many(self, paths: Iterable[str]) -> dict[str, bool]:
+        '''Check a batch of paths under one lock acquisition and root lookup.'''
+        with self._lock:
+            root = self._current_root()
+            return {path: root is not None and self._allows(path, root) for path in paths}
+
+
+path_policy = PathPolicy()
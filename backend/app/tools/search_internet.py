@@ -1,13 +1,10 @@
 from agno.tools import tool
-from tavily import TavilyClient
-from core.config import settings
-
-
-client = TavilyClient(settings.TAVILY_API_KEY)
+from services.search_compaction import compact_search_response
+from services.web_search import web_search
 
 
 @tool(requires_confirmation=True)
-def search_internet(query):
+async def search_internet(query: str):
     '''
     A function that searches the internet and returns mulitple urls.
 
@@ -25,7 +22,7 @@ def search_internet(query):
                         "title": "Something something something",
                         "content": "We talk about something here..." 
                         "score": 0.79,
-                        "raw_content": "The website scraped" | null
+                        "excerpts": ["The passages of the page most relevant to your query", ...]
                     },
                     ...
                 ]
@@ -37,10 +34,12 @@ def search_internet(query):
             `title`: The title of the website.
             `content`: A quick overview of the content inside the website.
             `score`: The probability that the website is relevant to the query.
-            `raw_content`: The website scraped more thoroughly. This is usually more detailed than the `content` field. Use this field to get detailed and relevant answers.
+            `excerpts`: The parts of the scraped website that best match the query, in page order. This is usually more detailed than the `content` field. Use this field to get detailed and relevant answers. It can be empty.
 
-        You will go over the `results` array and look through all of the `title` and `content`. You will then choose 2-3 websites from the results and dive more deeply into the `raw_content`, if it exsists.
+        You will go over the `results` array and look through all of the `title` and `content`. You will then choose 2-3 websites from the results and dive more deeply into their `excerpts`.
     '''
-    response = client.search(query=query, include_raw_content="text")
+    # Repeated and concurrent identical queries are served from the shared search cache.
+    response = await web_search.search(query)
 
-    return response
\ No newline at end of file
+    # Only the passages relevant to the query are passed on, to keep the prompt small.
+    return compact_search_response(response, query)
@@ -0,0 +1,382 @@
+'''
+A warm, incrementally refreshed index of the files under the current directory
+'''
+
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from stat import S_ISREG
+import logging
+import os
+import re
+import threading
+import time
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALWAYS_IGNORED = {'.git'}
+BINARY_SNIFF_BYTES = 8192
+
+
+@dataclass
+class IgnoreRule:
+    regex: re.Pattern
+    negated: bool
+    dir_only: bool
+
+
+def _translate(pattern: str) -> str:
+    '''Translate a gitignore glob to a regex body.'''
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            out.append('/.*')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            out.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            out.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                out.append(re.escape('['))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(out)
+
+
+def parse_gitignore(text: str) -> list[IgnoreRule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # Patterns containing a slash are relative to the .gitignore's directory.
+        anchored = '/' in line
+        body = _translate(line.lstrip('/'))
+        regex = re.compile(('^' if anchored else '^(?:.*/)?') + body + '$')
+        rules.append(IgnoreRule(regex=regex, negated=negated, dir_only=dir_only))
+    return rules
+
+
+@dataclass
+class FileEntry:
+    size: int
+    mtime_ns: int
+    binary: bool | None = None
+
+
+@dataclass
+class DirEntry:
+    mtime_ns: int
+    gitignore_mtime_ns: int | None
+    files: list[str] = field(default_factory=list)
+    subdirs: list[str] = field(default_factory=list)
+    rules: list[IgnoreRule] = field(default_factory=list)
+
+
+class WorkspaceIndex:
+    '''File listing for a directory tree built with `os.scandir`.
+
+    Paths are stored relative to `root` with forward slashes. A refresh only
+    re-lists directories whose mtime changed since the last scan, so keeping
+    the index warm on a large, mostly unchanged tree costs one `stat` per
+    directory. `.gitignore` files (including nested ones) are honoured.
+    Symlinks, to directories or to files, are neither followed nor indexed,
+    so nothing outside `root` is listed or searched.
+    '''
+
+    def __init__(self, root: str, max_file_bytes: int = 1024 * 1024, refresh_interval: float = 2.0,
+                 clock=time.monotonic):
+        self.root = os.path.abspath(root)
+        self.max_file_bytes = max_file_bytes
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.files: dict[str, FileEntry] = {}
+        self._dirs: dict[str, DirEntry] = {}
+        self._refreshed_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, *rel.split('/')) if rel else self.root
+
+    @staticmethod
+    def _join(rel_dir: str, name: str) -> str:
+        return f'{rel_dir}/{name}' if rel_dir else name
+
+    def _is_ignored(self, rel: str, is_dir: bool, stack: list[tuple[str, list[IgnoreRule]]]) -> bool:
+        ignored = False
+        for base, rules in stack:
+            sub = rel[len(base) + 1:] if base else rel
+            for rule in rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.regex.match(sub):
+                    ignored = not rule.negated
+        return ignored
+
+    def _load_rules(self, rel_dir: str) -> list[IgnoreRule]:
+        try:
+            with open(os.path.join(self._abs(rel_dir), '.gitignore'), encoding='utf-8', errors='replace') as file:
+                return parse_gitignore(file.read())
+        except OSError:
+            return []
+
+    def _gitignore_mtime(self, rel_dir: str) -> int | None:
+        try:
+            return os.stat(os.path.join(self._abs(rel_dir), '.gitignore')).st_mtime_ns
+        except OSError:
+            return None
+
+    def _scan_dir(self, rel_dir: str, stack) -> DirEntry | None:
+        path = self._abs(rel_dir)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        gitignore_mtime_ns = self._gitignore_mtime(rel_dir)
+
+        # An unchanged directory mtime means no entries were added, removed or renamed.
+        cached = self._dirs.get(rel_dir)
+        if cached is not None and cached.mtime_ns == mtime_ns and cached.gitignore_mtime_ns == gitignore_mtime_ns:
+            return cached
+
+        entry = DirEntry(mtime_ns=mtime_ns, gitignore_mtime_ns=gitignore_mtime_ns, rules=self._load_rules(rel_dir))
+        stack = stack + [(rel_dir, entry.rules)] if entry.rules else stack
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    rel = self._join(rel_dir, item.name)
+                    if item.name in ALWAYS_IGNORED:
+                        continue
+                    try:
+                        is_dir = item.is_dir(follow_symlinks=False)
+                        if not is_dir and not item.is_file(follow_symlinks=False):
+                            continue
+                        if self._is_ignored(rel, is_dir, stack):
+                            continue
+                        if is_dir:
+                            entry.subdirs.append(item.name)
+                        else:
+                            stat = item.stat(follow_symlinks=False)
+                            previous = self.files.get(rel)
+                            binary = previous.binary if previous and previous.mtime_ns == stat.st_mtime_ns else None
+                            self.files[rel] = FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, binary=binary)
+                            entry.files.append(item.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+
+        if cached is not None:
+            for name in set(cached.files) - set(entry.files):
+                self.files.pop(self._join(rel_dir, name), None)
+            for name in set(cached.subdirs) - set(entry.subdirs):
+                self._forget(self._join(rel_dir, name))
+        return entry
+
+    def _forget(self, rel_dir: str) -> None:
+        entry = self._dirs.pop(rel_dir, None)
+        if entry is None:
+            return
+        for name in entry.files:
+            self.files.pop(self._join(rel_dir, name), None)
+        for name in entry.subdirs:
+            self._forget(self._join(rel_dir, name))
+
+    def _walk(self, rel_dir: str, stack) -> None:
+        entry = self._scan_dir(rel_dir, stack)
+        if entry is None:
+            self._forget(rel_dir)
+            return
+        self._dirs[rel_dir] = entry
+        if entry.rules:
+            stack = stack + [(rel_dir, entry.rules)]
+        for name in entry.subdirs:
+            self._walk(self._join(rel_dir, name), stack)
+
+    def refresh(self, force: bool = False) -> None:
+        '''Bring the index up to date, at most once per `refresh_interval` unless `force`d.'''
+        with self._lock:
+            now = self.clock()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            started = time.perf_counter()
+            self._walk('', [])
+            self._refreshed_at = now
+            logger.debug(f"Indexed {len(self.files)} files under {self.root} in {time.perf_counter() - started:.3f}s")
+
+    def _restat(self, rel: str) -> FileEntry | None:
+        '''Refresh a file's entry if it was modified in place since the directory was scanned.'''
+        entry = self.files.get(rel)
+        if entry is None:
+            return None
+        try:
+            stat = os.lstat(self._abs(rel))
+        except OSError:
+            self.files.pop(rel, None)
+            return None
+        if not S_ISREG(stat.st_mode):
+            # Replaced by a symlink (or something else) since the last refresh
+            self.files.pop(rel, None)
+            return None
+        if stat.st_mtime_ns != entry.mtime_ns:
+            entry = self.files[rel] = FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return entry
+
+    def is_binary(self, rel: str) -> bool:
+        entry = self.files[rel]
+        if entry.binary is None:
+            try:
+                with open(self._abs(rel), 'rb') as file:
+                    entry.binary = b'\0' in file.read(BINARY_SNIFF_BYTES)
+            except OSError:
+                entry.binary = True
+        return entry.binary
+
+    def glob(self, pattern: str, max_results: int = 200) -> list[str]:
+        '''Relative paths matching `pattern`, e.g. `*.py` (matched against file names) or `src/**/*.ts`.'''
+        self.refresh()
+        match_path = '/' in pattern
+        regex = re.compile('^' + _translate(pattern) + '$') if match_path else None
+        results = []
+        for rel in sorted(self.files):
+            name = rel.rsplit('/', 1)[-1]
+            if (regex.match(rel) if match_path else fnmatch(name, pattern)):
+                results.append(rel)
+                if len(results) >= max_results:
+                    break
+        return results
+
+    def search(self, pattern: str, glob: str = '*', max_results: int = 100, ignore_case: bool = False) -> list[dict]:
+        '''Regex search over the contents of indexed text files no larger than `max_file_bytes`.'''
+        flags = re.IGNORECASE if ignore_case else 0
+        regex = re.compile(pattern, flags)
+        prefilter = re.compile(pattern, flags | re.MULTILINE)
+        self.refresh()
+        results = []
+        for rel in self.glob(glob, max_results=len(self.files)):
+            entry = self._restat(rel)
+            if entry is None or entry.size > self.max_file_bytes or self.is_binary(rel):
+                continue
+            try:
+                with open(self._abs(rel), encoding='utf-8', errors='replace') as file:
+                    text = file.read()
+            except OSError:
+                continue
+            # One pass over the whole file skips the per-line loop for files without a match.
+            if not prefilter.search(text):
+                continue
+            for number, line in enumerate(text.split('\n'), start=1):
+                if regex.search(line):
+                    results.append({'path': rel, 'line': number, 'text': line[:500]})
+                    if len(results) >= max_results:
+                        return results
+        return results
+
+
+_index: WorkspaceIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_workspace_index() -> WorkspaceIndex:
+    '''The index for `settings.CURRENT_DIR`, rebuilt from scratch when the directory changes.'''
+    global _index
+    root = os.path.abspath(settings.CURRENT_DIR)
+    with _index_lock:
+        if _index is None or _index.root != root:
+            _index = WorkspaceIndex(
+                root,
+                max_file_bytes=settings.INDEX_MAX_FILE_BYTES,
+                refresh_interval=settings.INDEX_REFRESH_INTERVAL,
+            )
+        return _index
+
+
+def find_files(pattern: str, max_results: int = 200) -> dict:
+    """
+    Find files in the current working directory tree by glob pattern, in a single call.
+
+    Files ignored by .gitignore are skipped.
+
+    Parameters
+    ----------
+    pattern : str
+        A glob. Without a slash it matches file names anywhere in the tree (e.g. `*.py`,
+        `README*`); with a slash it matches the path relative to the current directory
+        (e.g. `src/**/*.ts`).
+    max_results : int, optional
+        Maximum number of paths to return. Defaults to 200.
+
+    Returns
+    -------
+    dict
+        `{"root": str, "matches": list[str] (paths relative to root), "truncated": bool}`
+    """
+    index = get_workspace_index()
+    matches = index.glob(pattern, max_results=max_results + 1)
+    logger.info(f"find_files({pattern!r}) matched {len(matches)} files.")
+    return {'root': index.root, 'matches': matches[:max_results], 'truncated': len(matches) > max_results}
+
+
+def search_files(regex: str, glob: str = '*', max_results: int = 100, ignore_case: bool = False) -> dict:
+    """
+    Search the contents of text files in the current working directory tree with a regular expression.
+
+    Binary files, files ignored by .gitignore and files larger than the configured size
+    limit are skipped.
+
+    Parameters
+    ----------
+    regex : str
+        Python regular expression searched for on each line.
+    glob : str, optional
+        Only search files matching this glob (same rules as `find_files`). Defaults to all files.
+    max_results : int, optional
+        Maximum number of matching lines to return. Defaults to 100.
+    ignore_case : bool, optional
+        Match case-insensitively. Defaults to False.
+
+    Returns
+    -------
+    dict
+        `{"root": str, "matches": [{"path": str, "line": int, "text": str}], "truncated": bool}`
+
+    Raises
+    ------
+    RuntimeError
+        If `regex` is not a valid regular expression.
+    """
+    index = get_workspace_index()
+    try:
+        matches = index.search(regex, glob=glob, max_results=max_results + 1, ignore_case=ignore_case)
+    except re.error as e:
+        logger.error(f"Invalid search regex {regex!r}: {e}")
+        raise RuntimeError(f'Invalid regular expression: {e}')
+    logger.info(f"search_files({regex!r}, {glob!r}) found {len(matches)} matches.")
+    return {'root': index.root, 'matches': matches[:max_results], 'truncated': len(matches) > max_results}
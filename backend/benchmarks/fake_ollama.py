@@ -0,0 +1,150 @@
+'''
+Stand-in Ollama HTTP server that streams canned tokens at a fixed rate
+
+Implements the endpoints Forge uses (`/api/chat`, `/api/generate`, `/api/tags`,
+`/api/ps`, `/api/show`, `/api/version`) closely enough for the `ollama` client.
+Run it on its own with
+
+    python -m benchmarks.fake_ollama --port 11435 --tokens-per-second 50
+'''
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeOllamaConfig:
+    tokens_per_second: float = 50.0
+    response_tokens: int = 64
+    # Delay before the first token, standing in for prompt evaluation.
+    prompt_delay: float = 0.05
+    models: list[str] = field(default_factory=lambda: ['granite4:350m'])
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _model_entry(name: str) -> dict:
+    return {
+        'name': name,
+        'model': name,
+        'modified_at': _now(),
+        'size': 1_000_000,
+        'digest': '0' * 64,
+        'details': {
+            'format': 'gguf',
+            'family': 'fake',
+            'families': ['fake'],
+            'parameter_size': '350M',
+            'quantization_level': 'Q4_0',
+        },
+    }
+
+
+def create_app(config: FakeOllamaConfig | None = None) -> FastAPI:
+    config = config or FakeOllamaConfig()
+    app = FastAPI()
+    app.state.config = config
+    app.state.requests = 0
+
+    def tokens() -> list[str]:
+        return [f'token{i} ' for i in range(config.response_tokens)]
+
+    def final_fields(started: float, prompt: str) -> dict:
+        elapsed = int((time.perf_counter() - started) * 1e9)
+        return {
+            'done': True,
+            'done_reason': 'stop',
+            'total_duration': elapsed,
+            'load_duration': 0,
+            'prompt_eval_count': max(len(prompt.split()), 1),
+            'prompt_eval_duration': int(config.prompt_delay * 1e9),
+            'eval_count': config.response_tokens,
+            'eval_duration': max(elapsed - int(config.prompt_delay * 1e9), 1),
+        }
+
+    async def generate(body: dict, wrap) -> StreamingResponse | JSONResponse:
+        app.state.requests += 1
+        started = time.perf_counter()
+        model = body.get('model', config.models[0])
+        prompt = body.get('prompt') or json.dumps(body.get('messages', []))
+        delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+
+        if 'messages' not in body and not body.get('prompt'):
+            # An empty generate request only loads the model, as a warm-up does.
+            return JSONResponse({'model': model, 'created_at': _now(), **wrap(''), 'done': True, 'done_reason': 'load'})
+
+        if not body.get('stream', True):
+            await asyncio.sleep(config.prompt_delay + delay * config.response_tokens)
+            return JSONResponse({'model': model, 'created_at': _now(), **wrap(''.join(tokens())),
+                                 **final_fields(started, prompt)})
+
+        async def stream():
+            await asyncio.sleep(config.prompt_delay)
+            for token in tokens():
+                yield json.dumps({'model': model, 'created_at': _now(), **wrap(token), 'done': False}) + '\n'
+                await asyncio.sleep(delay)
+            yield json.dumps({'model': model, 'created_at': _now(), **wrap(''), **final_fields(started, prompt)}) + '\n'
+
+        return StreamingResponse(stream(), media_type='application/x-ndjson')
+
+    @app.post('/api/chat')
+    async def chat(request: Request):
+        return await generate(await request.json(), lambda text: {'message': {'role': 'assistant', 'content': text}})
+
+    @app.post('/api/generate')
+    async def generate_route(request: Request):
+        return await generate(await request.json(), lambda text: {'response': text})
+
+    @app.get('/api/tags')
+    async def tags():
+        return {'models': [_model_entry(name) for name in config.models]}
+
+    @app.get('/api/ps')
+    async def ps():
+        return {'models': [{**_model_entry(name), 'expires_at': _now(), 'size_vram': 0} for name in config.models]}
+
+    @app.post('/api/show')
+    async def show(request: Request):
+        body = await request.json()
+        return {'modelfile': '', 'parameters': '', 'template': '{{ .Prompt }}',
+                'details': _model_entry(body.get('model', config.models[0]))['details'], 'model_info': {}}
+
+    @app.get('/api/version')
+    async def version():
+        return {'version': '0.0.0-fake'}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Run a fake Ollama server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--tokens-per-second', type=float, default=50.0)
+    parser.add_argument('--response-tokens', type=int, default=64)
+    parser.add_argument('--prompt-delay', type=float, default=0.05)
+    parser.add_argument('--model', action='append', dest='models')
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        prompt_delay=args.prompt_delay,
+        models=args.models or FakeOllamaConfig().models,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
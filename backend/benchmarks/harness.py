@@ -0,0 +1,118 @@
+'''
+Concurrent load runner and latency statistics for the benchmarks
+'''
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+import asyncio
+import math
+import time
+
+
+@dataclass
+class Sample:
+    latency: float
+    ttft: float | None = None
+    error: str | None = None
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    '''`q`-th percentile (0-100) with linear interpolation between the closest ranks.'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    concurrency: int
+    wall_time: float
+    samples: list[Sample] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        ok = [sample for sample in self.samples if sample.error is None]
+        latencies = [sample.latency for sample in ok]
+        ttfts = [sample.ttft for sample in ok if sample.ttft is not None]
+        summary = {
+            'scenario': self.name,
+            'concurrency': self.concurrency,
+            'requests': len(self.samples),
+            'errors': len(self.samples) - len(ok),
+            'rps': len(ok) / self.wall_time if self.wall_time else 0.0,
+        }
+        for q in (50, 95, 99):
+            summary[f'latency_p{q}'] = percentile(latencies, q)
+        for q in (50, 95, 99):
+            summary[f'ttft_p{q}'] = percentile(ttfts, q)
+        errors = [sample.error for sample in self.samples if sample.error is not None]
+        if errors:
+            summary['first_error'] = errors[0]
+        return summary
+
+
+async def run_scenario(
+    name: str,
+    operation: Callable[[int, int], Awaitable[Sample]],
+    concurrency: int,
+    requests: int,
+) -> ScenarioResult:
+    '''Run `operation(worker, i)` `requests` times from `concurrency` concurrent workers.
+
+    Exceptions raised by `operation` are recorded as failed samples.'''
+
+    counter = iter(range(requests))
+    samples: list[Sample] = []
+
+    async def worker(worker_id: int):
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                sample = await operation(worker_id, i)
+            except Exception as e:
+                sample = Sample(latency=time.perf_counter() - started, error=f'{type(e).__name__}: {e}')
+            samples.append(sample)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    return ScenarioResult(name=name, concurrency=concurrency, wall_time=time.perf_counter() - started, samples=samples)
+
+
+def compare(current: list[dict], baseline: list[dict], threshold: float = 0.2) -> list[str]:
+    '''Describe each metric that regressed by more than `threshold` (a fraction) against `baseline`.'''
+    regressions = []
+    previous = {summary['scenario']: summary for summary in baseline}
+    for summary in current:
+        before = previous.get(summary['scenario'])
+        if before is None:
+            continue
+        for key in ('latency_p50', 'latency_p95', 'latency_p99', 'ttft_p50', 'ttft_p95'):
+            old, new = before.get(key), summary.get(key)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{summary['scenario']}: {key} {old * 1000:.1f}ms -> {new * 1000:.1f}ms")
+        old, new = before.get('rps'), summary.get('rps')
+        if old and new is not None and new < old * (1 - threshold):
+            regressions.append(f"{summary['scenario']}: rps {old:.1f} -> {new:.1f}")
+        if summary.get('errors', 0) > before.get('errors', 0):
+            regressions.append(f"{summary['scenario']}: errors {before.get('errors', 0)} -> {summary['errors']}")
+    return regressions
+
+
+def _ms(value: float | None) -> str:
+    return '-' if value is None else f'{value * 1000:.1f}'
+
+
+def format_table(summaries: list[dict]) -> str:
+    header = ('scenario', 'conc', 'reqs', 'errs', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'ttft p50', 'ttft p95', 'ttft p99')
+    rows = [header]
+    for s in summaries:
+        rows.append((
+            s['scenario'], str(s['concurrency']), str(s['requests']), str(s['errors']), f"{s['rps']:.1f}",
+            _ms(s['latency_p50']), _ms(s['latency_p95']), _ms(s['latency_p99']),
+            _ms(s['ttft_p50']), _ms(s['ttft_p95']), _ms(s['ttft_p99']),
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
@@ -0,0 +1,212 @@
+'''
+Throughput and latency benchmarks for the Forge request path
+
+Starts the fake Ollama server and the Forge app on local ports, then drives
+streaming and non-streaming chat, `/api/models/all` and the file tools with
+concurrent clients. Run from `backend/`:
+
+    python -m benchmarks.run --concurrency 8 --requests 100
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+
+With `--baseline`, the exit status is 1 when any latency percentile, TTFT or
+requests/sec regressed by more than the threshold.
+'''
+
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_ollama import FakeOllamaConfig, create_app
+from benchmarks.harness import Sample, compare, format_table, run_scenario
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+SCENARIOS = ('chat_stream', 'chat', 'models', 'file_tools')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    '''Runs an ASGI app under uvicorn in a background thread.'''
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self, timeout: float = 30.0) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f'Server on port {self.port} did not start')
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def load_forge_app(workspace: Path, ollama_url: str):
+    '''Import the Forge app with Ollama pointed at the fake server and state kept in `workspace`.'''
+    os.environ['OLLAMA_HOST'] = ollama_url
+    os.environ.setdefault('TAVILY_API_KEY', 'benchmark')
+    os.chdir(workspace)
+    sys.path.insert(0, str(APP_DIR))
+    import main
+
+    # Request logging would otherwise dominate the output.
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    return main.app
+
+
+def make_workspace(root: Path, files: int = 200) -> None:
+    source = root / 'src'
+    source.mkdir(parents=True, exist_ok=True)
+    (root / 'out').mkdir(exist_ok=True)
+    for i in range(files):
+        lines = [f'def function_{i}_{line}(value):\n    return value + {line}\n' for line in range(50)]
+        (source / f'module_{i}.py').write_text(''.join(lines))
+
+
+def chat_operation(client: httpx.AsyncClient, stream: bool):
+    async def operation(worker: int, i: int) -> Sample:
+        body = {'message': f'Benchmark message {i}', 'session_id': f'bench-{worker}', 'stream': stream}
+        started = time.perf_counter()
+        if not stream:
+            response = await client.post('/api/chat/', json=body)
+            response.raise_for_status()
+            return Sample(latency=time.perf_counter() - started)
+
+        ttft = None
+        async with client.stream('POST', '/api/chat/', json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data: ') or line == 'data: [DONE]':
+                    continue
+                data = json.loads(line[6:])
+                if 'error' in data:
+                    raise RuntimeError(data['error'])
+                if ttft is None and data.get('content'):
+                    ttft = time.perf_counter() - started
+        return Sample(latency=time.perf_counter() - started, ttft=ttft)
+
+    return operation
+
+
+def models_operation(client: httpx.AsyncClient):
+    async def operation(worker: int, i: int) -> Sample:
+        started = time.perf_counter()
+        response = await client.get('/api/models/all')
+        response.raise_for_status()
+        return Sample(latency=time.perf_counter() - started)
+
+    return operation
+
+
+def file_tools_operation():
+    from tools.file_tools import read_file_lines, write_file
+    from tools.workspace_index import search_files
+
+    calls = (
+        lambda i: read_file_lines(f'src/module_{i % 200}.py', start_line=10, line_count=20),
+        lambda i: search_files(rf'function_{i % 200}_1\b', glob='*.py', max_results=20),
+        lambda i: write_file(f'out/result_{i % 50}.txt', f'result {i}\n'),
+    )
+
+    async def operation(worker: int, i: int) -> Sample:
+        started = time.perf_counter()
+        await asyncio.to_thread(calls[i % len(calls)], i)
+        return Sample(latency=time.perf_counter() - started)
+
+    return operation
+
+
+async def run_benchmarks(base_url: str, scenarios: list[str], concurrency: int, requests: int) -> list[dict]:
+    summaries = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        operations = {
+            'chat_stream': lambda: chat_operation(client, stream=True),
+            'chat': lambda: chat_operation(client, stream=False),
+            'models': lambda: models_operation(client),
+            'file_tools': file_tools_operation,
+        }
+        for name in scenarios:
+            result = await run_scenario(name, operations[name](), concurrency, requests)
+            summaries.append(result.summary())
+    return summaries
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the Forge request path against a fake Ollama server.')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, dest='scenarios',
+                        help='Scenario to run (repeatable); defaults to all.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help='Requests per scenario.')
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--response-tokens', type=int, default=32)
+    parser.add_argument('--prompt-delay', type=float, default=0.02)
+    parser.add_argument('--json', type=Path, help='Write the results to this file.')
+    parser.add_argument('--baseline', type=Path, help='Compare against results saved with --json.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression as a fraction.')
+    args = parser.parse_args(argv)
+
+    config = FakeOllamaConfig(
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        prompt_delay=args.prompt_delay,
+    )
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='forge-bench-') as tmp:
+        workspace = Path(tmp)
+        make_workspace(workspace)
+        ollama = ServerThread(create_app(config), free_port())
+        ollama.start()
+        forge = ServerThread(load_forge_app(workspace, ollama.url), free_port())
+        forge.start()
+        try:
+            summaries = asyncio.run(
+                run_benchmarks(forge.url, args.scenarios or list(SCENARIOS), args.concurrency, args.requests)
+            )
+        finally:
+            forge.stop()
+            ollama.stop()
+            os.chdir(cwd)
+
+    print(format_table(summaries))
+    for summary in summaries:
+        if 'first_error' in summary:
+            print(f"{summary['scenario']}: {summary['errors']} errors, first: {summary['first_error']}")
+    if args.json:
+        args.json.write_text(json.dumps(summaries, indent=2))
+    if args.baseline:
+        regressions = compare(summaries, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 # `core.config.Settings` requires TAVILY_API_KEY (a plain str) at import time.
 # Provide a dummy value so importing app modules does not fail in environments
 # where the real key is not configured.
@@ -13,3 +15,18 @@ os.environ.setdefault("TAVILY_API_KEY", "test-tavily-key")
 APP_DIR = Path(__file__).resolve().parent.parent / "app"
 if str(APP_DIR) not in sys.path:
     sys.path.insert(0, str(APP_DIR))
+
+
+class FakeClock:
+    '''Stands in for `time.time`/`time.monotonic`; tests move it by setting `now`.'''
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
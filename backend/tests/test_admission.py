@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, QueueFull
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAdmissionController:
+    def test_grants_immediately_under_limit(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=2)
+            first = controller.enqueue("a", "m")
+            second = controller.enqueue("b", "m")
+            return first, second, controller.status()
+
+        first, second, status = run(scenario())
+        assert first.granted.done() and second.granted.done()
+        assert status == {"m": {"active": 2, "waiting": 0, "limit": 2}}
+
+    def test_queues_beyond_limit_and_grants_on_release(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            running = controller.enqueue("a", "m")
+            waiting = controller.enqueue("b", "m")
+            assert not waiting.granted.done()
+            assert waiting.position == 1
+            controller.release(running)
+            await asyncio.wait_for(waiting.wait(), 1)
+            return controller.status()
+
+        assert run(scenario()) == {"m": {"active": 1, "waiting": 0, "limit": 1}}
+
+    def test_sessions_are_served_round_robin(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            running = controller.enqueue("busy", "m")
+            tickets = [controller.enqueue("busy", "m") for _ in range(3)] + [controller.enqueue("other", "m")]
+            order = []
+            current = running
+            for _ in tickets:
+                controller.release(current)
+                current = next(t for t in tickets if t.granted.done() and t not in order)
+                order.append(current)
+            return [t.session_id for t in order]
+
+        # The second session does not wait behind every request of the first.
+        assert run(scenario()) == ["busy", "other", "busy", "busy"]
+
+    def test_positions_report_progress_until_granted(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            running = controller.enqueue("a", "m")
+            ahead = controller.enqueue("b", "m")
+            ticket = controller.enqueue("c", "m")
+            seen = []
+
+            async def watch():
+                async for position in ticket.positions():
+                    seen.append(position)
+
+            watcher = asyncio.create_task(watch())
+            await asyncio.sleep(0)
+            controller.release(running)
+            await asyncio.sleep(0)
+            controller.release(ahead)
+            await asyncio.wait_for(watcher, 1)
+            return seen
+
+        assert run(scenario()) == [2, 1]
+
+    def test_full_queue_raises_with_retry_after(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1, default_duration=4.0)
+            controller.enqueue("a", "m")
+            controller.enqueue("b", "m")
+            controller.enqueue("c", "m")
+
+        with pytest.raises(QueueFull) as excinfo:
+            run(scenario())
+        assert excinfo.value.retry_after == 8
+
+    def test_releasing_waiting_ticket_leaves_queue(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            running = controller.enqueue("a", "m")
+            left = controller.enqueue("b", "m")
+            behind = controller.enqueue("c", "m")
+            controller.release(left)
+            controller.release(left)
+            with pytest.raises(asyncio.CancelledError):
+                await left.wait()
+            assert behind.position == 1
+            controller.release(running)
+            return behind.granted.done(), controller.status()
+
+        granted, status = run(scenario())
+        assert granted
+        assert status == {"m": {"active": 1, "waiting": 0, "limit": 1}}
+
+    def test_per_model_limit_overrides_default(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, limits={"small": 3})
+            small = [controller.enqueue(str(i), "small") for i in range(3)]
+            large = [controller.enqueue(str(i), "large") for i in range(2)]
+            return [t.granted.done() for t in small], [t.granted.done() for t in large]
+
+        small, large = run(scenario())
+        assert small == [True, True, True]
+        assert large == [True, False]
+
+    def test_limit_scales_with_hosts_that_are_up(self):
+        hosts = [2]
+        controller = AdmissionController(max_concurrent=2, limits={"big": 1}, hosts=lambda: hosts[0])
+        assert (controller.host_limit("m"), controller.limit("m")) == (2, 4)
+        assert (controller.host_limit("big"), controller.limit("big")) == (1, 2)
+        hosts[0] = 0
+        assert controller.limit("m") == 2
+
+    def test_retry_after_tracks_recent_durations(self):
+        now = [0.0]
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, clock=lambda: now[0])
+            ticket = controller.enqueue("a", "m")
+            now[0] = 30.0
+            controller.release(ticket)
+            return controller.retry_after("m")
+
+        assert run(scenario()) == 30
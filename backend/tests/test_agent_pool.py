@@ -0,0 +1,71 @@
+import pytest
+
+from services.agent_pool import AgentPool
+
+
+@pytest.fixture
+def built():
+    return []
+
+
+@pytest.fixture
+def pool(clock, built):
+    def factory(session_id, model, host=None):
+        agent = object()
+        built.append((session_id, model))
+        return agent
+
+    return AgentPool(factory=factory, max_size=2, ttl=60, clock=clock)
+
+
+class TestAgentPool:
+    def test_reuses_agent_for_same_session(self, pool, built):
+        first = pool.get("s1", "m")
+        second = pool.get("s1", "m")
+        assert first is second
+        assert built == [("s1", "m")]
+        assert pool.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+    def test_rebuilds_when_model_changes(self, pool, built):
+        first = pool.get("s1", "m1")
+        second = pool.get("s1", "m2")
+        assert first is not second
+        assert built == [("s1", "m1"), ("s1", "m2")]
+        assert pool.stats.evictions == 1
+
+    def test_rebuilds_when_host_changes(self, pool, built):
+        first = pool.get("s1", "m", "http://a:11434")
+        assert pool.host_of("s1") == "http://a:11434"
+        second = pool.get("s1", "m", "http://b:11434")
+        assert first is not second
+        assert pool.host_of("s1") == "http://b:11434"
+        assert pool.host_of("missing") is None
+
+    def test_evicts_least_recently_used(self, pool):
+        pool.get("s1", "m")
+        pool.get("s2", "m")
+        pool.get("s1", "m")  # s2 is now the least recently used
+        pool.get("s3", "m")
+        assert "s1" in pool and "s3" in pool
+        assert "s2" not in pool
+        assert len(pool) == 2
+
+    def test_idle_entry_expires(self, pool, clock, built):
+        pool.get("s1", "m")
+        clock.now = 61
+        pool.get("s1", "m")
+        assert built == [("s1", "m"), ("s1", "m")]
+        assert pool.stats.misses == 2
+
+    def test_prune_removes_expired_entries(self, pool, clock):
+        pool.get("s1", "m")
+        clock.now = 30
+        pool.get("s2", "m")
+        clock.now = 70
+        assert pool.prune() == 1
+        assert "s1" not in pool and "s2" in pool
+
+    def test_discard(self, pool):
+        pool.get("s1", "m")
+        assert pool.discard("s1") is True
+        assert pool.discard("s1") is False
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_ollama import FakeOllamaConfig, create_app
+from benchmarks.harness import Sample, compare, percentile, run_scenario
+
+
+class TestPercentile:
+    def test_interpolates_between_ranks(self):
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+        assert percentile([5], 99) == 5
+        assert percentile([], 50) is None
+
+    def test_extremes(self):
+        values = [3, 1, 2]
+        assert percentile(values, 0) == 1
+        assert percentile(values, 100) == 3
+
+
+class TestRunScenario:
+    def test_runs_every_request_and_records_errors(self):
+        async def operation(worker, i):
+            if i == 3:
+                raise RuntimeError("boom")
+            return Sample(latency=0.01, ttft=0.005)
+
+        result = asyncio.run(run_scenario("op", operation, concurrency=3, requests=10))
+        summary = result.summary()
+        assert summary["requests"] == 10
+        assert summary["errors"] == 1
+        assert summary["first_error"] == "RuntimeError: boom"
+        assert summary["ttft_p50"] == 0.005
+
+
+class TestCompare:
+    def test_flags_latency_and_throughput_regressions(self):
+        baseline = [{"scenario": "chat", "latency_p95": 0.1, "rps": 10.0, "errors": 0}]
+        current = [{"scenario": "chat", "latency_p95": 0.2, "rps": 5.0, "errors": 0}]
+        regressions = compare(current, baseline, threshold=0.2)
+        assert len(regressions) == 2
+
+    def test_within_threshold_is_not_a_regression(self):
+        baseline = [{"scenario": "chat", "latency_p95": 0.1, "rps": 10.0, "errors": 0}]
+        current = [{"scenario": "chat", "latency_p95": 0.11, "rps": 9.0, "errors": 0}]
+        assert compare(current, baseline, threshold=0.2) == []
+
+
+class TestFakeOllama:
+    def _client(self, **config):
+        return TestClient(create_app(FakeOllamaConfig(prompt_delay=0, tokens_per_second=0, **config)))
+
+    def test_chat_streams_configured_tokens(self):
+        client = self._client(response_tokens=3)
+        response = client.post("/api/chat", json={"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["message"]["content"] for line in lines[:-1]] == ["token0 ", "token1 ", "token2 "]
+        assert lines[-1]["done"] is True
+        assert lines[-1]["eval_count"] == 3
+
+    def test_chat_without_stream_returns_one_message(self):
+        client = self._client(response_tokens=2)
+        response = client.post("/api/chat", json={"model": "m", "messages": [], "stream": False})
+        assert response.json()["message"]["content"] == "token0 token1 "
+
+    def test_tags_lists_models(self):
+        client = self._client(models=["a:1b", "b:2b"])
+        assert [model["model"] for model in client.get("/api/tags").json()["models"]] == ["a:1b", "b:2b"]
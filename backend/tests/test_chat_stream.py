@@ -0,0 +1,192 @@
+import asyncio
+import json
+
+import pytest
+
+from services.chat_stream import QueuePosition, SSECoalescer, encode_json
+
+
+class RunContentEvent:
+    is_paused = False
+
+    def __init__(self, content):
+        self.content = content
+
+
+class ToolCall:
+    def __init__(self, name):
+        self.name = name
+
+    def model_dump(self):
+        return {"tool_name": self.name}
+
+
+class ToolCallEvent(RunContentEvent):
+    def __init__(self, name):
+        super().__init__("")
+        self.tool_calls = [ToolCall(name)]
+
+
+class Tool:
+    tool_call_id = "call_1"
+    tool_name = "search_internet"
+    tool_args = {"query": "paris"}
+    confirmed = None
+
+
+class RunPausedEvent(RunContentEvent):
+    is_paused = True
+
+    def __init__(self):
+        super().__init__(None)
+        self.run_id = "run_1"
+        self.tools_requiring_confirmation = [Tool()]
+
+
+def parse(frames):
+    return [frame[len("data: "):-2] for frame in frames]
+
+
+def payloads(frames):
+    return [json.loads(data) for data in parse(frames) if data != "[DONE]"]
+
+
+async def events(*chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+def collect(coalescer, chunks):
+    async def run():
+        return [frame async for frame in coalescer.stream(chunks)]
+
+    return asyncio.run(run())
+
+
+class TestSSECoalescer:
+    def test_first_token_is_sent_immediately_then_coalesced(self):
+        coalescer = SSECoalescer("s", flush_interval=10, flush_bytes=10_000)
+        frames = coalescer.feed(RunContentEvent("Hel"))
+        assert payloads(frames) == [{"content": "Hel", "type": "RunContentEvent", "session_id": "s"}]
+        assert coalescer.feed(RunContentEvent("lo")) == []
+        assert coalescer.feed(RunContentEvent(" world")) == []
+        assert [p["content"] for p in payloads(coalescer.flush())] == ["lo world"]
+
+    def test_flushes_when_buffer_reaches_size(self):
+        coalescer = SSECoalescer("s", flush_interval=10, flush_bytes=4)
+        coalescer.feed(RunContentEvent("a"))
+        assert coalescer.feed(RunContentEvent("bc")) == []
+        assert [p["content"] for p in payloads(coalescer.feed(RunContentEvent("de")))] == ["bcde"]
+
+    def test_stream_preserves_content_and_ends_with_done(self):
+        tokens = [RunContentEvent(f"t{i} ") for i in range(100)]
+        frames = collect(SSECoalescer("s", flush_interval=10, flush_bytes=64), events(*tokens))
+        assert parse(frames)[-1] == "[DONE]"
+        assert "".join(p["content"] for p in payloads(frames)) == "".join(t.content for t in tokens)
+        assert len(frames) < 20
+
+    def test_flushes_after_interval(self):
+        frames = collect(
+            SSECoalescer("s", flush_interval=0.01, flush_bytes=10_000),
+            events(*(RunContentEvent("x") for _ in range(5)), delay=0.02),
+        )
+        # Tokens slower than the flush interval are not held back.
+        assert [p["content"] for p in payloads(frames)] == ["x"] * 5
+
+    def test_tool_calls_sent_only_on_change(self):
+        coalescer = SSECoalescer("s")
+        first = payloads(coalescer.feed(ToolCallEvent("read_file")))
+        repeat = payloads(coalescer.feed(ToolCallEvent("read_file")))
+        changed = payloads(coalescer.feed(ToolCallEvent("write_file")))
+        assert first[0]["tool_calls"] == [{"tool_name": "read_file"}]
+        assert repeat == []
+        assert changed[0]["tool_calls"] == [{"tool_name": "write_file"}]
+
+    def test_buffered_content_precedes_tool_event(self):
+        coalescer = SSECoalescer("s", flush_interval=10, flush_bytes=10_000)
+        coalescer.feed(RunContentEvent("a"))
+        coalescer.feed(RunContentEvent("b"))
+        frames = payloads(coalescer.feed(RunPausedEvent()))
+        assert frames[0]["content"] == "b"
+        assert frames[1]["tool_requiring_confirmation"]["tool_name"] == "search_internet"
+
+    def test_confirmation_names_the_tool_call_to_confirm(self):
+        coalescer = SSECoalescer("s")
+        confirmation = payloads(coalescer.feed(RunPausedEvent()))[0]["tool_requiring_confirmation"]
+        assert confirmation == {
+            "tool_name": "search_internet",
+            "tool_id": "call_1",
+            "tool_args": {"query": "paris"},
+            "run_id": "run_1",
+            "session_id": "s",
+            "confirmed": None,
+        }
+        assert coalescer.feed(RunPausedEvent()) == []
+
+    def test_queue_position_frames_carry_their_fields(self):
+        coalescer = SSECoalescer("s")
+        frames = payloads(coalescer.feed(QueuePosition(3)))
+        assert frames == [{"content": "", "type": "QueuePosition", "position": 3, "session_id": "s"}]
+
+    def test_errors_surface_after_buffered_frames(self):
+        async def failing():
+            yield RunContentEvent("a")
+            yield RunContentEvent("b")
+            raise RuntimeError("model crashed")
+
+        coalescer = SSECoalescer("s", flush_interval=10, flush_bytes=10_000)
+
+        async def run():
+            frames = []
+            with pytest.raises(RuntimeError, match="model crashed"):
+                async for frame in coalescer.stream(failing()):
+                    frames.append(frame)
+            return frames
+
+        assert [p["content"] for p in payloads(asyncio.run(run()))] == ["a", "b"]
+
+    def test_slow_consumer_applies_backpressure(self):
+        produced = []
+
+        async def source():
+            for i in range(50):
+                produced.append(i)
+                yield RunContentEvent("x")
+
+        async def run():
+            stream = SSECoalescer("s", flush_interval=10, flush_bytes=10_000, max_pending=4).stream(source())
+            await stream.__anext__()
+            # The consumer is stalled: the producer fills the queue and then waits.
+            await asyncio.sleep(0.05)
+            stalled_at = len(produced)
+            await stream.aclose()
+            return stalled_at
+
+        assert asyncio.run(run()) <= 7
+
+    def test_cancelling_producer_ends_stream(self):
+        async def endless():
+            while True:
+                yield RunContentEvent("x")
+                await asyncio.sleep(0.001)
+
+        async def run():
+            coalescer = SSECoalescer("s", flush_interval=10, flush_bytes=10_000)
+            frames = []
+            async for frame in coalescer.stream(endless(), on_start=lambda producer: started.append(producer)):
+                frames.append(frame)
+                if len(frames) == 1:
+                    started[0].cancel()
+            return frames
+
+        started = []
+        frames = asyncio.run(run())
+        assert parse(frames)[-1] == "[DONE]"
+        assert payloads(frames)[-1]["type"] == "RunCancelledEvent"
+
+
+class TestEncodeJson:
+    def test_compact_and_unicode(self):
+        assert encode_json({"a": "é", "b": [1, 2]}) == '{"a":"é","b":[1,2]}'
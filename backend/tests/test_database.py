@@ -0,0 +1,51 @@
+import asyncio
+
+from sqlalchemy import text
+
+from database import create_async_sqlite_engine, create_sqlite_engine
+
+
+def read_pragmas(conn):
+    return {
+        "journal_mode": conn.execute(text("PRAGMA journal_mode")).scalar(),
+        "synchronous": conn.execute(text("PRAGMA synchronous")).scalar(),
+        "busy_timeout": conn.execute(text("PRAGMA busy_timeout")).scalar(),
+    }
+
+
+class TestSqliteEngines:
+    def test_sync_engine_applies_pragmas(self, tmp_path):
+        engine = create_sqlite_engine(str(tmp_path / "history.db"))
+        with engine.connect() as conn:
+            pragmas = read_pragmas(conn)
+        engine.dispose()
+        assert pragmas == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+
+    def test_async_engine_applies_pragmas(self, tmp_path):
+        engine = create_async_sqlite_engine(str(tmp_path / "app.db"))
+
+        async def run():
+            async with engine.connect() as conn:
+                pragmas = await conn.run_sync(read_pragmas)
+            await engine.dispose()
+            return pragmas
+
+        assert asyncio.run(run()) == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+
+    def test_async_engine_supports_concurrent_writes(self, tmp_path):
+        engine = create_async_sqlite_engine(str(tmp_path / "app.db"))
+
+        async def write(i):
+            async with engine.begin() as conn:
+                await conn.execute(text("INSERT INTO t (v) VALUES (:v)"), {"v": i})
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (v INTEGER)"))
+            await asyncio.gather(*(write(i) for i in range(20)))
+            async with engine.connect() as conn:
+                count = (await conn.execute(text("SELECT COUNT(*) FROM t"))).scalar()
+            await engine.dispose()
+            return count
+
+        assert asyncio.run(run()) == 20
@@ -0,0 +1,192 @@
+import asyncio
+import json
+
+import ollama
+import pytest
+
+from services.downloads import DownloadManager
+from services.ollama_backends import BackendRegistry, OllamaBackend
+
+
+class FakeClient:
+    def __init__(self, steps=5, delay=0.0, error=None, gate=None):
+        self.steps = steps
+        self.delay = delay
+        self.error = error
+        self.gate = gate
+        self.pulls = []
+
+    async def pull(self, model, stream=False):
+        self.pulls.append(model)
+
+        async def progress():
+            if self.gate is not None:
+                await self.gate.wait()
+            for step in range(1, self.steps + 1):
+                await asyncio.sleep(self.delay)
+                yield ollama.ProgressResponse(status="pulling", digest="sha", completed=step * 10, total=self.steps * 10)
+            if self.error is not None:
+                raise self.error
+            yield ollama.ProgressResponse(status="success")
+
+        return progress()
+
+
+def make_manager(*clients, **options):
+    backends = [OllamaBackend(f"h{i}", client_factory=lambda host, timeout, c=client: c) for i, client in enumerate(clients)]
+    return DownloadManager(BackendRegistry(backends), **options)
+
+
+def finish(manager, job):
+    async def wait():
+        return [state async for state in manager.subscribe(job.id)]
+
+    return wait()
+
+
+class TestDownloadManager:
+    def test_download_completes_and_reports_progress(self):
+        completed = []
+        client = FakeClient()
+        manager = make_manager(client, progress_interval=0, on_complete=completed.append)
+
+        async def run():
+            job = manager.start("m")
+            return job, await finish(manager, job)
+
+        job, states = asyncio.run(run())
+        assert states[-1]["status"] == "completed"
+        assert states[-1]["completed"] == states[-1]["total"] == 50
+        assert job.hosts["h0"]["status"] == "success"
+        assert completed == ["m"]
+
+    def test_concurrent_pulls_of_same_model_share_one_job(self):
+        client = FakeClient(delay=0.01)
+        manager = make_manager(client)
+
+        async def run():
+            first = manager.start("m")
+            second = manager.start("m")
+            states = await asyncio.gather(finish(manager, first), finish(manager, second))
+            return first, second, states
+
+        first, second, (a, b) = asyncio.run(run())
+        assert first is second
+        assert client.pulls == ["m"]
+        assert a[-1] == b[-1]
+
+    def test_progress_is_throttled(self):
+        manager = make_manager(FakeClient(steps=100), progress_interval=60)
+
+        async def run():
+            job = manager.start("m")
+            return await finish(manager, job)
+
+        states = asyncio.run(run())
+        # Status changes are always published; progress ticks inside the interval are not.
+        assert [state["status"] for state in states] == ["queued", "downloading", "completed"]
+
+    def test_pulls_on_every_reachable_host(self):
+        a, b = FakeClient(), FakeClient()
+        manager = make_manager(a, b, progress_interval=0)
+
+        async def run():
+            job = manager.start("m")
+            await finish(manager, job)
+            return job
+
+        job = asyncio.run(run())
+        assert a.pulls == b.pulls == ["m"]
+        assert job.total == 100
+
+    def test_missing_model_fails_with_message(self):
+        manager = make_manager(FakeClient(steps=0, error=ollama.ResponseError("file does not exist")))
+
+        async def run():
+            job = manager.start("nope")
+            return await finish(manager, job)
+
+        final = asyncio.run(run())[-1]
+        assert final["status"] == "failed"
+        assert final["error"] == "The model you tried to download does not exist."
+
+    def test_parallel_jobs_are_limited(self):
+        client = FakeClient(delay=0.01)
+        manager = make_manager(client, max_parallel=1)
+
+        async def run():
+            first, second = manager.start("a"), manager.start("b")
+            await asyncio.sleep(0.005)
+            statuses = (first.status, second.status)
+            await asyncio.gather(finish(manager, first), finish(manager, second))
+            return statuses
+
+        assert asyncio.run(run()) == ("downloading", "queued")
+
+    def test_state_is_saved_and_unfinished_jobs_resume(self, tmp_path):
+        path = tmp_path / "downloads.json"
+
+        async def interrupted():
+            manager = make_manager(FakeClient(gate=asyncio.Event()), path=str(path))
+            job = manager.start("m")
+            await asyncio.sleep(0.01)
+            await manager.close()
+            return job.id
+
+        job_id = asyncio.run(interrupted())
+        saved = json.loads(path.read_text())
+        assert [(job["id"], job["status"]) for job in saved] == [(job_id, "downloading")]
+
+        client = FakeClient()
+        restarted = make_manager(client, path=str(path))
+
+        async def resume():
+            resumed = restarted.resume()
+            await finish(restarted, resumed[0])
+            return resumed
+
+        resumed = asyncio.run(resume())
+        assert [job.id for job in resumed] == [job_id]
+        assert client.pulls == ["m"]
+        assert json.loads(path.read_text())[0]["status"] == "completed"
+
+    def test_progress_ticks_are_not_saved(self, tmp_path, monkeypatch):
+        manager = make_manager(FakeClient(steps=20), path=str(tmp_path / "downloads.json"), progress_interval=0)
+        saves = []
+        save = manager._save
+        monkeypatch.setattr(manager, "_save", lambda: saves.append(manager.jobs and next(iter(manager.jobs.values())).status) or save())
+
+        async def run():
+            job = manager.start("m")
+            return await finish(manager, job)
+
+        states = asyncio.run(run())
+        assert len(states) > 20
+        assert saves == ["queued", "downloading", "completed"]
+
+    def test_crashed_task_marks_job_failed(self, monkeypatch):
+        manager = make_manager(FakeClient())
+
+        async def crash(job):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(manager, "_run", crash)
+
+        async def run():
+            job = manager.start("m")
+            return job, await asyncio.wait_for(finish(manager, job), 5)
+
+        job, states = asyncio.run(run())
+        assert (job.status, job.error) == ("failed", "boom")
+        assert states[-1]["status"] == "failed"
+        assert manager.active_job("m") is None
+
+    def test_finished_jobs_beyond_history_are_dropped(self):
+        manager = make_manager(FakeClient(steps=1), max_history=1)
+
+        async def run():
+            for model in ("a", "b", "c"):
+                await finish(manager, manager.start(model))
+
+        asyncio.run(run())
+        assert [job.model for job in manager.recent()] == ["c", "b"]
@@ -0,0 +1,112 @@
+import pytest
+
+from tools import file_reader
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Exercise the checkpoint and mmap paths without writing megabytes of data.
+    monkeypatch.setattr(file_reader, "INDEX_BLOCK_SIZE", 16)
+    monkeypatch.setattr(file_reader, "MMAP_THRESHOLD", 32)
+    file_reader._index_cache.clear()
+
+
+def write_lines(path, n, trailing_newline=True):
+    text = "\n".join(f"line {i}" for i in range(1, n + 1))
+    path.write_text(text + ("\n" if trailing_newline else ""))
+    return path
+
+
+class TestLineIndex:
+    def test_counts_lines_with_trailing_newline(self, tmp_path):
+        assert file_reader.file_info(str(write_lines(tmp_path / "a.txt", 5)))["total_lines"] == 5
+
+    def test_counts_last_line_without_trailing_newline(self, tmp_path):
+        path = write_lines(tmp_path / "a.txt", 5, trailing_newline=False)
+        assert file_reader.file_info(str(path))["total_lines"] == 5
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.txt"
+        path.write_text("")
+        assert file_reader.file_info(str(path)) == {"path": str(path), "size": 0, "total_lines": 0}
+
+    def test_index_is_rebuilt_after_change(self, tmp_path):
+        path = write_lines(tmp_path / "a.txt", 3)
+        assert file_reader.file_info(str(path))["total_lines"] == 3
+        write_lines(path, 300)
+        assert file_reader.file_info(str(path))["total_lines"] == 300
+
+
+@pytest.mark.parametrize("use_small_blocks", [False, True])
+class TestReadLines:
+    def test_reads_window(self, tmp_path, request, use_small_blocks):
+        if use_small_blocks:
+            request.getfixturevalue("small_blocks")
+        path = write_lines(tmp_path / "a.txt", 100)
+        result = file_reader.read_lines(str(path), 40, 3)
+        assert result["content"] == "line 40\nline 41\nline 42\n"
+        assert (result["start_line"], result["end_line"]) == (40, 42)
+        assert result["total_lines"] == 100
+        assert result["eof"] is False
+
+    def test_window_past_end_is_truncated(self, tmp_path, request, use_small_blocks):
+        if use_small_blocks:
+            request.getfixturevalue("small_blocks")
+        path = write_lines(tmp_path / "a.txt", 10, trailing_newline=False)
+        result = file_reader.read_lines(str(path), 9, 5)
+        assert result["content"] == "line 9\nline 10"
+        assert result["end_line"] == 10
+        assert result["eof"] is True
+
+    def test_tail(self, tmp_path, request, use_small_blocks):
+        if use_small_blocks:
+            request.getfixturevalue("small_blocks")
+        path = write_lines(tmp_path / "a.txt", 100)
+        result = file_reader.read_tail(str(path), 2)
+        assert result["content"] == "line 99\nline 100\n"
+        assert (result["start_line"], result["end_line"]) == (99, 100)
+
+    def test_tail_longer_than_file(self, tmp_path, request, use_small_blocks):
+        if use_small_blocks:
+            request.getfixturevalue("small_blocks")
+        path = write_lines(tmp_path / "a.txt", 3, trailing_newline=False)
+        result = file_reader.read_tail(str(path), 10)
+        assert result["content"] == "line 1\nline 2\nline 3"
+        assert result["start_line"] == 1
+
+    def test_range(self, tmp_path, request, use_small_blocks):
+        if use_small_blocks:
+            request.getfixturevalue("small_blocks")
+        path = write_lines(tmp_path / "a.txt", 100)
+        result = file_reader.read_range(str(path), 7, 6)
+        assert result["content"] == "line 2"
+        assert result["next_offset"] == 13
+        assert result["size"] == path.stat().st_size
+
+
+class TestLimits:
+    def test_line_count_is_capped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_reader, "MAX_LINE_COUNT", 5)
+        path = write_lines(tmp_path / "a.txt", 100)
+        assert file_reader.read_lines(str(path), 1, 50)["end_line"] == 5
+
+    def test_range_length_is_capped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_reader, "MAX_RANGE_BYTES", 4)
+        path = write_lines(tmp_path / "a.txt", 100)
+        assert file_reader.read_range(str(path), 0, 1000)["content"] == "line"
+
+
+class TestReadRange:
+    def test_does_not_build_a_line_index(self, tmp_path):
+        file_reader._index_cache.clear()
+        path = write_lines(tmp_path / "a.txt", 100)
+        result = file_reader.read_range(str(path), 0, 10)
+        assert "total_lines" not in result
+        assert not file_reader._index_cache
+
+    def test_reports_total_lines_once_indexed(self, tmp_path):
+        path = write_lines(tmp_path / "a.txt", 100)
+        file_reader.file_info(str(path))
+        assert file_reader.read_range(str(path), 0, 10)["total_lines"] == 100
+        path.write_text("changed\n")
+        assert "total_lines" not in file_reader.read_range(str(path), 0, 10)
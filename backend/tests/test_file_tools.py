@@ -4,11 +4,21 @@ import pytest
 
 from tools import file_tools
 from tools.file_tools import (
+    apply_patch,
+    atomic_write,
+    edit_file,
     get_current_dir,
+    get_file_info,
     is_path_allowed,
     list_files_in_dir,
     read_file,
+    read_file_head,
+    read_file_lines,
+    read_file_range,
+    read_file_tail,
+    read_files,
     write_file,
+    write_files,
 )
 
 
@@ -78,6 +88,44 @@ class TestWriteFile:
         assert not outside.exists()
 
 
+    def test_write_replaces_file_atomically(self, allowed_dir, monkeypatch):
+        target = allowed_dir / "out.txt"
+        target.write_text("old")
+        calls = []
+        monkeypatch.setattr(file_tools, "atomic_write", lambda *args, **kwargs: calls.append(args))
+        write_file(str(target), "new")
+        assert calls == [(str(target), "new")]
+
+
+class TestEditTools:
+    def test_edit_file_applies_search_replace(self, allowed_dir):
+        target = allowed_dir / "app.py"
+        target.write_text("x = 1\ny = 2\n")
+        result = edit_file(str(target), [{"search": "y = 2", "replace": "y = 3"}])
+        assert result == {"path": str(target), "changed": True, "size": 12}
+        assert target.read_text() == "x = 1\ny = 3\n"
+
+    def test_failed_edit_leaves_file_unchanged(self, allowed_dir):
+        target = allowed_dir / "app.py"
+        target.write_text("x = 1\n")
+        with pytest.raises(RuntimeError):
+            edit_file(str(target), [{"search": "x = 1", "replace": "x = 2"}, {"search": "missing", "replace": ""}])
+        assert target.read_text() == "x = 1\n"
+
+    def test_apply_patch(self, allowed_dir):
+        target = allowed_dir / "app.py"
+        target.write_text("x = 1\ny = 2\n")
+        apply_patch(str(target), "@@ -1,2 +1,2 @@\n x = 1\n-y = 2\n+y = 4\n")
+        assert target.read_text() == "x = 1\ny = 4\n"
+
+    def test_edit_outside_allowed_dir_raises(self, allowed_dir, tmp_path):
+        outside = tmp_path.parent / "secret.py"
+        outside.write_text("x = 1\n")
+        with pytest.raises(RuntimeError):
+            edit_file(str(outside), [{"search": "x = 1", "replace": "x = 2"}])
+        assert outside.read_text() == "x = 1\n"
+
+
 class TestReadFile:
     def test_read_returns_file_contents(self, allowed_dir):
         target = allowed_dir / "note.txt"
@@ -101,6 +149,151 @@ class TestReadFile:
             read_file(str(outside))
 
 
+    def test_read_refuses_files_over_limit(self, allowed_dir, monkeypatch):
+        monkeypatch.setattr(file_tools.settings, "READ_FILE_MAX_BYTES", 10)
+        target = allowed_dir / "big.log"
+        target.write_text("x" * 11)
+        with pytest.raises(RuntimeError, match="read_file_lines"):
+            read_file(str(target))
+
+
+class TestRangedReads:
+    @pytest.fixture
+    def log_file(self, allowed_dir):
+        target = allowed_dir / "app.log"
+        target.write_text("".join(f"entry {i}\n" for i in range(1, 11)))
+        return target
+
+    def test_get_file_info(self, log_file):
+        info = get_file_info(str(log_file))
+        assert info["total_lines"] == 10
+        assert info["size"] == log_file.stat().st_size
+
+    def test_read_file_lines(self, log_file):
+        assert read_file_lines(str(log_file), 3, 2)["content"] == "entry 3\nentry 4\n"
+
+    def test_read_file_head_and_tail(self, log_file):
+        assert read_file_head(str(log_file), 1)["content"] == "entry 1\n"
+        assert read_file_tail(str(log_file), 1)["content"] == "entry 10\n"
+
+    def test_read_file_range(self, log_file):
+        assert read_file_range(str(log_file), 0, 5)["content"] == "entry"
+
+    def test_ranged_read_outside_allowed_dir_raises(self, allowed_dir, tmp_path):
+        outside = tmp_path.parent / "secret.log"
+        outside.write_text("secret")
+        with pytest.raises(RuntimeError):
+            read_file_lines(str(outside))
+
+    def test_ranged_read_missing_file_raises(self, allowed_dir):
+        with pytest.raises(RuntimeError):
+            read_file_tail(str(allowed_dir / "missing.log"))
+
+
+class TestAtomicWrite:
+    def test_replaces_content_and_leaves_no_temp_files(self, tmp_path):
+        target = tmp_path / "a.txt"
+        target.write_text("old")
+        atomic_write(str(target), "new", fsync=True)
+        assert target.read_text() == "new"
+        assert os.listdir(tmp_path) == ["a.txt"]
+
+    def test_preserves_existing_mode(self, tmp_path):
+        target = tmp_path / "script.sh"
+        target.write_text("old")
+        target.chmod(0o755)
+        atomic_write(str(target), "new")
+        assert target.stat().st_mode & 0o777 == 0o755
+
+    def test_new_file_gets_umask_mode_without_changing_umask(self, tmp_path, monkeypatch):
+        def umask(mask):
+            raise AssertionError("the process umask must not be changed")
+
+        reference = tmp_path / "reference.txt"
+        reference.write_text("x")
+        monkeypatch.setattr(file_tools.os, "umask", umask)
+        target = tmp_path / "new.txt"
+        atomic_write(str(target), "new")
+        assert target.stat().st_mode & 0o777 == reference.stat().st_mode & 0o777
+
+    def test_failed_write_keeps_original(self, tmp_path, monkeypatch):
+        target = tmp_path / "a.txt"
+        target.write_text("old")
+
+        def boom(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(file_tools.os, "replace", boom)
+        with pytest.raises(OSError):
+            atomic_write(str(target), "new")
+        assert target.read_text() == "old"
+        assert os.listdir(tmp_path) == ["a.txt"]
+
+
+class TestBatchTools:
+    def test_read_files_returns_results_in_order(self, allowed_dir, tmp_path):
+        (allowed_dir / "a.txt").write_text("A")
+        (allowed_dir / "b.txt").write_text("B")
+        outside = tmp_path.parent / "secret.txt"
+        outside.write_text("secret")
+        paths = [str(allowed_dir / "b.txt"), str(outside), str(allowed_dir / "missing.txt"), str(allowed_dir / "a.txt")]
+        results = read_files(paths)
+        assert [r["path"] for r in results] == paths
+        assert results[0]["content"] == "B"
+        assert "error" in results[1]
+        assert "error" in results[2]
+        assert results[3]["content"] == "A"
+
+    def test_write_files_writes_each_file(self, allowed_dir):
+        results = write_files([
+            {"path": str(allowed_dir / "a.txt"), "content": "one"},
+            {"path": str(allowed_dir / "b.txt"), "content": "two"},
+        ])
+        assert [r["written"] for r in results] == [3, 3]
+        assert (allowed_dir / "a.txt").read_text() == "one"
+        assert (allowed_dir / "b.txt").read_text() == "two"
+
+    def test_write_files_reports_per_file_errors(self, allowed_dir, tmp_path):
+        outside = tmp_path.parent / "escape.txt"
+        results = write_files([
+            {"path": str(outside), "content": "nope"},
+            {"path": str(allowed_dir / "ok.txt"), "content": "ok"},
+            {"path": str(allowed_dir / "no_such_dir" / "x.txt"), "content": "x"},
+        ])
+        assert "error" in results[0] and not outside.exists()
+        assert results[1] == {"path": str(allowed_dir / "ok.txt"), "written": 2}
+        assert "error" in results[2]
+
+    def test_write_files_rejects_duplicate_paths(self, allowed_dir):
+        target = str(allowed_dir / "a.txt")
+        results = write_files([{"path": target, "content": "first"}, {"path": target, "content": "second"}])
+        assert results[0]["written"] == 5
+        assert "error" in results[1]
+        assert (allowed_dir / "a.txt").read_text() == "first"
+
+    def test_write_files_rejects_aliases_of_the_same_path(self, allowed_dir, monkeypatch):
+        monkeypatch.chdir(allowed_dir)
+        results = write_files([
+            {"path": "a.txt", "content": "first"},
+            {"path": "./a.txt", "content": "second"},
+            {"path": str(allowed_dir / "a.txt"), "content": "third"},
+        ])
+        assert results[0]["written"] == 5
+        assert "error" in results[1] and "error" in results[2]
+        assert (allowed_dir / "a.txt").read_text() == "first"
+
+    def test_write_files_reports_malformed_items_per_item(self, allowed_dir):
+        results = write_files([
+            "a.txt",
+            {"path": str(allowed_dir / "b.txt"), "content": 5},
+            {"content": "no path"},
+            {"path": str(allowed_dir / "c.txt"), "content": "ok"},
+        ])
+        assert [("error" in result) for result in results] == [True, True, True, False]
+        assert not (allowed_dir / "b.txt").exists()
+        assert (allowed_dir / "c.txt").read_text() == "ok"
+
+
 class TestListFilesInDir:
     def test_lists_entries_of_allowed_dir(self, allowed_dir):
         (allowed_dir / "a.txt").write_text("a")
@@ -0,0 +1,157 @@
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session.agent import AgentSession
+
+from services.agno_services import WindowedAgent
+from services.history_window import HistoryWindow, truncate
+
+
+def make_run(i, tool_output=None, status=RunStatus.completed, answer=None):
+    messages = [Message(role="system", content="You are Forge."), Message(role="user", content=f"question {i}")]
+    if tool_output is not None:
+        call = {"id": f"c{i}", "type": "function", "function": {"name": "read_file", "arguments": {"path": f"f{i}.py"}}}
+        messages.append(Message(role="assistant", tool_calls=[call]))
+        messages.append(Message(role="tool", tool_call_id=f"c{i}", tool_name="read_file", content=tool_output))
+    messages.append(Message(role="assistant", content=answer or f"answer {i}"))
+    return RunOutput(run_id=f"run{i}", messages=messages, status=status)
+
+
+def contents(messages):
+    return [(m.role, m.content) for m in messages]
+
+
+class TestTruncate:
+    def test_short_text_is_unchanged(self):
+        assert truncate("hello", 10) == "hello"
+
+    def test_long_text_is_cut_with_note(self):
+        text = truncate("x" * 1000, 10, "read_file output")
+        assert text.startswith("x" * 40)
+        assert text.endswith("[... 960 more characters of read_file output omitted]")
+
+
+class TestHistoryWindow:
+    def test_runs_are_verbatim_while_they_fit(self):
+        runs = [make_run(i, tool_output="data" if i == 0 else None) for i in range(4)]
+        history = HistoryWindow(token_budget=10_000, recent_runs=2).build(runs)
+        assert all(m.from_history for m in history)
+        assert all(m.role != "system" for m in history)
+        assert [m.role for m in history[:4]] == ["user", "assistant", "tool", "assistant"]
+        assert [m.content for m in history if m.role == "user"] == [f"question {i}" for i in range(4)]
+
+    def test_compaction_keeps_recent_runs_verbatim_and_summarizes_older(self):
+        runs = [make_run(i, tool_output="data" if i == 0 else None) for i in range(4)]
+        history = HistoryWindow(token_budget=80, recent_runs=2, compact_ratio=1.0).build(runs)
+        # Oldest run: a user/assistant pair listing the tool it used.
+        assert history[0].content == "question 0"
+        assert history[1].content == "answer 0\n[Tools used: read_file(path='f0.py')]"
+        assert not history[1].tool_calls
+        assert contents(history[-4:]) == [
+            ("user", "question 2"), ("assistant", "answer 2"), ("user", "question 3"), ("assistant", "answer 3"),
+        ]
+
+    def test_bulky_tool_results_are_truncated_in_recent_runs(self):
+        history = HistoryWindow(tool_result_tokens=10).build([make_run(0, tool_output="y" * 5000)])
+        tool = next(m for m in history if m.role == "tool")
+        assert len(tool.content) < 200
+        assert "read_file output omitted" in tool.content
+        assert tool.tool_call_id == "c0"
+
+    def test_budget_drops_oldest_runs(self):
+        runs = [make_run(i, answer="word " * 100) for i in range(10)]
+        window = HistoryWindow(token_budget=400, recent_runs=1, summary_tokens=40)
+        history = window.build(runs)
+        kept = [m.content for m in history if m.role == "user"]
+        assert kept[-1] == "question 9"
+        assert "question 0" not in kept
+        assert len(kept) < 10
+
+    def test_recent_run_over_budget_falls_back_to_summary(self):
+        run = make_run(0, tool_output="z" * 4000)
+        history = HistoryWindow(token_budget=100, tool_result_tokens=1000).build([run])
+        assert [m.role for m in history] == ["user", "assistant"]
+
+    def test_skips_unfinished_and_failed_runs(self):
+        runs = [make_run(0), make_run(1, status=RunStatus.error), make_run(2, status=RunStatus.paused)]
+        history = HistoryWindow().build(runs)
+        assert [m.content for m in history if m.role == "user"] == ["question 0"]
+
+    def test_max_runs_limits_lookback(self):
+        runs = [make_run(i) for i in range(5)]
+        history = HistoryWindow(compact_ratio=1.0).build(runs, max_runs=2)
+        assert [m.content for m in history if m.role == "user"] == ["question 3", "question 4"]
+
+    def test_forms_are_computed_once_per_run(self, monkeypatch):
+        window = HistoryWindow(token_budget=30, recent_runs=1, compact_ratio=1.0)
+        calls = []
+        summary = window._summary
+        monkeypatch.setattr(window, "_summary", lambda run: calls.append(run.run_id) or summary(run))
+        runs = [make_run(i) for i in range(3)]
+        window.build(runs)
+        window.build(runs + [make_run(3)])
+        assert sorted(calls) == ["run0", "run1", "run2"]
+
+    def test_history_is_append_only_between_compactions(self):
+        window = HistoryWindow(token_budget=10_000, compact_ratio=0.5)
+        runs = [make_run(i) for i in range(5)]
+        turns = [contents(window.build(runs[:n], max_runs=4, session_id="s")) for n in range(1, 6)]
+        # Each turn extends the previous one, until the fifth run goes over `max_runs`.
+        for before, after in zip(turns[:3], turns[1:4]):
+            assert after[:len(before)] == before
+        assert [c for r, c in turns[4] if r == "user"] == ["question 3", "question 4"]
+
+        # After the compaction, new runs are appended to the compacted history again.
+        compacted = turns[4]
+        runs.append(make_run(5))
+        assert contents(window.build(runs, max_runs=4, session_id="s"))[:len(compacted)] == compacted
+
+    def test_layout_is_kept_per_session(self):
+        window = HistoryWindow(token_budget=10_000)
+        runs = [make_run(i) for i in range(5)]
+        window.build(runs[:5], max_runs=4, session_id="a")
+        assert len(window.build(runs[:3], max_runs=4, session_id="b")) == 6
+        # Session "a" keeps its compacted layout.
+        assert [m.content for m in window.build(runs, max_runs=4, session_id="a") if m.role == "user"] == [
+            "question 3", "question 4",
+        ]
+
+    def test_layout_that_no_longer_matches_is_rebuilt(self):
+        window = HistoryWindow(token_budget=10_000)
+        window.build([make_run(i) for i in range(5)], max_runs=4, session_id="s")
+        other = [make_run(i + 10) for i in range(2)]
+        assert [m.content for m in window.build(other, max_runs=4, session_id="s") if m.role == "user"] == [
+            "question 10", "question 11",
+        ]
+
+    def test_does_not_modify_stored_messages(self):
+        run = make_run(0, tool_output="y" * 5000)
+        HistoryWindow(tool_result_tokens=10).build([run])
+        assert run.messages[3].content == "y" * 5000
+        assert not any(m.from_history for m in run.messages)
+
+
+class TestWindowedAgent:
+    def test_history_is_inserted_before_new_input(self):
+        agent = WindowedAgent(
+            model=Ollama("fake:1b"),
+            instructions="Be brief.",
+            add_history_to_context=True,
+            num_history_runs=10,
+            history_window=HistoryWindow(token_budget=10_000),
+        )
+        session = AgentSession(session_id="s", runs=[make_run(0), make_run(1)])
+        run_messages = agent._get_run_messages(run_response=RunOutput(run_id="new"), input="hello", session=session)
+        roles = [m.role for m in run_messages.messages]
+        assert roles == ["system", "user", "assistant", "user", "assistant", "user"]
+        assert run_messages.messages[-1].content == "hello"
+        assert run_messages.messages[1].content == "question 0"
+
+    def test_history_can_be_turned_off_per_run(self):
+        agent = WindowedAgent(model=Ollama("fake:1b"), add_history_to_context=True, history_window=HistoryWindow())
+        session = AgentSession(session_id="s", runs=[make_run(0)])
+        run_messages = agent._get_run_messages(
+            run_response=RunOutput(run_id="new"), input="hello", session=session, add_history_to_context=False
+        )
+        assert [m.content for m in run_messages.messages] == ["hello"]
@@ -1,8 +1,11 @@
 import json
 import logging
 import time
+from logging.handlers import QueueHandler
 
-from config.logging import JsonFormatter, delete_old_logs
+import pytest
+
+from config.logging import JsonFormatter, RateLimitFilter, delete_old_logs, setup_logging, stop_logging
 
 
 class TestJsonFormatter:
@@ -45,6 +48,66 @@ class TestJsonFormatter:
         assert parsed["level"] == "WARNING"
 
 
+    def test_timestamp_is_record_creation_time(self):
+        record = self._make_record()
+        record.created = 0.0
+        parsed = json.loads(JsonFormatter().format(record))
+        assert parsed["timestamp"].startswith("1970-01-01T00:00:00")
+
+
+class TestRateLimitFilter:
+    def _record(self, level=logging.DEBUG, lineno=10, msg="tick"):
+        return logging.LogRecord("app", level, "/m.py", lineno, msg, (), None)
+
+    def test_samples_repeated_debug_records(self, clock):
+        rate_limit = RateLimitFilter(interval=1.0, clock=clock)
+        assert rate_limit.filter(self._record())
+        assert not rate_limit.filter(self._record())
+        assert not rate_limit.filter(self._record())
+        clock.now = 1.0
+        record = self._record()
+        assert rate_limit.filter(record)
+        assert record.getMessage() == "tick (2 similar messages suppressed)"
+
+    def test_call_sites_are_limited_separately(self, clock):
+        rate_limit = RateLimitFilter(interval=1.0, clock=clock)
+        assert rate_limit.filter(self._record(lineno=1))
+        assert rate_limit.filter(self._record(lineno=2))
+
+    def test_info_and_above_always_pass(self, clock):
+        rate_limit = RateLimitFilter(interval=1.0, clock=clock)
+        assert all(rate_limit.filter(self._record(level=logging.INFO)) for _ in range(5))
+
+
+class TestSetupLogging:
+    @pytest.fixture
+    def log_dir(self, tmp_path):
+        root = logging.getLogger()
+        level = root.level
+        yield tmp_path / "logs"
+        stop_logging()
+        root.setLevel(level)
+
+    def test_app_records_are_written_once(self, log_dir):
+        setup_logging(str(log_dir))
+        logging.getLogger("app").info("written once")
+        stop_logging()
+
+        lines = [json.loads(line) for line in (log_dir / "app.log").read_text().splitlines()]
+        assert [line["message"] for line in lines].count("written once") == 1
+
+    def test_handlers_run_on_listener(self, log_dir):
+        setup_logging(str(log_dir))
+        root = logging.getLogger()
+        assert sum(isinstance(handler, QueueHandler) for handler in root.handlers) == 1
+        assert logging.getLogger("app").handlers == []
+
+    def test_setup_is_idempotent(self, log_dir):
+        setup_logging(str(log_dir))
+        setup_logging(str(log_dir))
+        assert sum(isinstance(handler, QueueHandler) for handler in logging.getLogger().handlers) == 1
+
+
 class TestDeleteOldLogs:
     def test_deletes_files_older_than_cutoff(self, tmp_path):
         old = tmp_path / "old.log"
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    TOOL_CALL_SECONDS,
+    observe_run_metrics,
+    CHAT_TOKENS_PER_SECOND,
+    time_tool_call,
+)
+
+
+class RunMetrics:
+    def __init__(self, output_tokens, duration):
+        self.output_tokens = output_tokens
+        self.duration = duration
+
+
+class TestHistogram:
+    def test_render_uses_cumulative_buckets(self):
+        histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+        histogram.observe(5, route="/a")
+
+        lines = histogram.render().splitlines()
+        assert lines[0] == "# HELP latency_seconds Latency."
+        assert lines[1] == "# TYPE latency_seconds histogram"
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+        assert 'latency_seconds_count{route="/a"} 3' in lines
+
+    def test_rejects_wrong_labels(self):
+        histogram = Histogram("h", "H.", ("route",))
+        with pytest.raises(ValueError):
+            histogram.observe(1, method="GET")
+
+    def test_escapes_label_values(self):
+        counter = Counter("c", "C.", ("tool",))
+        counter.inc(tool='say "hi"')
+        assert 'c{tool="say \\"hi\\""} 1' in counter.render()
+
+
+class TestRegistry:
+    def test_duplicate_names_are_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("c", "C.")
+        with pytest.raises(ValueError):
+            registry.counter("c", "C.")
+
+
+class TestHooks:
+    def test_tool_hook_records_duration_and_errors(self):
+        before_ok = TOOL_CALL_SECONDS.count(tool="metrics_test_tool", status="ok")
+        before_error = TOOL_CALL_SECONDS.count(tool="metrics_test_tool", status="error")
+
+        async def ok(**kwargs):
+            return kwargs["x"] * 2
+
+        async def fail(**kwargs):
+            raise RuntimeError("nope")
+
+        assert asyncio.run(time_tool_call("metrics_test_tool", ok, {"x": 2})) == 4
+        with pytest.raises(RuntimeError):
+            asyncio.run(time_tool_call("metrics_test_tool", fail, {}))
+
+        assert TOOL_CALL_SECONDS.count(tool="metrics_test_tool", status="ok") == before_ok + 1
+        assert TOOL_CALL_SECONDS.count(tool="metrics_test_tool", status="error") == before_error + 1
+
+    def test_run_metrics_tokens_per_second(self):
+        observe_run_metrics("metrics-test-model", RunMetrics(output_tokens=100, duration=4.0))
+        observe_run_metrics("metrics-test-model", None)
+        assert CHAT_TOKENS_PER_SECOND.count(model="metrics-test-model") == 1
+        assert CHAT_TOKENS_PER_SECOND.sum(model="metrics-test-model") == 25.0
+
+
+class TestMetricsMiddleware:
+    @pytest.fixture
+    def histogram(self):
+        return Histogram("requests_seconds", "Requests.", ("method", "route", "status"))
+
+    @pytest.fixture
+    def client(self, histogram):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, histogram=histogram)
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            return {"id": item_id}
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse(iter([b"a", b"b"]), media_type="text/plain")
+
+        return TestClient(app)
+
+    def test_records_route_template(self, client, histogram):
+        client.get("/items/1")
+        client.get("/items/2")
+        assert histogram.count(method="GET", route="/items/{item_id}", status="200") == 2
+
+    def test_records_streaming_response_once(self, client, histogram):
+        assert client.get("/stream").text == "ab"
+        assert histogram.count(method="GET", route="/stream", status="200") == 1
+
+    def test_unmatched_paths_share_a_label(self, client, histogram):
+        client.get("/missing/1")
+        client.get("/missing/2")
+        assert histogram.count(method="GET", route="unmatched", status="404") == 2
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from services.model_catalog import ModelCatalog
+
+
+class Details:
+    def __init__(self, parameter_size):
+        self.parameter_size = parameter_size
+
+
+class Model:
+    def __init__(self, name, size=1, parameter_size="1B"):
+        self.model = name
+        self.size = size
+        self.details = Details(parameter_size)
+
+
+class ModelsList:
+    def __init__(self, models):
+        self.models = models
+
+
+@pytest.fixture
+def installed():
+    return [Model("a:1b")]
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def catalog(installed, calls, clock):
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return ModelsList(list(installed))
+
+    return ModelCatalog(loader=loader, ttl=60, clock=clock)
+
+
+class TestModelCatalog:
+    def test_lists_formatted_models(self, catalog):
+        assert asyncio.run(catalog.list()) == [{"name": "a:1b", "size": 1, "param_size": "1B"}]
+
+    def test_serves_from_cache_within_ttl(self, catalog, calls, clock):
+        async def run():
+            await catalog.list()
+            clock.now = 59
+            await catalog.list()
+
+        asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_refreshes_after_ttl(self, catalog, calls, clock):
+        async def run():
+            await catalog.list()
+            clock.now = 60
+            await catalog.list()
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_invalidate_forces_refresh(self, catalog, calls, installed):
+        async def run():
+            await catalog.list()
+            installed.append(Model("b:7b"))
+            catalog.invalidate()
+            return await catalog.get("b:7b")
+
+        assert asyncio.run(run())["name"] == "b:7b"
+        assert len(calls) == 2
+
+    def test_removed_models_are_dropped(self, catalog, installed):
+        async def run():
+            await catalog.list()
+            installed.clear()
+            catalog.invalidate()
+            return await catalog.get("a:1b")
+
+        assert asyncio.run(run()) is None
+
+    def test_get_refreshes_once_on_miss(self, catalog, calls, installed):
+        async def run():
+            await catalog.list()
+            installed.append(Model("b:7b"))
+            found = await catalog.get("b:7b", refresh_on_miss=True)
+            missing = await catalog.get("c:3b", refresh_on_miss=True)
+            return found, missing
+
+        found, missing = asyncio.run(run())
+        assert found["name"] == "b:7b"
+        assert missing is None
+        assert len(calls) == 3
+
+    def test_concurrent_readers_share_one_refresh(self, catalog, calls):
+        async def run():
+            await asyncio.gather(*(catalog.list() for _ in range(5)))
+
+        asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_connection_error_propagates(self, clock):
+        async def loader():
+            raise ConnectionError("down")
+
+        catalog = ModelCatalog(loader=loader, clock=clock)
+        with pytest.raises(ConnectionError):
+            asyncio.run(catalog.list())
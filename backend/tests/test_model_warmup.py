@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from core.config import settings
+from services.model_warmup import ModelWarmer, keep_alive_for
+from services.ollama_backends import BackendRegistry, OllamaBackend
+
+
+class FakeClient:
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail
+
+    async def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        if self.fail is not None:
+            raise self.fail
+        return {"done_reason": "load"}
+
+    async def ps(self):
+        class Response:
+            models = []
+
+        return Response()
+
+
+def make_registry(*hosts, fail=None):
+    clients = {}
+
+    def factory(host, timeout):
+        return clients.setdefault(host, FakeClient(fail))
+
+    return BackendRegistry([OllamaBackend(host, client_factory=factory) for host in hosts]), clients
+
+
+class TestKeepAlive:
+    def test_per_model_override(self, monkeypatch):
+        monkeypatch.setattr(settings, "OLLAMA_KEEP_ALIVE", "30m")
+        monkeypatch.setattr(settings, "MODEL_KEEP_ALIVE", {"pinned:7b": "-1m"})
+        assert keep_alive_for("pinned:7b") == "-1m"
+        assert keep_alive_for("other:1b") == "30m"
+
+
+class TestModelWarmer:
+    def test_warm_loads_model_with_keep_alive(self, monkeypatch):
+        monkeypatch.setattr(settings, "MODEL_KEEP_ALIVE", {"m": "1h"})
+        registry, clients = make_registry("a")
+        backend = asyncio.run(ModelWarmer(registry).warm("m"))
+        assert backend.name == "a"
+        assert clients["a"].calls == [{"model": "m", "prompt": "", "keep_alive": "1h"}]
+        assert "m" in backend.loaded
+
+    def test_concurrent_warms_share_one_request(self):
+        registry, clients = make_registry("a")
+        warmer = ModelWarmer(registry)
+
+        async def run():
+            await asyncio.gather(*(warmer.warm("m") for _ in range(5)))
+
+        asyncio.run(run())
+        assert len(clients["a"].calls) == 1
+
+    def test_warm_goes_to_least_busy_host(self):
+        registry, clients = make_registry("a", "b")
+        registry.backends[0].outstanding = 3
+        asyncio.run(ModelWarmer(registry).warm("m"))
+        assert "a" not in clients or not clients["a"].calls
+        assert len(clients["b"].calls) == 1
+
+    def test_warm_failure_raises_and_scheduled_failure_is_logged(self, caplog):
+        registry, _ = make_registry("a", fail=RuntimeError("model not found"))
+        warmer = ModelWarmer(registry)
+        with pytest.raises(RuntimeError):
+            asyncio.run(warmer.warm("m"))
+
+        async def scheduled():
+            await warmer.schedule("m")
+
+        asyncio.run(scheduled())
+        assert "Could not warm up m" in caplog.text
+        assert "m" not in registry.backends[0].loaded
+
+    def test_close_cancels_pending_warmups(self):
+        registry, _ = make_registry("a")
+        warmer = ModelWarmer(registry)
+
+        async def run():
+            task = warmer.schedule("m")
+            await warmer.close()
+            return task
+
+        assert asyncio.run(run()).cancelled()
@@ -0,0 +1,128 @@
+import asyncio
+
+import ollama
+import pytest
+
+from services.ollama_backends import BackendRegistry, OllamaBackend
+from services.ollama_monitor import OllamaMonitor
+
+
+class Response:
+    def __init__(self, *names):
+        self.models = [ollama.ListResponse.Model(model=name) for name in names]
+
+
+class FakeClient:
+    def __init__(self, host=None, timeout=None, loaded=(), installed=(), down=False):
+        self.host = host
+        self.loaded = loaded
+        self.installed = installed
+        self.down = down
+
+    async def ps(self):
+        if self.down:
+            raise ConnectionError("down")
+        return Response(*self.loaded)
+
+    async def list(self):
+        if self.down:
+            raise ConnectionError("down")
+        return Response(*self.installed)
+
+
+def make_backend(host, **client_options):
+    return OllamaBackend(host, client_factory=lambda host, timeout: FakeClient(host, timeout, **client_options))
+
+
+class TestBackendRegistry:
+    def test_picks_least_outstanding(self):
+        a, b = make_backend("a"), make_backend("b")
+        registry = BackendRegistry([a, b])
+        a.outstanding = 2
+        assert registry.pick("m") is b
+
+    def test_prefers_host_with_model_loaded(self):
+        a, b = make_backend("a"), make_backend("b")
+        registry = BackendRegistry([a, b], affinity_slack=2)
+        b.loaded = {"m"}
+        b.outstanding = 2
+        assert registry.pick("m") is b
+        # Beyond the slack, load wins over affinity.
+        b.outstanding = 3
+        assert registry.pick("m") is a
+
+    def test_prefers_session_host_among_equals(self):
+        a, b = make_backend("a"), make_backend("b")
+        registry = BackendRegistry([a, b])
+        assert registry.pick("m", prefer="b") is b
+
+    def test_host_at_its_limit_is_skipped_despite_affinity(self):
+        a, b = make_backend("a"), make_backend("b")
+        registry = BackendRegistry([a, b], affinity_slack=2)
+        a.loaded = {"m"}
+        with registry.track(a, "m"):
+            assert registry.pick("m", prefer="a", limit=2) is a
+            with registry.track(a, "m"):
+                assert a.generating == {"m": 2}
+                assert registry.pick("m", prefer="a", limit=2) is b
+                # Other models are not held back by the generations of "m".
+                assert registry.pick("n", prefer="a", limit=2) is a
+        assert a.generating == {}
+
+    def test_track_counts_outstanding_and_sets_affinity(self):
+        a = make_backend("a")
+        registry = BackendRegistry([a])
+        with registry.track(a, "m"):
+            assert a.outstanding == 1
+        assert a.outstanding == 0
+        assert a.requests == 1
+        assert "m" in a.loaded
+
+    def test_connection_error_ejects_host(self):
+        a, b = make_backend("a"), make_backend("b")
+        registry = BackendRegistry([a, b])
+        with pytest.raises(ConnectionError):
+            with registry.track(a, "m"):
+                raise ConnectionError("refused")
+        assert a.failures == 1
+        assert not a.available
+        assert registry.pick("m") is b
+
+    def test_route_probes_and_skips_down_hosts(self):
+        a, b = make_backend("a", down=True), make_backend("b", loaded=("m",))
+        registry = BackendRegistry([a, b])
+        backend = asyncio.run(registry.route("m"))
+        assert backend is b
+        assert b.loaded == {"m"}
+        status = registry.status()
+        assert status["alive"] is True
+        assert [(host["host"], host["alive"]) for host in status["hosts"]] == [("a", False), ("b", True)]
+
+    def test_route_raises_when_every_host_is_down(self):
+        registry = BackendRegistry([make_backend("a", down=True)])
+        with pytest.raises(ConnectionError):
+            asyncio.run(registry.route("m"))
+        assert registry.status()["last_error"] == "down"
+
+    def test_list_models_merges_reachable_hosts(self):
+        registry = BackendRegistry([
+            make_backend("a", installed=("m1", "m2")),
+            make_backend("b", installed=("m2", "m3")),
+            make_backend("c", down=True),
+        ])
+        response = asyncio.run(registry.list_models())
+        assert [model.model for model in response.models] == ["m1", "m2", "m3"]
+
+    def test_list_models_raises_when_no_host_answers(self):
+        registry = BackendRegistry([make_backend("a", down=True)])
+        with pytest.raises(ConnectionError):
+            asyncio.run(registry.list_models())
+
+    def test_custom_monitor_is_used(self):
+        async def probe():
+            return None
+
+        backend = OllamaBackend(monitor=OllamaMonitor(probe=probe))
+        registry = BackendRegistry([backend])
+        assert asyncio.run(registry.is_alive()) is True
+        assert backend.name == "default"
@@ -0,0 +1,74 @@
+import asyncio
+
+from services.ollama_monitor import OllamaMonitor
+
+
+def make_monitor(results, clock, **kwargs):
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        await asyncio.sleep(0)
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monitor = OllamaMonitor(probe=probe, clock=clock, **kwargs)
+    return monitor, calls
+
+
+class TestOllamaMonitor:
+    def test_check_records_up_state(self, clock):
+        clock.now = 1000.0
+        monitor, _ = make_monitor([{"models": []}], clock)
+        assert asyncio.run(monitor.check()) is True
+        assert monitor.alive is True
+        assert monitor.last_checked == 1000.0
+
+    def test_check_records_down_state(self, clock):
+        monitor, _ = make_monitor([ConnectionError("down")], clock)
+        assert asyncio.run(monitor.check()) is False
+        assert monitor.consecutive_failures == 1
+        assert monitor.last_error == "down"
+
+    def test_is_alive_uses_fresh_cache(self, clock):
+        monitor, calls = make_monitor([{}], clock, max_age=30)
+
+        async def run():
+            await monitor.is_alive()
+            clock.now += 10
+            await monitor.is_alive()
+            clock.now += 30
+            await monitor.is_alive()
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_concurrent_checks_share_one_probe(self, clock):
+        monitor, calls = make_monitor([{}], clock)
+
+        async def run():
+            return await asyncio.gather(*(monitor.is_alive() for _ in range(10)))
+
+        assert asyncio.run(run()) == [True] * 10
+        assert len(calls) == 1
+
+    def test_backoff_grows_while_down_and_resets(self, clock):
+        monitor, _ = make_monitor([ConnectionError()] * 4 + [{}], clock, interval=5, max_backoff=20)
+
+        async def run():
+            delays = []
+            for _ in range(5):
+                await monitor.check()
+                delays.append(monitor.next_delay())
+            return delays
+
+        assert asyncio.run(run()) == [5, 10, 20, 20, 5]
+
+    def test_slow_probe_counts_as_down(self):
+        async def probe():
+            await asyncio.sleep(1)
+
+        monitor = OllamaMonitor(probe=probe, timeout=0.01)
+        assert asyncio.run(monitor.check()) is False
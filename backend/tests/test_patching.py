@@ -0,0 +1,93 @@
+import pytest
+
+from tools.patching import PatchError, apply_search_replace, apply_unified_diff
+
+SOURCE = "def f():\n    return 1\n\n\ndef g():\n    return 2\n"
+
+
+class TestApplyUnifiedDiff:
+    def test_applies_simple_hunk(self):
+        diff = "--- a/x.py\n+++ b/x.py\n@@ -1,2 +1,2 @@\n def f():\n-    return 1\n+    return 10\n"
+        assert apply_unified_diff(SOURCE, diff) == SOURCE.replace("return 1", "return 10")
+
+    def test_applies_multiple_hunks(self):
+        diff = (
+            "@@ -1,2 +1,3 @@\n def f():\n+    x = 1\n     return 1\n"
+            "@@ -5,2 +6,2 @@\n def g():\n-    return 2\n+    return 20\n"
+        )
+        expected = "def f():\n    x = 1\n    return 1\n\n\ndef g():\n    return 20\n"
+        assert apply_unified_diff(SOURCE, diff) == expected
+
+    def test_tolerates_wrong_line_numbers(self):
+        diff = "@@ -40,2 +40,2 @@\n def g():\n-    return 2\n+    return 3\n"
+        assert apply_unified_diff(SOURCE, diff).endswith("def g():\n    return 3\n")
+
+    def test_accepts_bare_hunk_header(self):
+        diff = "@@\n def g():\n-    return 2\n+    return 3\n"
+        assert apply_unified_diff(SOURCE, diff).endswith("    return 3\n")
+
+    def test_preserves_crlf_line_endings(self):
+        text = "a\r\nb\r\nc\r\n"
+        assert apply_unified_diff(text, "@@ -2 +2 @@\n-b\n+B\n") == "a\r\nB\r\nc\r\n"
+
+    def test_no_newline_at_end_of_file(self):
+        text = "a\nb"
+        diff = "@@ -2 +2 @@\n-b\n\\ No newline at end of file\n+b\n"
+        assert apply_unified_diff(text, diff) == "a\nb\n"
+
+    def test_missing_context_raises(self):
+        with pytest.raises(PatchError):
+            apply_unified_diff(SOURCE, "@@ -1,1 +1,1 @@\n-def h():\n+def k():\n")
+
+    def test_removed_line_starting_with_dashes_is_not_a_file_header(self):
+        assert apply_unified_diff("a\nb\n-- x\n", "@@ -3,1 +3,1 @@\n--- x\n+-- y\n") == "a\nb\n-- y\n"
+        assert apply_unified_diff("a\n-- x\n", "@@\n--- x\n+-- y\n") == "a\n-- y\n"
+
+    def test_file_headers_between_hunks_are_skipped(self):
+        diff = (
+            "--- a/x.py\n+++ b/x.py\n@@ -1,1 +1,1 @@\n-def f():\n+def h():\n"
+            "--- a/x.py\n+++ b/x.py\n@@ -6 +6 @@\n-    return 2\n+    return 20\n"
+        )
+        assert apply_unified_diff(SOURCE, diff) == SOURCE.replace("def f", "def h").replace("return 2", "return 20")
+
+    def test_hunk_shorter_than_its_header_raises(self):
+        with pytest.raises(PatchError, match="fewer lines"):
+            apply_unified_diff(SOURCE, "@@ -1,3 +1,3 @@\n def f():\n-    return 1\n+    return 10\n")
+        with pytest.raises(PatchError, match="fewer lines"):
+            apply_unified_diff(SOURCE, "@@ -1,3 +1,3 @@\n def f():\n@@ -5 +5 @@\n-def g():\n+def k():\n")
+
+    def test_hunk_longer_than_its_header_raises(self):
+        with pytest.raises(PatchError, match="more lines"):
+            apply_unified_diff(SOURCE, "@@ -1,1 +1,1 @@\n-def f():\n+def h():\n     return 1\n")
+
+    def test_zero_context_insertion_goes_after_the_named_line(self):
+        assert apply_unified_diff("a\nb\nc\nd\n", "@@ -2,0 +3 @@\n+X\n") == "a\nb\nX\nc\nd\n"
+
+    def test_zero_context_insertion_at_start_of_file(self):
+        assert apply_unified_diff("a\nb\n", "@@ -0,0 +1 @@\n+X\n") == "X\na\nb\n"
+
+    def test_zero_context_hunks_keep_their_offsets(self):
+        diff = "@@ -1,0 +2 @@\n+X\n@@ -3 +4 @@\n-c\n+C\n@@ -4,0 +6 @@\n+Y\n"
+        assert apply_unified_diff("a\nb\nc\nd\n", diff) == "a\nX\nb\nC\nd\nY\n"
+
+    def test_diff_without_hunks_raises(self):
+        with pytest.raises(PatchError):
+            apply_unified_diff(SOURCE, "just some text")
+
+
+class TestApplySearchReplace:
+    def test_applies_edits_in_order(self):
+        edits = [{"search": "return 1", "replace": "return 11"}, {"search": "return 11", "replace": "return 12"}]
+        assert "return 12" in apply_search_replace(SOURCE, edits)
+
+    def test_missing_search_raises(self):
+        with pytest.raises(PatchError, match="not found"):
+            apply_search_replace(SOURCE, [{"search": "return 3", "replace": "x"}])
+
+    def test_ambiguous_search_raises(self):
+        with pytest.raises(PatchError, match="2 times"):
+            apply_search_replace(SOURCE, [{"search": "return", "replace": "yield"}])
+
+    def test_empty_search_raises(self):
+        with pytest.raises(PatchError):
+            apply_search_replace(SOURCE, [{"search": "", "replace": "x"}])
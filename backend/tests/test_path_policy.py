@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from tools import path_policy as path_policy_module
+from tools.path_policy import PathPolicy
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    base = tmp_path / "root"
+    (base / "sub").mkdir(parents=True)
+    monkeypatch.setattr(path_policy_module.settings, "CURRENT_DIR", str(base))
+    return base
+
+
+@pytest.fixture
+def policy():
+    return PathPolicy()
+
+
+class TestPathPolicy:
+    def test_allows_paths_inside_root(self, root, policy):
+        assert policy.allows(str(root / "a.txt"))
+        assert policy.allows(str(root / "sub" / "b.txt"))
+        assert policy.allows(str(root))
+
+    def test_rejects_paths_outside_root(self, root, policy, tmp_path):
+        assert not policy.allows(str(tmp_path / "secret.txt"))
+        assert not policy.allows(str(root / ".." / "secret.txt"))
+        assert not policy.allows(str(tmp_path / "root2" / "file.txt"))
+
+    def test_rejects_symlink_leaving_root(self, root, policy, tmp_path):
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (root / "link").symlink_to(outside)
+        (root / "file_link").symlink_to(outside / "f.txt")
+        assert not policy.allows(str(root / "link" / "f.txt"))
+        assert not policy.allows(str(root / "file_link"))
+
+    def test_dotdot_through_symlink_is_resolved(self, root, policy, tmp_path):
+        deep = tmp_path / "outside" / "deep"
+        deep.mkdir(parents=True)
+        (root / "link").symlink_to(deep)
+        # Lexically this is root/file.txt, but it really points at outside/file.txt.
+        assert not policy.allows(str(root / "link" / ".." / "file.txt"))
+
+    def test_follows_current_dir_changes(self, root, policy, tmp_path, monkeypatch):
+        other = tmp_path / "other"
+        other.mkdir()
+        assert policy.allows(str(root / "a.txt"))
+        monkeypatch.setattr(path_policy_module.settings, "CURRENT_DIR", str(other))
+        assert not policy.allows(str(root / "a.txt"))
+        assert policy.allows(str(other / "a.txt"))
+
+    def test_missing_root_rejects_everything(self, tmp_path, policy, monkeypatch):
+        monkeypatch.setattr(path_policy_module.settings, "CURRENT_DIR", str(tmp_path / "missing"))
+        assert not policy.allows(str(tmp_path / "missing" / "a.txt"))
+
+    def test_allows_many(self, root, policy, tmp_path):
+        inside, outside = str(root / "a.txt"), str(tmp_path / "b.txt")
+        assert policy.allows_many([inside, outside]) == {inside: True, outside: False}
+
+    def test_parent_directory_resolution_is_cached(self, root, policy, monkeypatch):
+        calls = []
+        realpath = os.path.realpath
+
+        def counting_realpath(path, *args, **kwargs):
+            calls.append(path)
+            return realpath(path, *args, **kwargs)
+
+        policy.allows(str(root / "a.txt"))  # resolve the root up front
+        monkeypatch.setattr(path_policy_module.os.path, "realpath", counting_realpath)
+        policy.allows_many([str(root / "sub" / f"f{i}.txt") for i in range(50)])
+        assert len(calls) == 1
+
+    def test_directory_swapped_for_symlink_is_resolved_again(self, root, policy, tmp_path):
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "secret.txt").write_text("secret")
+        assert policy.allows(str(root / "sub" / "secret.txt"))
+        (root / "sub").rmdir()
+        (root / "sub").symlink_to(outside)
+        assert not policy.allows(str(root / "sub" / "secret.txt"))
+
+    def test_ancestor_swapped_for_symlink_is_resolved_again(self, root, policy, tmp_path):
+        (root / "sub" / "deep").mkdir()
+        outside = tmp_path / "outside"
+        (outside / "deep").mkdir(parents=True)
+        assert policy.allows(str(root / "sub" / "deep" / "a.txt"))
+        (root / "sub" / "deep").rmdir()
+        (root / "sub").rmdir()
+        (root / "sub").symlink_to(outside)
+        assert not policy.allows(str(root / "sub" / "deep" / "a.txt"))
+
+    def test_set_root_drops_cache(self, root, policy):
+        policy.allows(str(root / "sub" / "a.txt"))
+        policy.set_root(str(root / "sub"))
+        assert policy._dirs == {}
@@ -0,0 +1,88 @@
+from agno.models.response import ToolExecution
+from agno.run.agent import RunPausedEvent
+
+from services.paused_runs import PausedRun, PausedRunStore
+
+
+def paused_event(*call_ids, run_id="run_1"):
+    tools = [
+        ToolExecution(tool_call_id=call_id, tool_name="search_internet", tool_args={"query": call_id}, requires_confirmation=True)
+        for call_id in call_ids
+    ]
+    tools.append(ToolExecution(tool_call_id="read", tool_name="read_file", result="text"))
+    return RunPausedEvent(run_id=run_id, tools=tools)
+
+
+class TestPausedRun:
+    def test_waiting_lists_unanswered_confirmations_only(self):
+        paused = PausedRunStore().park("s", "m", paused_event("a", "b"))
+        assert [tool["tool_call_id"] for tool in paused.waiting()] == ["a", "b"]
+        assert paused.confirm("a", False)
+        assert [tool["tool_call_id"] for tool in paused.waiting()] == ["b"]
+
+    def test_confirm_rejects_unknown_or_answered_calls(self):
+        paused = PausedRunStore().park("s", "m", paused_event("a"))
+        assert not paused.confirm("read", True)
+        assert paused.confirm("a", True)
+        assert not paused.confirm("a", False)
+
+    def test_tool_executions_carry_the_answers_back_to_agno(self):
+        paused = PausedRunStore().park("s", "m", paused_event("a"))
+        paused.confirm("a", True)
+        tools = paused.tool_executions()
+        assert [(tool.tool_call_id, tool.confirmed) for tool in tools] == [("a", True), ("read", None)]
+        assert tools[1].result == "text"
+
+
+class TestPausedRunStore:
+    def test_one_paused_run_per_session(self):
+        store = PausedRunStore()
+        store.park("s", "m", paused_event("a", run_id="old"))
+        store.park("s", "m", paused_event("b", run_id="new"))
+        store.park("t", "m", paused_event("c"))
+        assert len(store) == 2
+        assert store.get("s").run_id == "new"
+
+    def test_take_and_restore(self):
+        store = PausedRunStore()
+        paused = store.park("s", "m", paused_event("a"))
+        assert store.take("s") is paused
+        assert store.get("s") is None
+        store.restore(paused)
+        assert store.get("s") is paused
+
+    def test_restore_keeps_a_newer_pause(self):
+        store = PausedRunStore()
+        old = store.park("s", "m", paused_event("a", run_id="old"))
+        store.take("s")
+        store.park("s", "m", paused_event("b", run_id="new"))
+        store.restore(old)
+        assert store.get("s").run_id == "new"
+
+    def test_expired_runs_are_dropped(self, clock):
+        store = PausedRunStore(ttl=60, clock=clock)
+        store.park("s", "m", paused_event("a"))
+        clock.now += 61
+        assert store.get("s") is None
+        assert len(store) == 0
+
+    def test_paused_runs_survive_a_restart(self, tmp_path):
+        path = tmp_path / "paused_runs.json"
+        store = PausedRunStore(path=str(path))
+        store.park("s", "qwen", paused_event("a", "b"))
+        store.get("s").confirm("a", True)
+        store.save()
+
+        restarted = PausedRunStore(path=str(path))
+        restarted.load()
+        paused = restarted.get("s")
+        assert isinstance(paused, PausedRun)
+        assert (paused.run_id, paused.model) == ("run_1", "qwen")
+        assert [tool["tool_call_id"] for tool in paused.waiting()] == ["b"]
+
+    def test_unreadable_state_is_ignored(self, tmp_path):
+        path = tmp_path / "paused_runs.json"
+        path.write_text("{not json")
+        store = PausedRunStore(path=str(path))
+        store.load()
+        assert len(store) == 0
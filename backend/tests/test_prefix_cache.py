@@ -0,0 +1,85 @@
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.ollama import Ollama
+from agno.run.agent import RunOutput
+from agno.session.agent import AgentSession
+
+from core.metrics import PREFIX_CACHE_HIT_RATIO, PROMPT_PREFIX_CHANGES
+from services.agno_services import WindowedAgent
+from services.history_window import HistoryWindow
+from services.prefix_cache import PrefixCacheTracker, canonical_tools
+
+TOOLS = [{"type": "function", "function": {"name": "read_file", "parameters": {"type": "object", "properties": {}}}}]
+
+
+def prompt_messages(system="You are Forge.", text="x" * 400):
+    return [Message(role="system", content=system), Message(role="user", content=text)]
+
+
+def finished_run(run_id, input_tokens, history=()):
+    messages = [*history, Message(role="assistant", content="done", metrics=Metrics(input_tokens=input_tokens))]
+    return RunOutput(run_id=run_id, messages=messages)
+
+
+class TestCanonicalTools:
+    def test_key_order_does_not_matter(self):
+        reordered = [{"function": {"parameters": {"properties": {}, "type": "object"}, "name": "read_file"}, "type": "function"}]
+        assert canonical_tools(TOOLS) == canonical_tools(reordered)
+        assert canonical_tools(None) == "[]"
+
+
+class TestPrefixCacheTracker:
+    def test_hit_ratio_from_prompt_eval_count(self):
+        tracker = PrefixCacheTracker()
+        tokens = tracker.prompt("s", "r1", prompt_messages(), TOOLS)
+        before = PREFIX_CACHE_HIT_RATIO.count(model="m")
+        ratio = tracker.observe("m", finished_run("r1", input_tokens=tokens // 4))
+        assert 0.7 < ratio < 0.8
+        assert PREFIX_CACHE_HIT_RATIO.count(model="m") == before + 1
+
+    def test_first_model_call_of_the_run_is_used(self):
+        tracker = PrefixCacheTracker()
+        tracker.prompt("s", "r1", prompt_messages(), None)
+        # A history message carries the metrics of an earlier run; it is not this run's model call.
+        old = Message(role="assistant", content="old", from_history=True, metrics=Metrics(input_tokens=1))
+        assert tracker.observe("m", finished_run("r1", input_tokens=10_000, history=[old])) == 0.0
+
+    def test_unknown_run_or_missing_counts_are_ignored(self):
+        tracker = PrefixCacheTracker()
+        assert tracker.observe("m", finished_run("unknown", input_tokens=5)) is None
+        tracker.prompt("s", "r1", prompt_messages(), None)
+        assert tracker.observe("m", RunOutput(run_id="r1", messages=[Message(role="assistant", content="hi")])) is None
+
+    def test_changed_system_prompt_or_tools_are_counted(self):
+        tracker = PrefixCacheTracker()
+        system_before = PROMPT_PREFIX_CHANGES.value(part="system")
+        tools_before = PROMPT_PREFIX_CHANGES.value(part="tools")
+        tracker.prompt("s", "r1", prompt_messages(), TOOLS)
+        tracker.prompt("s", "r2", prompt_messages(text="next"), TOOLS)
+        tracker.prompt("other", "r3", prompt_messages(system="Something else."), None)
+        assert PROMPT_PREFIX_CHANGES.value(part="system") == system_before
+        assert PROMPT_PREFIX_CHANGES.value(part="tools") == tools_before
+        tracker.prompt("s", "r4", prompt_messages(system="Now it is Tuesday."), [])
+        assert PROMPT_PREFIX_CHANGES.value(part="system") == system_before + 1
+        assert PROMPT_PREFIX_CHANGES.value(part="tools") == tools_before + 1
+
+    def test_pending_prompts_are_bounded(self):
+        tracker = PrefixCacheTracker(max_pending=2)
+        for i in range(3):
+            tracker.prompt("s", f"r{i}", prompt_messages(), None)
+        assert list(tracker._pending) == ["r1", "r2"]
+
+
+class TestWindowedAgentPrefix:
+    def test_prompt_is_recorded_with_the_run_id(self):
+        tracker = PrefixCacheTracker()
+        agent = WindowedAgent(
+            model=Ollama("fake:1b"),
+            add_history_to_context=True,
+            history_window=HistoryWindow(),
+            prefix_cache=tracker,
+        )
+        session = AgentSession(session_id="s", runs=[])
+        agent._get_run_messages(run_response=RunOutput(run_id="new"), input="hello", session=session)
+        assert tracker._pending["new"] > 0
+        assert "s" in tracker._fingerprints
@@ -0,0 +1,113 @@
+from agno.db.sqlite import SqliteDb
+from agno.models.ollama import Ollama
+from agno.models.response import ToolExecution
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+
+from services.agno_services import WindowedAgent, cacheable_response, record_cached_turn, response_cache_key
+from services.history_window import HistoryWindow
+from services.response_cache import ResponseCache, cache_key, normalize_message
+from tools.file_tools import read_file, write_file
+
+
+def make_agent(model="fake:1b", tools=(read_file,), **options):
+    return WindowedAgent(model=Ollama(model), tools=list(tools), **options)
+
+
+class TestNormalizeMessage:
+    def test_whitespace_is_ignored_but_case_is_not(self):
+        assert normalize_message("  What is\n\tforge?  ") == "What is forge?"
+        assert normalize_message("Forge") != normalize_message("forge")
+
+    def test_key_does_not_depend_on_argument_order(self):
+        assert cache_key(model="m", message="hi") == cache_key(message="hi", model="m")
+        assert cache_key(model="m", message="hi") != cache_key(model="n", message="hi")
+
+
+class TestResponseCache:
+    def test_expires_after_ttl(self, clock):
+        cache = ResponseCache(ttl=10, clock=clock)
+        cache.set("k", {"response": "hi"})
+        clock.now = 10
+        assert cache.get("k") == {"response": "hi"}
+        clock.now = 11
+        assert cache.get("k") is None
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", {"response": "1"})
+        cache.set("b", {"response": "2"})
+        cache.get("a")
+        cache.set("c", {"response": "3"})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"response": "1"}
+        assert len(cache) == 2
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "response_cache.db")
+        first = ResponseCache(path=path)
+        first.set("k", {"response": "hi"})
+        first.close()
+
+        second = ResponseCache(path=path)
+        assert second.get("k") == {"response": "hi"}
+        assert second.clear() == 1
+        assert second.get("k") is None
+        second.close()
+
+    def test_sqlite_table_is_bounded(self, tmp_path, clock):
+        cache = ResponseCache(max_entries=2, path=str(tmp_path / "response_cache.db"), clock=clock)
+        for i, key in enumerate("abc"):
+            clock.now = i
+            cache.set(key, {"response": key})
+        assert cache._db.execute("SELECT key FROM response_cache ORDER BY key").fetchall() == [("b",), ("c",)]
+        cache.close()
+
+
+class TestResponseCacheKey:
+    def test_same_request_same_key(self):
+        agent = make_agent()
+        assert response_cache_key(agent, "s", "What is  forge?") == response_cache_key(agent, "s", "What is forge?")
+
+    def test_model_message_and_tools_change_the_key(self):
+        key = response_cache_key(make_agent(), "s", "hi")
+        assert response_cache_key(make_agent(), "s", "hello") != key
+        assert response_cache_key(make_agent(model="other:1b"), "s", "hi") != key
+        assert response_cache_key(make_agent(tools=(read_file, write_file)), "s", "hi") != key
+
+
+    def test_key_follows_the_conversation_content(self, tmp_path):
+        db = SqliteDb(db_file=str(tmp_path / "history.db"))
+
+        def agent_for(session_id):
+            return make_agent(session_id=session_id, db=db, add_history_to_context=True, history_window=HistoryWindow())
+
+        first, second = agent_for("first"), agent_for("second")
+        empty = response_cache_key(first, "first", "hi")
+        assert response_cache_key(second, "second", "hi") == empty
+
+        record_cached_turn(first, "first", "hi", "hello")
+        after_one_turn = response_cache_key(first, "first", "hi")
+        # The same message after an answer is a different request: it misses.
+        assert after_one_turn != empty
+        # A session with no history still matches the empty conversation.
+        assert response_cache_key(second, "second", "hi") == empty
+        # Once it has had the same exchange, it matches the first session again, even though the run ids differ.
+        record_cached_turn(second, "second", "hi", "hello")
+        assert response_cache_key(second, "second", "hi") == after_one_turn
+        record_cached_turn(second, "second", "hi", "something else")
+        assert response_cache_key(second, "second", "hi") != response_cache_key(first, "first", "hi")
+
+
+class TestCacheableResponse:
+    def test_completed_run_without_tools(self):
+        assert cacheable_response(RunOutput(content="hi", status=RunStatus.completed))
+
+    def test_read_only_tools_are_fine(self):
+        run = RunOutput(content="hi", status=RunStatus.completed, tools=[ToolExecution(tool_name="read_file")])
+        assert cacheable_response(run)
+
+    def test_side_effects_or_unfinished_runs_are_not_cached(self):
+        run = RunOutput(content="hi", status=RunStatus.completed, tools=[ToolExecution(tool_name="write_file")])
+        assert not cacheable_response(run)
+        assert not cacheable_response(RunOutput(content="hi", status=RunStatus.paused))
@@ -1,9 +1,58 @@
+import asyncio
+import json
+
+import httpx
+import ollama
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from agno.db.sqlite import SqliteDb
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ToolExecution
+from agno.run.agent import RunContentEvent, RunOutput, RunPausedEvent
+from agno.run.base import RunStatus
 
-from api.v1 import ollama_routes, util_routes
+from api.v1 import chat_routes, ollama_routes, util_routes
 from core.config import settings
+from services.admission import AdmissionController
+from services.agno_services import WindowedAgent
+from services.downloads import DownloadManager
+from services.history_window import HistoryWindow
+from services.model_catalog import ModelCatalog
+from services.ollama_backends import BackendRegistry, OllamaBackend
+from services.ollama_monitor import OllamaMonitor
+from services.paused_runs import PausedRunStore
+from services.response_cache import ResponseCache
+from tools.file_tools import read_file
+
+
+class Details:
+    parameter_size = "14B"
+
+
+class Model:
+    size = 9000000000
+    details = Details()
+
+    def __init__(self, name):
+        self.model = name
+
+
+class ModelsList:
+    def __init__(self, *names):
+        self.models = [Model(name) for name in names]
+
+
+def fake_backends(probe):
+    return BackendRegistry([OllamaBackend(monitor=OllamaMonitor(probe=probe))])
+
+
+def fake_loader(*names):
+    async def loader():
+        return ModelsList(*names)
+
+    return loader
 
 
 @pytest.fixture
@@ -28,6 +77,21 @@ class TestUtilRoutes:
         assert str(settings.CURRENT_DIR) == str(tmp_path.resolve())
 
 
+class FakeWarmer:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, model):
+        self.scheduled.append(model)
+
+
+@pytest.fixture
+def warmer(monkeypatch):
+    warmer = FakeWarmer()
+    monkeypatch.setattr(ollama_routes, "model_warmer", warmer)
+    return warmer
+
+
 class TestOllamaRoutes:
     def test_get_current_model(self, client, monkeypatch):
         monkeypatch.setattr(settings, "MODEL", "qwen2.5:14b")
@@ -36,35 +100,431 @@ class TestOllamaRoutes:
         assert resp.json() == {"name": "qwen2.5:14b"}
 
     def test_get_models_formats_ollama_response(self, client, monkeypatch):
-        class Details:
-            parameter_size = "14B"
-
-        class Model:
-            model = "qwen2.5:14b"
-            size = 9000000000
-            details = Details()
-
-        class ModelsList:
-            models = [Model()]
-
-        monkeypatch.setattr(ollama_routes, "get_all_models", lambda: ModelsList())
+        monkeypatch.setattr(ollama_routes, "model_catalog", ModelCatalog(loader=fake_loader("qwen2.5:14b")))
         resp = client.get("/api/models/all")
         assert resp.status_code == 200
         assert resp.json() == [
             {"name": "qwen2.5:14b", "size": 9000000000, "param_size": "14B"}
         ]
 
+    def test_change_model_to_installed_model(self, client, monkeypatch, warmer):
+        monkeypatch.setattr(settings, "MODEL", "other:1b")
+        monkeypatch.setattr(ollama_routes, "model_catalog", ModelCatalog(loader=fake_loader("qwen2.5:14b")))
+        resp = client.post("/api/models/change", json={"model_name": "qwen2.5:14b"})
+        assert resp.status_code == 200
+        assert settings.MODEL == "qwen2.5:14b"
+        assert warmer.scheduled == ["qwen2.5:14b"]
+
+    def test_change_model_to_missing_model_returns_404(self, client, monkeypatch, warmer):
+        monkeypatch.setattr(settings, "MODEL", "other:1b")
+        monkeypatch.setattr(ollama_routes, "model_catalog", ModelCatalog(loader=fake_loader("qwen2.5:14b")))
+        resp = client.post("/api/models/change", json={"model_name": "missing:1b"})
+        assert resp.status_code == 404
+        assert settings.MODEL == "other:1b"
+        assert warmer.scheduled == []
+
+    def test_loaded_lists_resident_models_with_keep_alive(self, client, monkeypatch):
+        class PsResponse:
+            models = [ollama.ProcessResponse.Model(model="qwen2.5:14b", size=10, size_vram=8)]
+
+        async def probe():
+            return PsResponse()
+
+        backend = OllamaBackend(monitor=OllamaMonitor(probe=probe))
+        backend._ps = probe
+        monkeypatch.setattr(ollama_routes, "ollama_backends", BackendRegistry([backend]))
+        monkeypatch.setattr(settings, "MODEL_KEEP_ALIVE", {"qwen2.5:14b": "-1m"})
+        resp = client.get("/api/models/loaded")
+        assert resp.status_code == 200
+        assert resp.json() == [{
+            "host": "default", "name": "qwen2.5:14b", "size": 10, "size_vram": 8,
+            "expires_at": None, "keep_alive": "-1m",
+        }]
+
     def test_check_ollama_alive_true(self, client, monkeypatch):
-        monkeypatch.setattr(ollama_routes.ollama, "ps", lambda: {"models": []})
+        async def probe():
+            return {"models": []}
+
+        monkeypatch.setattr(ollama_routes, "ollama_backends", fake_backends(probe))
         resp = client.get("/api/models/alive")
         assert resp.status_code == 200
         assert resp.json() is True
 
     def test_check_ollama_alive_false(self, client, monkeypatch):
-        def boom():
+        async def probe():
             raise ConnectionError("down")
 
-        monkeypatch.setattr(ollama_routes.ollama, "ps", boom)
+        monkeypatch.setattr(ollama_routes, "ollama_backends", fake_backends(probe))
         resp = client.get("/api/models/alive")
         assert resp.status_code == 200
         assert resp.json() is False
+
+    def test_health_reports_cached_state(self, client, monkeypatch):
+        calls = []
+
+        async def probe():
+            calls.append(1)
+
+        monkeypatch.setattr(ollama_routes, "ollama_backends", fake_backends(probe))
+        client.get("/api/models/alive")
+        resp = client.get("/api/models/health")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["alive"] is True
+        assert body["consecutive_failures"] == 0
+        assert body["last_checked"] is not None
+        assert len(calls) == 1
+
+
+class TestDownloadRoutes:
+    def test_download_streams_job_until_done(self, client, monkeypatch):
+        class Client:
+            async def pull(self, model, stream=False):
+                async def progress():
+                    yield ollama.ProgressResponse(status="pulling", completed=5, total=10)
+                    yield ollama.ProgressResponse(status="success")
+
+                return progress()
+
+        backend = OllamaBackend("h", client_factory=lambda host, timeout: Client())
+        manager = DownloadManager(BackendRegistry([backend]), progress_interval=0)
+        monkeypatch.setattr(ollama_routes, "download_manager", manager)
+
+        resp = client.post("/api/models/download/qwen2.5:14b")
+        assert resp.status_code == 200
+        frames = [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line]
+        assert frames[-1]["status"] == "completed"
+        job_id = resp.headers["X-Download-Job"]
+        assert client.get(f"/api/models/downloads/{job_id}").json()["status"] == "completed"
+        assert [job["id"] for job in client.get("/api/models/downloads").json()] == [job_id]
+
+    def test_unknown_download_returns_404(self, client):
+        assert client.get("/api/models/downloads/missing").status_code == 404
+        assert client.get("/api/models/downloads/missing/events").status_code == 404
+
+
+class FakeModel:
+    id = "fake:1b"
+
+
+class FakeRunOutput:
+    content = "done"
+    metrics = None
+
+
+class SlowAgent:
+    model = FakeModel()
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def arun(self, message, stream=False, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return FakeRunOutput()
+
+
+class TestChatCancellation:
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        agent = SlowAgent()
+
+        async def probe():
+            return None
+
+        monkeypatch.setattr(chat_routes, "get_agent", lambda session_id, host=None: agent)
+        monkeypatch.setattr(chat_routes, "ollama_backends", fake_backends(probe))
+        return agent
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+        app.include_router(chat_routes.router, prefix="/api/chat")
+        return app
+
+    def test_cancel_endpoint_stops_running_generation(self, app, agent):
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                chat = asyncio.create_task(
+                    client.post("/api/chat/", json={"message": "hi", "session_id": "s1", "stream": False})
+                )
+                await asyncio.wait_for(agent.started.wait(), 5)
+                cancel = await client.post("/api/chat/s1/cancel")
+                return cancel, await asyncio.wait_for(chat, 5)
+
+        cancel, chat = asyncio.run(run())
+        assert cancel.status_code == 200
+        assert cancel.json() == {"session_id": "s1", "cancelled": 1}
+        assert chat.json() == {"response": "", "session_id": "s1", "cancelled": True}
+        assert agent.cancelled
+
+    def test_cancel_without_running_generation_returns_404(self, app):
+        client = TestClient(app)
+        assert client.post("/api/chat/nothing/cancel").status_code == 404
+
+
+class TestChatAdmission:
+    @pytest.fixture
+    def app(self, monkeypatch):
+        async def probe():
+            return None
+
+        agent = SlowAgent()
+        monkeypatch.setattr(chat_routes, "get_agent", lambda session_id, host=None: agent)
+        monkeypatch.setattr(chat_routes, "ollama_backends", fake_backends(probe))
+        monkeypatch.setattr(chat_routes, "admission", AdmissionController(max_concurrent=1, max_queue=1))
+        monkeypatch.setattr(settings, "MODEL", "fake:1b")
+        app = FastAPI()
+        app.include_router(chat_routes.router, prefix="/api/chat")
+        app.state.agent = agent
+        return app
+
+    def test_full_queue_returns_429_with_retry_after(self, app):
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                body = {"message": "hi", "stream": False}
+                running = asyncio.create_task(client.post("/api/chat/", json={**body, "session_id": "a"}))
+                await asyncio.wait_for(app.state.agent.started.wait(), 5)
+                queued = asyncio.create_task(client.post("/api/chat/", json={**body, "session_id": "b"}))
+                await asyncio.sleep(0.05)
+                rejected = await client.post("/api/chat/", json={**body, "session_id": "c"})
+                await client.post("/api/chat/a/cancel")
+                await client.post("/api/chat/b/cancel")
+                return rejected, await running, await queued
+
+        rejected, running, queued = asyncio.run(run())
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert running.json()["cancelled"] is True
+        assert queued.json()["cancelled"] is True
+        assert chat_routes.admission.status() == {"fake:1b": {"active": 0, "waiting": 0, "limit": 1}}
+
+
+class CountingAgent(WindowedAgent):
+    """A real agent on a real SQLite session store, whose model is replaced by numbered answers."""
+
+    async def arun(self, message, stream=False, **kwargs):
+        self.counter["calls"] += 1
+        session = self._read_or_create_session(session_id=self.session_id)
+        answer = f"answer {self.counter['calls']}"
+        run = RunOutput(
+            run_id=f"run_{self.counter['calls']}",
+            session_id=self.session_id,
+            content=answer,
+            status=RunStatus.completed,
+            tools=[ToolExecution(tool_name=name) for name in self.tool_names],
+            messages=[Message(role="user", content=message), Message(role="assistant", content=answer)],
+        )
+        session.upsert_run(run)
+        self.save_session(session)
+        return run
+
+
+class TestChatResponseCache:
+    @pytest.fixture
+    def setup(self, monkeypatch, tmp_path):
+        async def probe():
+            return None
+
+        db = SqliteDb(db_file=str(tmp_path / "history.db"))
+        counter = {"calls": 0}
+
+        def make(tools=()):
+            agents = {}
+
+            def get_agent(session_id, host=None):
+                if session_id not in agents:
+                    agent = agents[session_id] = CountingAgent(
+                        model=Ollama("fake:1b"), session_id=session_id, db=db, tools=[read_file],
+                        add_history_to_context=True, history_window=HistoryWindow(),
+                    )
+                    agent.counter, agent.tool_names = counter, list(tools)
+                return agents[session_id]
+
+            monkeypatch.setattr(chat_routes, "get_agent", get_agent)
+            return counter, get_agent
+
+        monkeypatch.setattr(chat_routes, "ollama_backends", fake_backends(probe))
+        monkeypatch.setattr(chat_routes, "response_cache", ResponseCache())
+        monkeypatch.setattr(settings, "MODEL", "fake:1b")
+        app = FastAPI()
+        app.include_router(chat_routes.router, prefix="/api/chat")
+        return TestClient(app), make
+
+    def test_same_request_in_the_same_conversation_state_is_served_from_cache(self, setup):
+        client, make = setup
+        counter, _ = make()
+        body = {"message": "hi", "cache": True}
+        assert client.post("/api/chat/", json={**body, "session_id": "s"}).json() == {"response": "answer 1", "session_id": "s"}
+        assert client.post("/api/chat/", json={**body, "session_id": "t", "message": " hi "}).json() == {
+            "response": "answer 1", "session_id": "t", "cached": True,
+        }
+        assert counter["calls"] == 1
+
+    def test_cache_hit_is_recorded_in_the_session(self, setup):
+        client, make = setup
+        counter, get_agent = make()
+        body = {"message": "hi", "cache": True}
+        client.post("/api/chat/", json={**body, "session_id": "s"})
+        client.post("/api/chat/", json={**body, "session_id": "t"})
+        runs = get_agent("t").get_session("t").runs
+        assert [(run.input.input_content, run.content) for run in runs] == [("hi", "answer 1")]
+
+    def test_history_is_part_of_the_key(self, setup):
+        client, make = setup
+        counter, _ = make()
+        body = {"message": "hi", "cache": True}
+        client.post("/api/chat/", json={**body, "session_id": "s"})
+        # The same message after a different conversation is a different request.
+        assert client.post("/api/chat/", json={**body, "session_id": "s"}).json()["response"] == "answer 2"
+        # A session that reached the same conversation, here through a cache hit, shares the reply.
+        client.post("/api/chat/", json={**body, "session_id": "u"})
+        assert client.post("/api/chat/", json={**body, "session_id": "u"}).json() == {
+            "response": "answer 2", "session_id": "u", "cached": True,
+        }
+        assert counter["calls"] == 2
+
+    def test_cache_is_opt_in(self, setup):
+        client, make = setup
+        counter, _ = make()
+        client.post("/api/chat/", json={"message": "hi", "session_id": "s"})
+        client.post("/api/chat/", json={"message": "hi", "session_id": "t"})
+        assert counter["calls"] == 2
+
+    def test_runs_with_side_effects_are_not_cached(self, setup):
+        client, make = setup
+        counter, _ = make(tools=["write_file"])
+        body = {"message": "write it", "cache": True}
+        client.post("/api/chat/", json={**body, "session_id": "s"})
+        assert client.post("/api/chat/", json={**body, "session_id": "t"}).json()["response"] == "answer 2"
+        assert counter["calls"] == 2
+
+    def test_cache_lookup_builds_the_agent_for_the_routed_host(self, setup, monkeypatch):
+        client, make = setup
+        _, get_agent = make()
+        hosts = []
+
+        def recording_get_agent(session_id, host=None):
+            hosts.append(host)
+            return get_agent(session_id, host)
+
+        async def probe():
+            return None
+
+        backends = [OllamaBackend(host, monitor=OllamaMonitor(probe=probe)) for host in ("http://a", "http://b")]
+        monkeypatch.setattr(chat_routes, "ollama_backends", BackendRegistry(backends))
+        monkeypatch.setattr(chat_routes, "get_agent", recording_get_agent)
+        client.post("/api/chat/", json={"message": "hi", "session_id": "new", "cache": True})
+        assert hosts[0] in ("http://a", "http://b")
+        assert hosts[1] == hosts[0]
+
+    def test_clear_cache(self, setup):
+        client, make = setup
+        make()
+        client.post("/api/chat/", json={"message": "hi", "session_id": "s", "cache": True})
+        assert client.delete("/api/chat/cache").json() == {"cleared": 1}
+        assert client.post("/api/chat/", json={"message": "hi", "session_id": "t", "cache": True}).json() == {
+            "response": "answer 2", "session_id": "t",
+        }
+
+
+class ConfirmingAgent:
+    model = FakeModel()
+
+    def __init__(self, *call_ids):
+        self.call_ids = call_ids
+        self.continued = []
+
+    def _paused(self):
+        tools = [
+            ToolExecution(tool_call_id=call_id, tool_name="search_internet", requires_confirmation=True)
+            for call_id in self.call_ids
+        ]
+        return RunPausedEvent(run_id="run_1", tools=tools)
+
+    def arun(self, message, stream=False, **kwargs):
+        if not stream:
+            async def run():
+                return RunOutput(run_id="run_1", status=RunStatus.paused, tools=self._paused().tools)
+            return run()
+
+        async def events():
+            yield RunContentEvent(content="Searching. ")
+            yield self._paused()
+        return events()
+
+    async def acontinue_run(self, run_id=None, updated_tools=None, session_id=None, stream=False, **kwargs):
+        self.continued.append((run_id, [(tool.tool_call_id, tool.confirmed) for tool in updated_tools]))
+        yield RunContentEvent(content="Found it.")
+
+
+def stream_payloads(response):
+    return [
+        json.loads(line[len("data: "):]) for line in response.text.splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+
+
+class TestConfirmTool:
+    @pytest.fixture
+    def setup(self, monkeypatch):
+        async def probe():
+            return None
+
+        def make(*call_ids):
+            agent = ConfirmingAgent(*call_ids)
+            monkeypatch.setattr(chat_routes, "get_agent", lambda session_id, host=None, model=None: agent)
+            return agent
+
+        monkeypatch.setattr(chat_routes, "ollama_backends", fake_backends(probe))
+        monkeypatch.setattr(chat_routes, "paused_runs", PausedRunStore())
+        monkeypatch.setattr(settings, "MODEL", "fake:1b")
+        app = FastAPI()
+        app.include_router(chat_routes.router, prefix="/api/chat")
+        return TestClient(app), make
+
+    def test_paused_stream_ends_and_confirmation_resumes_it(self, setup):
+        client, make = setup
+        agent = make("call_1")
+        frames = stream_payloads(client.post("/api/chat/", json={"message": "search", "session_id": "s", "stream": True}))
+        confirmation = frames[-1]["tool_requiring_confirmation"]
+        assert (confirmation["tool_id"], confirmation["run_id"]) == ("call_1", "run_1")
+        assert len(chat_routes.paused_runs) == 1
+
+        resumed = client.post("/api/chat/confirm-tool", json={"tool_id": "call_1", "session_id": "s", "confirmed": True})
+        assert "".join(frame["content"] for frame in stream_payloads(resumed)) == "Found it."
+        assert agent.continued == [("run_1", [("call_1", True)])]
+        assert len(chat_routes.paused_runs) == 0
+
+    def test_non_streaming_pause_returns_the_confirmation(self, setup):
+        client, make = setup
+        make("call_1")
+        body = client.post("/api/chat/", json={"message": "search", "session_id": "s"}).json()
+        assert body["tool_requiring_confirmation"]["tool_id"] == "call_1"
+        assert client.get("/api/chat/s/confirmation").json()["waiting"][0]["tool_call_id"] == "call_1"
+
+    def test_run_resumes_once_every_call_is_answered(self, setup):
+        client, make = setup
+        agent = make("call_1", "call_2")
+        client.post("/api/chat/", json={"message": "search", "session_id": "s"})
+        first = client.post("/api/chat/confirm-tool", json={"tool_id": "call_1", "session_id": "s", "confirmed": False})
+        assert [tool["tool_call_id"] for tool in first.json()["waiting"]] == ["call_2"]
+        assert agent.continued == []
+        client.post("/api/chat/confirm-tool", json={"tool_id": "call_2", "session_id": "s", "confirmed": True})
+        assert agent.continued == [("run_1", [("call_1", False), ("call_2", True)])]
+
+    def test_unknown_tool_call_returns_404(self, setup):
+        client, make = setup
+        make("call_1")
+        body = {"tool_id": "call_1", "session_id": "s", "confirmed": True}
+        assert client.post("/api/chat/confirm-tool", json=body).status_code == 404
+        assert client.get("/api/chat/s/confirmation").status_code == 404
+        client.post("/api/chat/", json={"message": "search", "session_id": "s"})
+        assert client.post("/api/chat/confirm-tool", json={**body, "tool_id": "other"}).status_code == 404
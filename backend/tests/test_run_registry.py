@@ -0,0 +1,46 @@
+import asyncio
+
+from services.run_registry import RunRegistry, watch_disconnect
+
+
+class TestRunRegistry:
+    def test_cancel_cancels_all_runs_for_session(self):
+        registry = RunRegistry()
+
+        async def run():
+            tasks = [asyncio.create_task(asyncio.sleep(30)) for _ in range(2)]
+            other = asyncio.create_task(asyncio.sleep(30))
+            for task in tasks:
+                registry.register("s", task)
+            registry.register("other", other)
+            cancelled = registry.cancel("s")
+            await asyncio.gather(*tasks, return_exceptions=True)
+            result = (cancelled, all(task.cancelled() for task in tasks), other.cancelled())
+            other.cancel()
+            return result
+
+        assert asyncio.run(run()) == (2, True, False)
+
+    def test_finished_runs_are_unregistered(self):
+        registry = RunRegistry()
+
+        async def run():
+            task = asyncio.create_task(asyncio.sleep(0))
+            registry.register("s", task)
+            await task
+            await asyncio.sleep(0)
+            return registry.is_running("s"), registry.cancel("s")
+
+        assert asyncio.run(run()) == (False, 0)
+
+
+class TestWatchDisconnect:
+    def test_calls_back_on_disconnect(self):
+        messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+        calls = []
+
+        async def receive():
+            return messages.pop(0)
+
+        asyncio.run(watch_disconnect(receive, lambda: calls.append(1)))
+        assert calls == [1]
@@ -0,0 +1,105 @@
+from services.search_compaction import (
+    BM25,
+    canonical_url,
+    chunk_text,
+    compact_search_response,
+    dedupe_results,
+    estimate_tokens,
+    strip_boilerplate,
+    tokenize,
+)
+
+
+def sentence(topic, n):
+    return f"This paragraph number {n} explains {topic} in some detail for the reader."
+
+
+class TestCanonicalUrl:
+    def test_ignores_scheme_www_fragment_and_tracking(self):
+        assert canonical_url("https://www.example.com/page/?utm_source=x#top") == canonical_url(
+            "http://example.com/page"
+        )
+
+    def test_keeps_meaningful_query(self):
+        assert canonical_url("https://example.com/?id=1") != canonical_url("https://example.com/?id=2")
+
+    def test_tracking_keys_are_matched_exactly(self):
+        assert canonical_url("https://example.com/?reference=a") != canonical_url("https://example.com/?reference=b")
+        assert canonical_url("https://example.com/?ref=a&gclid=b") == canonical_url("https://example.com/")
+
+
+class TestStripBoilerplate:
+    def test_drops_navigation_links_and_cookie_banners(self):
+        text = "\n".join([
+            "Home",
+            "[Docs](https://example.com/docs) | [Blog](https://example.com/blog)",
+            "We use cookies to improve your experience.",
+            "FastAPI is a modern web framework for building APIs with Python.",
+            "FastAPI is a modern web framework for building APIs with Python.",
+        ])
+        assert strip_boilerplate(text) == "FastAPI is a modern web framework for building APIs with Python."
+
+
+class TestChunkText:
+    def test_chunks_respect_size(self):
+        text = "\n".join(sentence("chunking", n) for n in range(50))
+        chunks = chunk_text(text, chunk_tokens=50)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+        assert "\n".join(chunks) == text
+
+    def test_splits_overlong_lines(self):
+        text = " ".join(["word"] * 1000)
+        chunks = chunk_text(text, chunk_tokens=25)
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert " ".join(chunks).split() == text.split()
+
+
+class TestBM25:
+    def test_ranks_matching_document_first(self):
+        documents = [tokenize("the cat sat on the mat"), tokenize("python asyncio event loop"), tokenize("dogs")]
+        scores = BM25(documents).scores(tokenize("asyncio loop"))
+        assert scores.index(max(scores)) == 1
+        assert scores[2] == 0
+
+
+class TestCompactSearchResponse:
+    def _response(self):
+        relevant = "\n".join(sentence("asyncio event loops", n) for n in range(5))
+        filler = "\n".join(sentence("gardening tomatoes", n) for n in range(200))
+        return {
+            "query": "asyncio event loop",
+            "results": [
+                {"url": "https://a.com/x", "title": "A", "content": "About A.", "score": 0.9,
+                 "raw_content": filler + "\n" + relevant},
+                {"url": "https://www.a.com/x/", "title": "A again", "content": "Dup.", "score": 0.5,
+                 "raw_content": relevant},
+                {"url": "https://b.com", "title": "B", "content": "About B.", "score": 0.4, "raw_content": None},
+            ],
+        }
+
+    def test_keeps_relevant_excerpts_within_budget(self):
+        compacted = compact_search_response(self._response(), token_budget=300, chunk_tokens=100, top_k=5)
+
+        assert [result["title"] for result in compacted["results"]] == ["A", "B"]
+        assert all("raw_content" not in result for result in compacted["results"])
+        excerpts = compacted["results"][0]["excerpts"]
+        assert excerpts and all("asyncio" in excerpt for excerpt in excerpts)
+        assert compacted["results"][1]["excerpts"] == []
+        total = sum(
+            estimate_tokens(r["title"]) + estimate_tokens(r["content"]) + sum(estimate_tokens(e) for e in r["excerpts"])
+            for r in compacted["results"]
+        )
+        assert total <= 300
+
+    def test_does_not_modify_original(self):
+        response = self._response()
+        compact_search_response(response)
+        assert "raw_content" in response["results"][0]
+
+    def test_dedupes_identical_content(self):
+        results = [
+            {"url": "https://a.com", "content": "same text"},
+            {"url": "https://mirror.com", "content": "Same   text"},
+        ]
+        assert dedupe_results(results) == [results[0]]
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+from agno.tools.function import Function, FunctionCall
+
+from services.tool_dispatch import ToolDispatcher
+
+
+def slow_read(path: str) -> str:
+    '''Reads a file slowly.'''
+    time.sleep(0.2)
+    return f"{path} on {threading.current_thread().name}"
+
+
+class TestOffload:
+    def test_sync_tool_runs_in_the_pool(self):
+        tool = ToolDispatcher().offload(slow_read)
+        assert asyncio.run(tool("a.py")).startswith("a.py on tool")
+
+    def test_keeps_name_docstring_and_signature(self):
+        tool = ToolDispatcher().offload(slow_read)
+        assert tool.__name__ == "slow_read"
+        assert tool.__doc__ == "Reads a file slowly."
+        assert Function.from_callable(tool).to_dict() == Function.from_callable(slow_read).to_dict()
+
+    def test_async_tools_are_unchanged(self):
+        async def search(query: str):
+            return query
+
+        assert ToolDispatcher().offload(search) is search
+
+
+class FakeAgent:
+    pass
+
+
+class Recorder:
+    '''Records when each call starts and ends, and how many ran at once.'''
+
+    def __init__(self):
+        self.events = []
+        self.running = 0
+        self.peak = 0
+
+    def call(self, name, delay=0.05):
+        async def function_call(**arguments):
+            self.events.append(("start", name))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await asyncio.sleep(delay)
+            self.running -= 1
+            self.events.append(("end", name))
+            return name
+
+        return function_call
+
+
+class TestHook:
+    def test_independent_calls_run_concurrently_and_keep_their_order(self):
+        dispatcher = ToolDispatcher(max_concurrent=4)
+        recorder = Recorder()
+
+        async def run():
+            return await asyncio.gather(*(
+                dispatcher.hook(name, recorder.call(name, delay=0.2), {}) for name in ("a", "b", "c")
+            ))
+
+        started = time.perf_counter()
+        assert asyncio.run(run()) == ["a", "b", "c"]
+        assert time.perf_counter() - started < 0.45
+        assert recorder.peak == 3
+
+    def test_concurrency_is_capped_per_agent(self):
+        dispatcher = ToolDispatcher(max_concurrent=2)
+        recorder = Recorder()
+        agent, other = FakeAgent(), FakeAgent()
+
+        async def run():
+            await asyncio.gather(*(dispatcher.hook(f"t{i}", recorder.call(i), {}, agent=agent) for i in range(5)))
+            assert recorder.peak == 2
+            # Another agent's calls do not count against the first one's cap.
+            await asyncio.gather(
+                *(dispatcher.hook(f"t{i}", recorder.call(i), {}, agent=a) for i in range(2) for a in (agent, other))
+            )
+
+        asyncio.run(run())
+        assert recorder.peak == 4
+
+    def test_calls_with_side_effects_keep_their_place(self):
+        dispatcher = ToolDispatcher(side_effect_tools={"write_file"})
+        recorder = Recorder()
+
+        async def run():
+            await asyncio.gather(
+                dispatcher.hook("read_file", recorder.call("read 1"), {}),
+                dispatcher.hook("read_file", recorder.call("read 2"), {}),
+                dispatcher.hook("write_file", recorder.call("write"), {}),
+                dispatcher.hook("read_file", recorder.call("read 3"), {}),
+            )
+
+        asyncio.run(run())
+        events = recorder.events
+        assert events.index(("start", "write")) > max(events.index(("end", "read 1")), events.index(("end", "read 2")))
+        assert events.index(("start", "read 3")) > events.index(("end", "write"))
+
+    def test_agno_runs_offloaded_tools_concurrently_through_the_hook(self):
+        dispatcher = ToolDispatcher()
+        function = Function.from_callable(dispatcher.offload(slow_read))
+        function.tool_hooks = [dispatcher.hook]
+
+        async def run():
+            calls = [FunctionCall(function=function, arguments={"path": f"f{i}.py"}) for i in range(3)]
+            return await asyncio.gather(*(call.aexecute() for call in calls))
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        assert time.perf_counter() - started < 0.45
+        assert [result.result.split(" on ")[0] for result in results] == ["f0.py", "f1.py", "f2.py"]
@@ -0,0 +1,34 @@
+import pytest
+
+from services.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_tables_in_one_file_are_independent(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        first, second = TTLCache(path=path, table="first"), TTLCache(path=path, table="second")
+        first.set("k", {"v": 1})
+        second.set("k", {"v": 2})
+        assert first.clear() == 1
+        assert second.get("k") == {"v": 2}
+        first.close()
+        second.close()
+
+    def test_open_moves_memory_cache_to_sqlite(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = TTLCache(table="things")
+        cache.set("before", {"v": 1})
+        cache.open(None)
+        assert cache._db is None
+        cache.open(path)
+        cache.set("after", {"v": 2})
+        cache.close()
+
+        reopened = TTLCache(path=path, table="things")
+        assert reopened.get("after") == {"v": 2}
+        assert reopened.get("before") is None
+        reopened.close()
+
+    def test_rejects_unsafe_table_names(self):
+        with pytest.raises(ValueError):
+            TTLCache(table="cache; DROP TABLE x")
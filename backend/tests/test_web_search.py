@@ -0,0 +1,131 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.web_search import (
+    LocalSearchBackend,
+    SearchCache,
+    TavilySearchBackend,
+    WebSearch,
+    normalize_query,
+)
+
+
+class TestNormalizeQuery:
+    def test_ignores_case_whitespace_and_trailing_punctuation(self):
+        assert normalize_query("  What is   FastAPI? ") == normalize_query("what is fastapi")
+
+    def test_keeps_inner_punctuation(self):
+        assert normalize_query("C++ vs C#") == "c++ vs c#"
+
+
+class TestSearchCache:
+    def test_expires_after_ttl(self, clock):
+        cache = SearchCache(ttl=10, clock=clock)
+        cache.set("q", {"results": []})
+        clock.now = 10
+        assert cache.get("q") == {"results": []}
+        clock.now = 11
+        assert cache.get("q") is None
+
+    def test_evicts_least_recently_used(self, clock):
+        cache = SearchCache(max_entries=2, clock=clock)
+        cache.set("a", {"n": 1})
+        cache.set("b", {"n": 2})
+        cache.get("a")
+        cache.set("c", {"n": 3})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"n": 1}
+
+    def test_persists_across_instances(self, tmp_path, clock):
+        path = str(tmp_path / "search_cache.db")
+        first = SearchCache(path=path, clock=clock)
+        first.set("q", {"results": [{"url": "https://example.com"}]})
+        first.close()
+
+        second = SearchCache(path=path, clock=clock)
+        assert second.get("q") == {"results": [{"url": "https://example.com"}]}
+        second.close()
+
+    def test_persisted_entries_expire(self, tmp_path, clock):
+        path = str(tmp_path / "search_cache.db")
+        first = SearchCache(ttl=5, path=path, clock=clock)
+        first.set("q", {"results": []})
+        first.close()
+
+        clock.now = 6
+        second = SearchCache(ttl=5, path=path, clock=clock)
+        assert second.get("q") is None
+        second.close()
+
+
+class TestWebSearch:
+    def test_repeated_query_hits_cache(self):
+        backend = LocalSearchBackend({"fastapi": [{"url": "https://fastapi.tiangolo.com"}]})
+        search = WebSearch(backend, SearchCache())
+
+        first = asyncio.run(search.search("FastAPI"))
+        second = asyncio.run(search.search("  fastapi?"))
+
+        assert first == second
+        assert first["results"] == [{"url": "https://fastapi.tiangolo.com"}]
+        assert backend.calls == ["FastAPI"]
+
+    def test_concurrent_queries_share_one_request(self):
+        async def slow(query):
+            await asyncio.sleep(0.01)
+            return {"query": query, "results": []}
+
+        class SlowBackend(LocalSearchBackend):
+            async def search(self, query):
+                self.calls.append(query)
+                return await slow(query)
+
+        backend = SlowBackend()
+        search = WebSearch(backend, SearchCache())
+
+        async def run():
+            return await asyncio.gather(*(search.search("same query") for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert len(backend.calls) == 1
+        assert all(result == results[0] for result in results)
+
+    def test_errors_are_not_cached(self):
+        attempts = []
+
+        def responder(query):
+            attempts.append(query)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return {"query": query, "results": []}
+
+        search = WebSearch(LocalSearchBackend(responder=responder), SearchCache())
+        with pytest.raises(RuntimeError):
+            asyncio.run(search.search("q"))
+        assert asyncio.run(search.search("q")) == {"query": "q", "results": []}
+        assert len(attempts) == 2
+
+
+class TestTavilySearchBackend:
+    def _backend(self, handler):
+        backend = TavilySearchBackend("key")
+        backend._client = httpx.AsyncClient(base_url=backend.base_url, transport=httpx.MockTransport(handler))
+        return backend
+
+    def test_posts_query_and_returns_json(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json={"query": "q", "results": []})
+
+        backend = self._backend(handler)
+        assert asyncio.run(backend.search("q")) == {"query": "q", "results": []}
+        assert seen[0].url.path == "/search"
+
+    def test_error_status_raises_runtime_error(self):
+        backend = self._backend(lambda request: httpx.Response(401, json={"detail": {"error": "bad key"}}))
+        with pytest.raises(RuntimeError, match="bad key"):
+            asyncio.run(backend.search("q"))
@@ -0,0 +1,175 @@
+import os
+
+import pytest
+
+from tools import workspace_index
+from tools.workspace_index import WorkspaceIndex, find_files, parse_gitignore, search_files
+
+
+def ignored(rules, path, is_dir=False):
+    result = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.regex.match(path):
+            result = not rule.negated
+    return result
+
+
+class TestParseGitignore:
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        rules = parse_gitignore("*.log\n")
+        assert ignored(rules, "app.log")
+        assert ignored(rules, "logs/deep/app.log")
+        assert not ignored(rules, "app.log.txt")
+
+    def test_anchored_pattern_only_matches_from_root(self):
+        rules = parse_gitignore("/build\n")
+        assert ignored(rules, "build", is_dir=True)
+        assert not ignored(rules, "src/build", is_dir=True)
+
+    def test_dir_only_pattern(self):
+        rules = parse_gitignore("cache/\n")
+        assert ignored(rules, "cache", is_dir=True)
+        assert not ignored(rules, "cache", is_dir=False)
+
+    def test_negation_and_comments(self):
+        rules = parse_gitignore("# comment\n*.txt\n!keep.txt\n")
+        assert ignored(rules, "a.txt")
+        assert not ignored(rules, "keep.txt")
+
+    def test_double_star(self):
+        rules = parse_gitignore("docs/**/*.tmp\n")
+        assert ignored(rules, "docs/a.tmp")
+        assert ignored(rules, "docs/x/y/a.tmp")
+        assert not ignored(rules, "src/a.tmp")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / ".gitignore").write_text("node_modules/\n*.log\n")
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "main.py").write_text("import os\nprint('hello')\n")
+    (tmp_path / "src" / "pkg" / "util.py").write_text("def helper():\n    return 'HELLO'\n")
+    (tmp_path / "src" / "pkg" / ".gitignore").write_text("generated.py\n")
+    (tmp_path / "src" / "pkg" / "generated.py").write_text("hello\n")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "dep.js").write_text("hello")
+    (tmp_path / "debug.log").write_text("hello")
+    (tmp_path / "image.bin").write_bytes(b"hello\x00world")
+    (tmp_path / "README.md").write_text("hello readme\n")
+    return tmp_path
+
+
+class TestWorkspaceIndex:
+    def test_indexes_tree_respecting_gitignore(self, tree):
+        index = WorkspaceIndex(str(tree))
+        index.refresh()
+        assert sorted(index.files) == [
+            ".gitignore",
+            "README.md",
+            "image.bin",
+            "src/main.py",
+            "src/pkg/.gitignore",
+            "src/pkg/util.py",
+        ]
+
+    def test_glob_by_name_and_by_path(self, tree):
+        index = WorkspaceIndex(str(tree))
+        assert index.glob("*.py") == ["src/main.py", "src/pkg/util.py"]
+        assert index.glob("src/*.py") == ["src/main.py"]
+        assert index.glob("src/**/*.py") == ["src/main.py", "src/pkg/util.py"]
+
+    def test_search_skips_binary_files(self, tree):
+        index = WorkspaceIndex(str(tree))
+        matches = index.search("hello", ignore_case=True)
+        assert {m["path"] for m in matches} == {"README.md", "src/main.py", "src/pkg/util.py"}
+        assert {"path": "src/pkg/util.py", "line": 2, "text": "    return 'HELLO'"} in matches
+
+    def test_search_skips_files_over_size_limit(self, tree):
+        index = WorkspaceIndex(str(tree), max_file_bytes=15)
+        assert {m["path"] for m in index.search("hello")} == {"README.md"}
+
+    def test_refresh_picks_up_added_and_removed_files(self, tree):
+        index = WorkspaceIndex(str(tree), refresh_interval=0)
+        index.refresh()
+        (tree / "src" / "new.py").write_text("x")
+        os.remove(tree / "src" / "main.py")
+        index.refresh()
+        assert "src/new.py" in index.files
+        assert "src/main.py" not in index.files
+
+    def test_refresh_is_rate_limited(self, tree):
+        index = WorkspaceIndex(str(tree), refresh_interval=60)
+        index.refresh()
+        (tree / "late.py").write_text("x")
+        index.refresh()
+        assert "late.py" not in index.files
+        index.refresh(force=True)
+        assert "late.py" in index.files
+
+    def test_search_sees_in_place_edits(self, tree):
+        index = WorkspaceIndex(str(tree), refresh_interval=60)
+        assert index.search("goodbye") == []
+        target = tree / "README.md"
+        target.write_text("goodbye\n")
+        stat = target.stat()
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert [m["path"] for m in index.search("goodbye")] == ["README.md"]
+
+    def test_removed_directory_is_forgotten(self, tree):
+        index = WorkspaceIndex(str(tree), refresh_interval=0)
+        index.refresh()
+        for name in ("util.py", "generated.py", ".gitignore"):
+            os.remove(tree / "src" / "pkg" / name)
+        os.rmdir(tree / "src" / "pkg")
+        index.refresh()
+        assert not any(path.startswith("src/pkg/") for path in index.files)
+
+    def test_symlinks_are_not_indexed(self, tree, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret.txt").write_text("password=hunter2\n")
+        (tree / "link.txt").symlink_to(outside / "secret.txt")
+        (tree / "linked_dir").symlink_to(outside)
+        index = WorkspaceIndex(str(tree))
+        assert not any(path.startswith("link") for path in index.files)
+        assert index.search("password") == []
+
+    def test_file_swapped_for_symlink_is_not_searched(self, tree, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret.txt").write_text("password=hunter2\n")
+        index = WorkspaceIndex(str(tree), refresh_interval=60)
+        index.refresh()
+        os.remove(tree / "README.md")
+        (tree / "README.md").symlink_to(outside / "secret.txt")
+        assert index.search("password") == []
+
+
+class TestWorkspaceTools:
+    @pytest.fixture(autouse=True)
+    def current_dir(self, tree, monkeypatch):
+        monkeypatch.setattr(workspace_index.settings, "CURRENT_DIR", str(tree))
+        monkeypatch.setattr(workspace_index, "_index", None)
+
+    def test_find_files(self, tree):
+        result = find_files("*.md")
+        assert result == {"root": str(tree), "matches": ["README.md"], "truncated": False}
+
+    def test_find_files_truncates(self):
+        result = find_files("*.py", max_results=1)
+        assert result["matches"] == ["src/main.py"]
+        assert result["truncated"] is True
+
+    def test_search_files(self):
+        result = search_files(r"def \w+", glob="*.py")
+        assert result["matches"] == [{"path": "src/pkg/util.py", "line": 1, "text": "def helper():"}]
+
+    def test_search_files_invalid_regex_raises(self):
+        with pytest.raises(RuntimeError):
+            search_files("(")
+
+    def test_index_follows_current_dir(self, tmp_path_factory, monkeypatch):
+        other = tmp_path_factory.mktemp("other")
+        (other / "only_here.txt").write_text("x")
+        monkeypatch.setattr(workspace_index.settings, "CURRENT_DIR", str(other))
+        assert find_files("*.txt")["matches"] == ["only_here.txt"]